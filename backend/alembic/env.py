@@ -11,7 +11,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from app.database import Base
-from app.models import Battle, BattleResult, CountryStatistics  # noqa: F401 — ensure models loaded
+from app.models import Battle, BattleResult, CountryStatistics, CountryDailyStats, UserAffinity, LiveBattle, LiveBattleScore, GiftEvent  # noqa: F401 — ensure models loaded
 
 config = context.config
 
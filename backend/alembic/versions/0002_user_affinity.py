@@ -0,0 +1,29 @@
+"""User → country affinity table
+
+Revision ID: 0002_user_affinity
+Revises: 0001_initial
+Create Date: 2026-10-17 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_user_affinity'
+down_revision = '0001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_affinity',
+        sa.Column('user_id', sa.String(64), primary_key=True),
+        sa.Column('country_name', sa.String(255), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    # Warm-up reads the most recently active users
+    op.create_index('ix_user_affinity_updated_at', 'user_affinity', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_affinity_updated_at', table_name='user_affinity')
+    op.drop_table('user_affinity')
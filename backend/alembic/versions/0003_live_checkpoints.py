@@ -0,0 +1,45 @@
+"""Live battle checkpoint tables
+
+Revision ID: 0003_live_checkpoints
+Revises: 0002_user_affinity
+Create Date: 2026-10-17 12:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0003_live_checkpoints'
+down_revision = '0002_user_affinity'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'live_battles',
+        sa.Column('battle_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('room', sa.String(255), nullable=False),
+        sa.Column('creator_username', sa.String(255), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('duration_seconds', sa.Integer, nullable=False),
+        sa.Column('version', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('last_gift', postgresql.JSONB, nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index('ix_live_battles_room', 'live_battles', ['room'])
+
+    op.create_table(
+        'live_battle_scores',
+        sa.Column('battle_id', postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey('live_battles.battle_id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('country_name', sa.String(255), primary_key=True),
+        sa.Column('slot', sa.Integer, nullable=False),
+        sa.Column('score', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('position', sa.Integer, nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('live_battle_scores')
+    op.drop_index('ix_live_battles_room', table_name='live_battles')
+    op.drop_table('live_battles')
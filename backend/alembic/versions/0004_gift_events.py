@@ -0,0 +1,39 @@
+"""Partitioned gift event log
+
+Revision ID: 0004_gift_events
+Revises: 0003_live_checkpoints
+Create Date: 2026-10-17 14:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0004_gift_events'
+down_revision = '0003_live_checkpoints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Daily partitions are created ahead of time (and dropped after the
+    # retention window) by the app's gift event recorder
+    op.create_table(
+        'gift_events',
+        sa.Column('id', sa.BigInteger, autoincrement=True, nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column('battle_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', sa.String(64), nullable=True),
+        sa.Column('nickname', sa.String(255), nullable=True),
+        sa.Column('gift_name', sa.String(255), nullable=False),
+        sa.Column('points', sa.Integer, nullable=False),
+        sa.Column('country_name', sa.String(255), nullable=False),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)',
+    )
+    op.create_index('ix_gift_events_battle_id', 'gift_events', ['battle_id'])
+    # Safety net for rows outside every daily partition
+    op.execute('CREATE TABLE gift_events_default PARTITION OF gift_events DEFAULT')
+
+
+def downgrade() -> None:
+    op.drop_table('gift_events')
@@ -0,0 +1,26 @@
+"""Indexes for keyset-paginated battle history
+
+Revision ID: 0005_history_indexes
+Revises: 0004_gift_events
+Create Date: 2026-10-17 16:00:00.000000
+"""
+from alembic import op
+
+revision = '0005_history_indexes'
+down_revision = '0004_gift_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GET /history pages through (started_at, id) newest first; a b-tree is
+    # scanned backwards for DESC, so plain ascending indexes serve it
+    op.create_index('ix_battles_started_at_id', 'battles', ['started_at', 'id'])
+    op.create_index('ix_battles_creator_started_at_id', 'battles', ['creator_username', 'started_at', 'id'])
+    op.create_index('ix_battles_winner_started_at_id', 'battles', ['winner_country', 'started_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_battles_winner_started_at_id', table_name='battles')
+    op.drop_index('ix_battles_creator_started_at_id', table_name='battles')
+    op.drop_index('ix_battles_started_at_id', table_name='battles')
@@ -0,0 +1,22 @@
+"""Per-second score timeline on battles
+
+Revision ID: 0006_battle_timeline
+Revises: 0005_history_indexes
+Create Date: 2026-10-17 18:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_battle_timeline'
+down_revision = '0005_history_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Delta-encoded, zlib-compressed; NULL for battles saved before this column existed
+    op.add_column('battles', sa.Column('timeline', sa.LargeBinary, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('battles', 'timeline')
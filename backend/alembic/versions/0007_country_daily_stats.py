@@ -0,0 +1,31 @@
+"""Daily country statistics rollups for windowed leaderboards
+
+Revision ID: 0007_country_daily_stats
+Revises: 0006_battle_timeline
+Create Date: 2026-10-17 19:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_country_daily_stats'
+down_revision = '0006_battle_timeline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # (day, country_name) primary key doubles as the index for day-range sums.
+    # Existing history is rolled up by `python -m app.backfill_daily_stats`.
+    op.create_table(
+        'country_daily_stats',
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('country_name', sa.String(255), primary_key=True),
+        sa.Column('total_wins', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('total_second_place', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('total_third_place', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('total_battles', sa.Integer, nullable=False, server_default='0'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('country_daily_stats')
@@ -0,0 +1,65 @@
+"""
+Build the country_daily_stats rollups from existing battle history.
+
+New battles are rolled up as they are saved; this fills in the days before
+migration 0007 (or repairs any range). Works through history a few days at
+a time, each batch in its own short transaction that recomputes those days
+from battles + battle_results, so it is safe to re-run and to run while
+the app is serving.
+
+Run from backend/:
+    python -m app.backfill_daily_stats [--batch-days 7] [--since 2026-01-01] [--until 2026-10-01]
+"""
+import asyncio
+import logging
+import argparse
+import time
+from datetime import date, timedelta
+from app.database import engine
+from app.repository.battle_repo import BattleRepository
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+async def backfill(batch_days: int, since: date | None, until: date | None) -> None:
+    repo = BattleRepository()
+    bounds = await repo.get_started_day_range()
+    if bounds is None:
+        logger.info("No battles saved yet — nothing to backfill.")
+        return
+
+    start = since or bounds[0]
+    end = (until or bounds[1]) + timedelta(days=1)  # exclusive
+    logger.info(f"Rebuilding daily stats for {start} .. {end - timedelta(days=1)} in {batch_days}-day batches")
+    total_rows = 0
+    while start < end:
+        batch_end = min(start + timedelta(days=batch_days), end)
+        began = time.perf_counter()
+        rows = await repo.rebuild_daily_stats(start, batch_end)
+        total_rows += rows
+        logger.info(
+            f"  {start} .. {batch_end - timedelta(days=1)}: {rows} rows "
+            f"in {(time.perf_counter() - began) * 1000:.0f} ms"
+        )
+        start = batch_end
+    logger.info(f"Backfill complete: {total_rows} rollup rows written.")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-days", type=int, default=7, help="days rebuilt per transaction")
+    parser.add_argument("--since", type=date.fromisoformat, help="first UTC day (default: oldest battle)")
+    parser.add_argument("--until", type=date.fromisoformat, help="last UTC day (default: newest battle)")
+    args = parser.parse_args()
+    try:
+        await backfill(max(1, args.batch_days), args.since, args.until)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
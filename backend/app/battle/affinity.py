@@ -0,0 +1,127 @@
+import zlib
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.repository.affinity_repo import AffinityRepository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def stable_hash(user_id: str) -> int:
+    """Process-independent hash (unlike hash(), which PYTHONHASHSEED randomizes)."""
+    return zlib.crc32(user_id.encode())
+
+
+def user_key(user) -> str | None:
+    """Stable identifier for a TikTok user object, if it has one."""
+    if not user:
+        return None
+    user_id = getattr(user, "id", None) or getattr(user, "uid", None)
+    return str(user_id) if user_id else None
+
+
+class UserAffinityStore:
+    """
+    Remembers which battle country each viewer supports.
+    - Bounded LRU in memory (AFFINITY_CACHE_SIZE entries), so millions of
+      distinct gifters never grow memory past the cap.
+    - Users without an explicit choice get a stable-hash assignment, which
+      is identical across restarts and needs no persistence.
+    - Explicit choices (a comment naming a country) are buffered and written
+      through in batches every AFFINITY_FLUSH_SECONDS; startup warms the
+      cache from the AFFINITY_WARM_USERS most recently active users.
+    """
+
+    def __init__(
+        self,
+        repo: "AffinityRepository",
+        capacity: int | None = None,
+        flush_interval: float | None = None,
+    ):
+        self.repo = repo
+        self._capacity = capacity or settings.AFFINITY_CACHE_SIZE
+        self._flush_interval = flush_interval or settings.AFFINITY_FLUSH_SECONDS
+        self._cache: OrderedDict[str, str] = OrderedDict()
+        self._pending: dict[str, str] = {}
+        self._task: asyncio.Task | None = None
+
+    def pick(self, user, countries: list[str]) -> str:
+        """Battle country for a gifting user."""
+        if not countries:
+            return "Unknown"
+        key = user_key(user)
+        if key is None:
+            return countries[0]
+        country = self._cache.get(key)
+        if country is not None:
+            self._cache.move_to_end(key)
+            if country in countries:
+                return country
+        return countries[stable_hash(key) % len(countries)]
+
+    def choose(self, user, country: str) -> None:
+        """Record an explicit choice; persisted on the next flush."""
+        key = user_key(user)
+        if key is None or self._cache.get(key) == country:
+            return
+        self._remember(key, country)
+        self._pending[key] = country
+
+    def _remember(self, key: str, country: str) -> None:
+        self._cache[key] = country
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._capacity:
+            self._cache.popitem(last=False)
+
+    async def warm_up(self, limit: int | None = None) -> None:
+        """Load the most recently active users' choices from the database."""
+        try:
+            rows = await self.repo.load_recent(min(limit or settings.AFFINITY_WARM_USERS, self._capacity))
+        except Exception as e:
+            logger.warning(f"Affinity warm-up skipped: {e}")
+            return
+        # Oldest first, so the newest end up most-recently-used
+        for key, country in reversed(rows):
+            self._remember(key, country)
+        logger.info(f"Affinity cache warmed with {len(rows)} users.")
+
+    def start(self) -> None:
+        """Launch the write-through flush loop as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        try:
+            await self.repo.upsert_many(batch)
+        except Exception as e:
+            logger.warning(f"Affinity flush of {len(batch)} users failed, will retry: {e}")
+            # Newer choices made meanwhile take precedence
+            self._pending = {**batch, **self._pending}
+            if len(self._pending) > self._capacity:
+                self._pending = dict(list(self._pending.items())[-self._capacity:])
+
+    def stats(self) -> dict:
+        return {"cached": len(self._cache), "capacity": self._capacity, "pending_writes": len(self._pending)}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self.flush()
@@ -1,12 +1,19 @@
+import math
 import uuid
+import time
 import asyncio
 import logging
+from bisect import bisect_left
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING
+from app.ws.codec import NO_COUNTRY, dumps, encode_state, encode_table
+from app.battle.matcher import get_matcher
+from app.battle.timeline import ScoreTimeline
 
 if TYPE_CHECKING:
     from app.ws.manager import WebSocketManager
-    from app.repository.battle_repo import BattleRepository
+    from app.battle.outbox import ResultOutbox
+    from app.battle.journal import BattleJournal
 
 logger = logging.getLogger(__name__)
 
@@ -14,8 +21,16 @@ logger = logging.getLogger(__name__)
 class Battle:
     """
     Represents a single live battle between countries.
-    All score updates are in-memory; DB writes happen only on battle end.
+    All score updates are in-memory; the result is queued for the DB only on battle end.
+    With a journal attached, every accepted score change is also appended to
+    it so the battle can be rebuilt after a crash.
     An asyncio.Lock prevents double-ending race conditions.
+    Every state change bumps `version`; the encoded snapshot is cached per
+    (version, time_remaining) so all consumers share the same bytes.
+    Rankings are kept sorted incrementally: add_score moves only the changed
+    country (binary search), so lookups never re-sort the whole table.
+    The manager samples scores into `timeline` once per second; it is saved
+    with the result so the battle can be replayed.
     """
 
     def __init__(
@@ -24,20 +39,51 @@ class Battle:
         creator_username: str,
         countries: list[str],
         duration_seconds: int,
+        room: str | None = None,
+        journal: "BattleJournal | None" = None,
     ):
         self.id = battle_id
         self.creator_username = creator_username
+        self.room = room or creator_username
         self.countries = countries
         self.duration_seconds = duration_seconds
         self.started_at: datetime = datetime.now(timezone.utc)
+        self.started_monotonic: float = time.monotonic()
+        self.journal = journal
+
+        # Comment → country matcher, compiled once per country list
+        self.matcher = get_matcher(countries)
 
         # In-memory scores
         self.scores: dict[str, int] = {country: 0 for country in countries}
+        self.timeline = ScoreTimeline(countries, duration_seconds)
+
+        # Incremental ranking: parallel lists sorted by (-score, seq); ties keep country order
+        self._seq: dict[str, int] = {country: idx for idx, country in enumerate(self.scores)}
+        self._ranked_keys: list[tuple[int, int]] = [(0, idx) for idx in range(len(self.scores))]
+        self._ranked: list[str] = list(self.scores)
+        self._positions: dict[str, int] = {country: idx + 1 for idx, country in enumerate(self.scores)}
 
         # Concurrency safety
         self._lock = asyncio.Lock()
         self.battle_finished: bool = False
         self.last_gift: dict | None = None
+        self.gift_count: int = 0  # gifts received; tells clients a last_gift is new
+
+        # Monotonic state version + pre-encoded snapshot cache
+        self.version: int = 0
+        self._snapshot_key: tuple[int, int] | None = None
+        self._snapshot: bytes = b""
+        self._snapshot_text: str = ""
+        self._binary_table: bytes | None = None
+        self._binary_key: tuple[int, int] | None = None
+        self._binary: bytes = b""
+
+        # Changes not yet covered by a delta frame
+        self._delta_version: int = 0
+        self._delta_changed: set[str] = set()
+        self._delta_moved: set[str] = set()
+        self._delta_gift: bool = False
 
     def add_score(self, country: str, points: int, gift_info: dict | None = None) -> bool:
         """Thread-safe score add (no lock needed — asyncio single-threaded per event loop)."""
@@ -46,46 +92,167 @@ class Battle:
         if country not in self.scores:
             logger.warning(f"Country '{country}' not found in battle.")
             return False
-        self.scores[country] = max(0, self.scores[country] + points)
+        old_score = self.scores[country]
+        new_score = max(0, old_score + points)
+        self.scores[country] = new_score
+        if self.journal is not None:
+            self.journal.record_score(self, country, points, gift_info)
+        if new_score != old_score:
+            self._reposition(country, old_score, new_score)
+        self._delta_changed.add(country)
         if gift_info:
             self.last_gift = gift_info
+            self.gift_count += 1
+            self._delta_gift = True
+        self.version += 1
         return True
 
+    def _reposition(self, country: str, old_score: int, new_score: int) -> None:
+        """Move one country to its new rank and record every position that shifted."""
+        seq = self._seq[country]
+        old_idx = bisect_left(self._ranked_keys, (-old_score, seq))
+        del self._ranked_keys[old_idx]
+        del self._ranked[old_idx]
+        new_idx = bisect_left(self._ranked_keys, (-new_score, seq))
+        self._ranked_keys.insert(new_idx, (-new_score, seq))
+        self._ranked.insert(new_idx, country)
+        if new_idx == old_idx:
+            return
+        # Only the countries between the old and new slot changed position
+        for idx in range(min(old_idx, new_idx), max(old_idx, new_idx) + 1):
+            moved = self._ranked[idx]
+            self._positions[moved] = idx + 1
+            self._delta_moved.add(moved)
+
+    def position_of(self, country: str) -> int | None:
+        """Current 1-based position of a country."""
+        return self._positions.get(country)
+
     def get_rankings(self) -> list[dict]:
-        """Return countries sorted by score descending with their positions."""
-        sorted_countries = sorted(self.scores.items(), key=lambda x: x[1], reverse=True)
+        """
+        Return countries sorted by score descending with their positions.
+        Built fresh from the maintained order on every call (no sort), so
+        callers own the list: it is embedded in snapshots and saved results.
+        """
         return [
-            {"country": name, "score": score, "position": idx + 1}
-            for idx, (name, score) in enumerate(sorted_countries)
+            {"country": name, "score": self.scores[name], "position": idx + 1}
+            for idx, name in enumerate(self._ranked)
         ]
 
+    def restore_clock(self, started_at: datetime) -> None:
+        """Resume a replayed battle's countdown from its original wall-clock start."""
+        elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+        self.started_at = started_at
+        self.started_monotonic = time.monotonic() - max(0.0, elapsed)
+
+    def time_remaining(self) -> int:
+        """Whole seconds left on the battle clock (rounded up, so 0 means expired)."""
+        elapsed = time.monotonic() - self.started_monotonic
+        return max(0, math.ceil(self.duration_seconds - elapsed))
+
     def get_state(self) -> dict:
         """Return current battle state for WebSocket broadcast."""
-        now = datetime.now(timezone.utc)
-        elapsed = (now - self.started_at).total_seconds()
-        remaining = max(0, self.duration_seconds - elapsed)
         return {
             "type": "state_update",
             "battle_id": str(self.id),
+            "version": self.version,
             "creator_username": self.creator_username,
             "scores": self.scores.copy(),
             "rankings": self.get_rankings(),
-            "time_remaining": int(remaining),
+            "time_remaining": self.time_remaining(),
             "total_seconds": self.duration_seconds,
             "battle_finished": self.battle_finished,
             "last_gift": self.last_gift,
         }
 
+    def take_delta(self) -> dict:
+        """
+        Return a delta frame covering changes since the previous call and
+        start a new baseline. Scores and positions are absolute values, so a
+        client at any version >= base_version can apply it.
+        """
+        positions = {country: self._positions[country] for country in self._delta_moved}
+        delta = {
+            "type": "delta",
+            "battle_id": str(self.id),
+            "base_version": self._delta_version,
+            "version": self.version,
+            "time_remaining": self.time_remaining(),
+            "scores": {country: self.scores[country] for country in self._delta_changed},
+            "positions": positions,
+        }
+        if self._delta_gift:
+            delta["last_gift"] = self.last_gift
+
+        self._delta_version = self.version
+        self._delta_changed.clear()
+        self._delta_moved.clear()
+        self._delta_gift = False
+        return delta
+
+    def _refresh_snapshot(self) -> None:
+        key = (self.version, self.time_remaining())
+        if key != self._snapshot_key:
+            self._snapshot = dumps(self.get_state())
+            self._snapshot_text = self._snapshot.decode()
+            self._snapshot_key = key
+
+    def snapshot(self) -> bytes:
+        """Pre-encoded state_update JSON, rebuilt only when the state changes."""
+        self._refresh_snapshot()
+        return self._snapshot
+
+    def snapshot_text(self) -> str:
+        """Same snapshot as str, for WebSocket text frames."""
+        self._refresh_snapshot()
+        return self._snapshot_text
+
+    def binary_table(self) -> bytes:
+        """Binary TABLE frame (country index) for clients on the binary subprotocol."""
+        if self._binary_table is None:
+            self._binary_table = encode_table(self.id, self.creator_username, self.duration_seconds, self.countries)
+        return self._binary_table
+
+    def snapshot_binary(self) -> bytes:
+        """Binary STATE frame, cached like snapshot() per (version, time_remaining)."""
+        key = (self.version, self.time_remaining())
+        if key != self._binary_key:
+            gift = self.last_gift
+            self._binary = encode_state(
+                self.id,
+                self.version,
+                key[1],
+                self.battle_finished,
+                [self.scores[country] for country in self.countries],
+                [self._positions[country] for country in self.countries],
+                gift,
+                self._seq.get(gift.get("country"), NO_COUNTRY) if gift else NO_COUNTRY,
+                self.gift_count,
+            )
+            self._binary_key = key
+        return self._binary
+
+    def binary_frames(self) -> tuple[bytes, bytes] | None:
+        """
+        (TABLE, STATE) frames for binary clients, or None if they cannot be
+        built — binary clients then miss this frame, nobody else does.
+        """
+        try:
+            return self.binary_table(), self.snapshot_binary()
+        except Exception as e:
+            logger.warning(f"Could not encode binary frames for battle {self.id}: {e}")
+            return None
+
     async def end_battle(
         self,
         ws_manager: "WebSocketManager",
-        battle_repo: "BattleRepository",
+        outbox: "ResultOutbox",
     ) -> None:
         """
         Atomically end the battle:
         1. Acquire lock
         2. Check finished flag (prevent double-end)
-        3. Persist to DB in one transaction
+        3. Queue the result in the durable outbox (saved to the DB in the background)
         4. Set flag and broadcast game_over
         """
         async with self._lock:
@@ -97,11 +264,12 @@ class Battle:
             elapsed = int((now - self.started_at).total_seconds())
             rankings = self.get_rankings()
             winner = rankings[0]["country"] if rankings else None
+            self.timeline.sample(elapsed, self.scores)
 
             logger.info(f"Ending battle {self.id}, winner: {winner}")
 
             try:
-                await battle_repo.save_battle_result(
+                await outbox.put(
                     battle_id=self.id,
                     creator_username=self.creator_username,
                     started_at=self.started_at,
@@ -109,12 +277,18 @@ class Battle:
                     duration_seconds=elapsed,
                     winner_country=winner,
                     rankings=rankings,
+                    timeline=self.timeline.encode(),
                 )
             except Exception as e:
-                logger.exception(f"Failed to save battle {self.id}: {e}")
+                logger.exception(f"Failed to queue result of battle {self.id}: {e}")
                 raise
 
+            # Durable in the outbox — the journal no longer needs this battle's segments
+            if self.journal is not None:
+                self.journal.forget(self.id)
+
             self.battle_finished = True
+            self.version += 1
 
         # Broadcast outside the lock to avoid holding it during WS I/O
         await ws_manager.broadcast({
@@ -123,5 +297,5 @@ class Battle:
             "winner": winner,
             "rankings": rankings,
             "duration_seconds": elapsed,
-        })
+        }, room=self.room)
         logger.info(f"Battle {self.id} ended and broadcasted.")
@@ -0,0 +1,165 @@
+import uuid
+import time
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+from app.battle.battle import Battle
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.battle.manager import BattleManager
+    from app.repository.checkpoint_repo import CheckpointRepository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class BattleCheckpointer:
+    """
+    Background writer that mirrors live battles to Postgres every
+    CHECKPOINT_INTERVAL_SECONDS. Only battles whose version changed since the
+    previous checkpoint are written, headers and running scores as one batched
+    upsert; checkpoints of battles that ended are deleted in the same
+    transaction. Replicas and dashboards read live scores from these rows,
+    and startup restores battles from them when the local journal has none.
+    """
+
+    def __init__(
+        self,
+        battle_manager: "BattleManager",
+        repo: "CheckpointRepository",
+        interval: float | None = None,
+    ):
+        self.battle_manager = battle_manager
+        self.repo = repo
+        self._interval = interval or settings.CHECKPOINT_INTERVAL_SECONDS
+        self._written: dict[uuid.UUID, int] = {}  # battle id → last checkpointed version
+        self._live: set[uuid.UUID] = set()
+        self._task: asyncio.Task | None = None
+
+        # Counters
+        self.checkpoints: int = 0
+        self.skipped: int = 0
+        self.failures: int = 0
+        self.battles_written: int = 0
+        self.last_checkpoint_ms: float = 0.0
+
+    def start(self) -> None:
+        """Launch the checkpoint loop as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the loop and write a last checkpoint."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.checkpoint()
+
+    async def checkpoint(self) -> None:
+        """Write every battle whose state changed and drop checkpoints of ended ones."""
+        live = {
+            battle.id: battle
+            for battle in self.battle_manager.battles.values()
+            if not battle.battle_finished
+        }
+        changed = [battle for battle in live.values() if self._written.get(battle.id) != battle.version]
+        if not changed and live.keys() == self._live:
+            self.skipped += 1
+            return
+
+        battles, scores = [], []
+        for battle in changed:
+            battles.append({
+                "battle_id": battle.id,
+                "room": battle.room,
+                "creator_username": battle.creator_username,
+                "started_at": battle.started_at,
+                "duration_seconds": battle.duration_seconds,
+                "version": battle.version,
+                "last_gift": battle.last_gift,
+            })
+            for slot, country in enumerate(battle.countries):
+                scores.append({
+                    "battle_id": battle.id,
+                    "country_name": country,
+                    "slot": slot,
+                    "score": battle.scores[country],
+                    "position": battle.position_of(country),
+                })
+        # Captured before the await: scores may move on while the write is in flight
+        versions = {battle.id: battle.version for battle in changed}
+
+        started = time.perf_counter()
+        try:
+            await self.repo.write(
+                battles=battles,
+                scores=scores,
+                rooms=list(self.battle_manager.battles),
+                live_ids=list(live),
+            )
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Live checkpoint failed: {e}")
+            return
+
+        self._written.update(versions)
+        self._written = {battle_id: version for battle_id, version in self._written.items() if battle_id in live}
+        self._live = set(live)
+        self.checkpoints += 1
+        self.battles_written += len(changed)
+        self.last_checkpoint_ms = (time.perf_counter() - started) * 1000
+
+    async def load(self, strict: bool = False) -> list[Battle]:
+        """
+        Rebuild battles from their last checkpoint, oldest first. A failed
+        read returns no battles, or raises with `strict`.
+        """
+        try:
+            rows = await self.repo.load_live()
+        except Exception as e:
+            if strict:
+                raise
+            logger.warning(f"Could not load live checkpoints: {e}")
+            return []
+
+        battles = []
+        for row in rows:
+            entries = sorted(row.scores, key=lambda entry: entry.slot)
+            battle = Battle(
+                battle_id=row.battle_id,
+                creator_username=row.creator_username,
+                countries=[entry.country_name for entry in entries],
+                duration_seconds=row.duration_seconds,
+                room=row.room,
+            )
+            battle.restore_clock(row.started_at)
+            for entry in entries:
+                if entry.score:
+                    battle.add_score(entry.country_name, entry.score)
+            battle.last_gift = row.last_gift
+            battles.append(battle)
+        return battles
+
+    def stats(self) -> dict:
+        return {
+            "live_battles": len(self._live),
+            "checkpoints": self.checkpoints,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "battles_written": self.battles_written,
+            "last_checkpoint_ms": round(self.last_checkpoint_ms, 3),
+        }
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._interval)
+                await self.checkpoint()
+        except asyncio.CancelledError:
+            logger.info("Battle checkpointer stopped.")
+            raise
@@ -0,0 +1,156 @@
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import TYPE_CHECKING
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.repository.gift_event_repo import GiftEventRepository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# How often partitions are created ahead / dropped after retention
+MAINTENANCE_INTERVAL_SECONDS = 3600
+
+
+class GiftEventRecorder:
+    """
+    Buffers one row per scored gift and bulk-loads them into gift_events.
+    record() is a list append — no DB round-trip on the gift hot path. A
+    background task COPYs the buffer once it holds GIFT_EVENTS_BATCH_SIZE
+    rows or every GIFT_EVENTS_FLUSH_SECONDS, whichever comes first. If the
+    DB is unreachable rows are kept for the next flush, up to
+    GIFT_EVENTS_BUFFER_MAX; beyond that the oldest are shed.
+
+    The same task maintains the daily partitions: creating the next few
+    days ahead and dropping those older than GIFT_EVENTS_RETENTION_DAYS.
+    """
+
+    def __init__(
+        self,
+        repo: "GiftEventRepository",
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        buffer_max: int | None = None,
+        retention_days: int | None = None,
+    ):
+        self.repo = repo
+        self._batch_size = batch_size or settings.GIFT_EVENTS_BATCH_SIZE
+        self._flush_interval = flush_interval or settings.GIFT_EVENTS_FLUSH_SECONDS
+        self._buffer_max = buffer_max or settings.GIFT_EVENTS_BUFFER_MAX
+        self._retention_days = retention_days or settings.GIFT_EVENTS_RETENTION_DAYS
+        self._buffer: list[tuple] = []
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._next_maintenance: float = 0.0
+
+        # Counters
+        self.recorded: int = 0
+        self.written: int = 0
+        self.shed: int = 0
+        self.flushes: int = 0
+        self.failed_flushes: int = 0
+        self.last_flush_rows: int = 0
+        self.last_flush_ms: float = 0.0
+
+    def start(self) -> None:
+        """Launch the flush loop as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop, then write whatever is still buffered."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.flush()
+
+    def record(
+        self,
+        battle_id: uuid.UUID,
+        user_id: str | None,
+        nickname: str | None,
+        gift_name: str,
+        points: int,
+        country: str,
+    ) -> None:
+        """Buffer one scored gift."""
+        self._buffer.append(
+            (battle_id, user_id, nickname, gift_name, points, country, datetime.now(timezone.utc))
+        )
+        self.recorded += 1
+        if len(self._buffer) >= self._batch_size:
+            self._full.set()
+
+    async def flush(self) -> bool:
+        """COPY the buffered rows in one round-trip. Returns False if the write failed."""
+        if not self._buffer:
+            return True
+        rows, self._buffer = self._buffer, []
+        started = time.perf_counter()
+        try:
+            await self.repo.copy_events(rows)
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.warning(f"Failed to write {len(rows)} gift events: {e}")
+            # Keep them for the next flush; past the cap the oldest are shed
+            rows.extend(self._buffer)
+            if len(rows) > self._buffer_max:
+                self.shed += len(rows) - self._buffer_max
+                rows = rows[-self._buffer_max:]
+            self._buffer = rows
+            return False
+        self.flushes += 1
+        self.written += len(rows)
+        self.last_flush_rows = len(rows)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+        return True
+
+    async def maintain_partitions(self) -> None:
+        """Create upcoming daily partitions and drop those past retention."""
+        today = datetime.now(timezone.utc).date()
+        try:
+            await self.repo.ensure_partitions(today)
+            dropped = await self.repo.drop_partitions_before(today - timedelta(days=self._retention_days))
+        except Exception as e:
+            logger.warning(f"Gift event partition maintenance failed: {e}")
+            return
+        if dropped:
+            logger.info(f"Dropped expired gift event partitions: {', '.join(dropped)}")
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "recorded": self.recorded,
+            "written": self.written,
+            "shed": self.shed,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_rows": self.last_flush_rows,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+        }
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                if time.monotonic() >= self._next_maintenance:
+                    await self.maintain_partitions()
+                    self._next_maintenance = time.monotonic() + MAINTENANCE_INTERVAL_SECONDS
+                try:
+                    await asyncio.wait_for(self._full.wait(), timeout=self._flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._full.clear()
+                if not await self.flush():
+                    # Back off instead of retrying on every size trigger
+                    await asyncio.sleep(self._flush_interval)
+        except asyncio.CancelledError:
+            logger.info("Gift event recorder stopped.")
+            raise
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, NamedTuple
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.battle.battle import Battle
+    from app.battle.manager import BattleManager
+    from app.ws.scheduler import BroadcastScheduler
+    from app.battle.gift_log import GiftEventRecorder
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_LOW = "drop_low"
+
+
+class ScoreEvent(NamedTuple):
+    battle: "Battle"
+    country: str
+    points: int
+    gift_info: dict | None = None
+    user_id: str | None = None
+
+
+class GiftIngestor:
+    """
+    Bounded queue between TikTok event reception and scoring.
+    Listener callbacks only enqueue; one consumer drains the queue in
+    micro-batches, applies every score delta in a single pass and emits one
+    broadcast per touched battle per batch. Applied gifts are handed to the
+    gift event recorder, which persists them in bulk.
+
+    Overflow policy (when the queue is full):
+    - "block":    wait for room (backpressure into the TikTok client)
+    - "drop_low": drop events worth fewer than INGEST_DROP_BELOW_POINTS
+                  (likes/comments, Roses); higher-value gifts still block
+    """
+
+    def __init__(
+        self,
+        battle_manager: "BattleManager",
+        broadcaster: "BroadcastScheduler",
+        maxsize: int | None = None,
+        batch_size: int | None = None,
+        overflow_policy: str | None = None,
+        drop_below_points: int | None = None,
+        recorder: "GiftEventRecorder | None" = None,
+    ):
+        self.battle_manager = battle_manager
+        self.broadcaster = broadcaster
+        self.recorder = recorder
+        self._queue: asyncio.Queue[ScoreEvent] = asyncio.Queue(maxsize or settings.INGEST_QUEUE_SIZE)
+        self._batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        self._policy = overflow_policy or settings.INGEST_OVERFLOW_POLICY
+        if self._policy not in (OVERFLOW_BLOCK, OVERFLOW_DROP_LOW):
+            raise ValueError(f"Unknown ingest overflow policy '{self._policy}'")
+        self._drop_below = (
+            drop_below_points if drop_below_points is not None else settings.INGEST_DROP_BELOW_POINTS
+        )
+        self._task: asyncio.Task | None = None
+
+        # Counters
+        self.received: int = 0
+        self.applied: int = 0
+        self.dropped: int = 0
+        self.batches: int = 0
+        self.last_batch_size: int = 0
+        self.max_batch_size: int = 0
+        self.failed_batches: int = 0
+
+    def start(self) -> None:
+        """Launch the consumer as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the consumer, applying whatever is still queued."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        if not self._queue.empty():
+            self._apply(self._drain([]))
+
+    async def submit(self, event: ScoreEvent) -> bool:
+        """Enqueue a score event. Returns False if it was dropped by the overflow policy."""
+        self.received += 1
+        if self._queue.full() and self._policy == OVERFLOW_DROP_LOW and event.points < self._drop_below:
+            self.dropped += 1
+            return False
+        await self._queue.put(event)
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "overflow_policy": self._policy,
+            "received": self.received,
+            "applied": self.applied,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "failed_batches": self.failed_batches,
+        }
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                first = await self._queue.get()
+                batch = self._drain([first])
+                try:
+                    highlights = self._apply(batch)
+                    for battle in highlights:
+                        await self.broadcaster.flush_now(battle)
+                except Exception as e:
+                    # One bad batch must not stop scoring for every later gift
+                    self.failed_batches += 1
+                    logger.exception(f"Applying a batch of {len(batch)} score events failed: {e}")
+        except asyncio.CancelledError:
+            logger.info("Gift ingestor stopped.")
+            raise
+
+    def _drain(self, batch: list[ScoreEvent]) -> list[ScoreEvent]:
+        while len(batch) < self._batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _apply(self, batch: list[ScoreEvent]) -> list["Battle"]:
+        """
+        Apply a batch in one pass. Touched battles are marked dirty once;
+        battles that received a highlight gift are returned for an immediate flush.
+        """
+        touched: dict = {}
+        highlights: dict = {}
+        for event in batch:
+            battle = event.battle
+            # Events for a battle that has since been reset are discarded
+            if self.battle_manager.get_active_battle(battle.room) is not battle:
+                continue
+            if battle.add_score(event.country, event.points, gift_info=event.gift_info):
+                self.applied += 1
+                touched[battle.id] = battle
+                if event.gift_info:
+                    if self.recorder is not None:
+                        gift = event.gift_info
+                        self.recorder.record(
+                            battle.id, event.user_id, gift.get("user"), gift["gift"], event.points, event.country
+                        )
+                    if event.gift_info.get("is_lion"):
+                        highlights[battle.id] = battle
+
+        for battle_id, battle in touched.items():
+            if battle_id not in highlights:
+                self.broadcaster.mark_dirty(battle)
+
+        size = len(batch)
+        self.batches += 1
+        self.last_batch_size = size
+        if size > self.max_batch_size:
+            self.max_batch_size = size
+        return list(highlights.values())
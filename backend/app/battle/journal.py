@@ -0,0 +1,292 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import IO
+import orjson
+from app.battle.battle import Battle
+from app.ws.codec import dumps
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SEGMENT_SUFFIX = ".seg"
+
+
+class BattleJournal:
+    """
+    Append-only journal of live battle events, used to rebuild in-flight
+    battles after a crash or redeploy.
+
+    Each battle logs to its own directory of numbered segments: a "start"
+    record, then one record per score change. Appends only buffer in memory;
+    a background task writes and fsyncs everything buffered once per
+    JOURNAL_FSYNC_SECONDS (group commit) in a worker thread, so the event
+    loop never waits on disk. A battle's segments are deleted once its result
+    is saved, or when it is discarded by a reset.
+    """
+
+    def __init__(
+        self,
+        directory: str | None = None,
+        fsync_interval: float | None = None,
+        segment_bytes: int | None = None,
+    ):
+        self.directory = Path(directory or settings.JOURNAL_DIR)
+        self._interval = fsync_interval or settings.JOURNAL_FSYNC_SECONDS
+        self._segment_bytes = segment_bytes or settings.JOURNAL_SEGMENT_BYTES
+        self._buffer: dict[uuid.UUID, list[bytes]] = {}
+        self._forgotten: set[uuid.UUID] = set()
+        self._files: dict[uuid.UUID, IO[bytes]] = {}  # touched by the writer thread only
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+        # Counters
+        self.appended: int = 0
+        self.commits: int = 0
+        self.bytes_written: int = 0
+        self.failed_commits: int = 0
+        self.last_commit_ms: float = 0.0
+        self.replayed_events: int = 0
+
+    def start(self) -> None:
+        """Launch the group-commit loop as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the commit loop, then commit what is still buffered and close segments."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self.commit()
+        await asyncio.to_thread(self._close_all)
+
+    # --- Appends (non-blocking) ---
+
+    def open_battle(self, battle: Battle) -> None:
+        """Log the header a battle is rebuilt from."""
+        self._append(battle.id, {
+            "t": "start",
+            "id": str(battle.id),
+            "room": battle.room,
+            "creator": battle.creator_username,
+            "countries": battle.countries,
+            "duration": battle.duration_seconds,
+            "started_at": battle.started_at.isoformat(),
+        })
+
+    def record_score(self, battle: Battle, country: str, points: int, gift_info: dict | None) -> None:
+        record = {"t": "s", "c": country, "p": points}
+        if gift_info:
+            record["g"] = gift_info
+        self._append(battle.id, record)
+
+    def forget(self, battle_id: uuid.UUID) -> None:
+        """Compact a battle away: its segments are deleted on the next commit."""
+        self._buffer.pop(battle_id, None)
+        self._forgotten.add(battle_id)
+
+    def _append(self, battle_id: uuid.UUID, record: dict) -> None:
+        self._buffer.setdefault(battle_id, []).append(dumps(record) + b"\n")
+        self.appended += 1
+
+    # --- Group commit ---
+
+    async def commit(self) -> None:
+        """Write and fsync everything buffered so far, then delete forgotten battles."""
+        async with self._lock:
+            if not self._buffer and not self._forgotten:
+                return
+            pending, self._buffer = self._buffer, {}
+            forgotten, self._forgotten = self._forgotten, set()
+            started = time.perf_counter()
+            try:
+                written = await asyncio.to_thread(self._write, pending, forgotten)
+            except OSError as e:
+                # _write rolled the segments back, so retrying cannot double-count on replay
+                self.failed_commits += 1
+                logger.exception(f"Journal commit failed; retrying on the next commit: {e}")
+                self._requeue(pending, forgotten)
+                return
+            self.commits += 1
+            self.bytes_written += written
+            self.last_commit_ms = (time.perf_counter() - started) * 1000
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._interval)
+                # Shielded so a stop() mid-write never leaves two writer threads running
+                await asyncio.shield(self.commit())
+        except asyncio.CancelledError:
+            logger.info("Battle journal stopped.")
+            raise
+
+    def _requeue(self, pending: dict[uuid.UUID, list[bytes]], forgotten: set[uuid.UUID]) -> None:
+        """Put a failed commit back, ahead of anything appended while it ran."""
+        self._forgotten |= forgotten
+        for battle_id, records in pending.items():
+            if battle_id in self._forgotten:
+                continue
+            self._buffer[battle_id] = records + self._buffer.get(battle_id, [])
+
+    def _write(self, pending: dict[uuid.UUID, list[bytes]], forgotten: set[uuid.UUID]) -> int:
+        """Append every battle's records, all or nothing: on OSError the segments are truncated back."""
+        written = 0
+        starts: dict[uuid.UUID, tuple[str, int]] = {}
+        try:
+            for battle_id, records in pending.items():
+                data = b"".join(records)
+                handle = self._segment(battle_id, len(data))
+                starts[battle_id] = (handle.name, handle.tell())
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+                written += len(data)
+        except OSError:
+            self._rollback(starts)
+            raise
+        for battle_id in forgotten:
+            handle = self._files.pop(battle_id, None)
+            if handle is not None:
+                handle.close()
+            shutil.rmtree(self.directory / str(battle_id), ignore_errors=True)
+        return written
+
+    def _rollback(self, starts: dict[uuid.UUID, tuple[str, int]]) -> None:
+        """Truncate segments back to where a failed commit started writing."""
+        for battle_id, (path, size) in starts.items():
+            # Closed (dropping anything still buffered) and reopened by the next commit
+            handle = self._files.pop(battle_id, None)
+            if handle is not None:
+                try:
+                    handle.close()
+                except OSError:
+                    pass
+            try:
+                os.truncate(path, size)
+            except OSError as e:
+                logger.error(f"Could not roll back journal segment {path}; replay may double-count: {e}")
+
+    def _segment(self, battle_id: uuid.UUID, incoming: int) -> IO[bytes]:
+        """Open segment for a battle, rotating to a new one once it would exceed the size limit."""
+        handle = self._files.get(battle_id)
+        if handle is not None and (handle.tell() == 0 or handle.tell() + incoming <= self._segment_bytes):
+            return handle
+
+        battle_dir = self.directory / str(battle_id)
+        if handle is not None:
+            handle.close()
+            index = int(Path(handle.name).stem) + 1
+        else:
+            battle_dir.mkdir(parents=True, exist_ok=True)
+            existing = sorted(battle_dir.glob(f"*{SEGMENT_SUFFIX}"))
+            index = int(existing[-1].stem) + 1 if existing else 0
+        handle = open(battle_dir / f"{index:08d}{SEGMENT_SUFFIX}", "ab")
+        # Make the new segment's directory entry durable too
+        _fsync_dir(battle_dir)
+        if index == 0:
+            _fsync_dir(self.directory)
+        self._files[battle_id] = handle
+        return handle
+
+    def _close_all(self) -> None:
+        for handle in self._files.values():
+            handle.close()
+        self._files.clear()
+
+    # --- Replay ---
+
+    async def replay(self) -> list[Battle]:
+        """
+        Rebuild every battle that was still live when the process stopped,
+        oldest first. Segments are read and parsed in a worker thread.
+        """
+        logs = await asyncio.to_thread(self._read_all)
+        battles = []
+        for header, events in logs:
+            battle = Battle(
+                battle_id=uuid.UUID(header["id"]),
+                creator_username=header["creator"],
+                countries=header["countries"],
+                duration_seconds=header["duration"],
+                room=header["room"],
+            )
+            battle.restore_clock(datetime.fromisoformat(header["started_at"]))
+            for event in events:
+                battle.add_score(event["c"], event["p"], gift_info=event.get("g"))
+            # Attached after replay so replayed events are not journaled twice
+            battle.journal = self
+            battles.append(battle)
+            self.replayed_events += len(events)
+            logger.info(f"Replayed battle {battle.id} in room '{battle.room}' ({len(events)} events)")
+        return battles
+
+    def _read_all(self) -> list[tuple[dict, list[dict]]]:
+        logs = []
+        if not self.directory.is_dir():
+            return logs
+        for battle_dir in self.directory.iterdir():
+            if not battle_dir.is_dir():
+                continue
+            records: list[dict] = []
+            for segment in sorted(battle_dir.glob(f"*{SEGMENT_SUFFIX}")):
+                _read_segment(segment, records)
+            if not records or records[0].get("t") != "start":
+                logger.warning(f"Journal for {battle_dir.name} has no start record — removing it.")
+                shutil.rmtree(battle_dir, ignore_errors=True)
+                continue
+            logs.append((records[0], [record for record in records[1:] if record.get("t") == "s"]))
+        logs.sort(key=lambda log: log[0]["started_at"])
+        return logs
+
+    def stats(self) -> dict:
+        return {
+            "buffered_battles": len(self._buffer),
+            "appended": self.appended,
+            "commits": self.commits,
+            "failed_commits": self.failed_commits,
+            "bytes_written": self.bytes_written,
+            "last_commit_ms": round(self.last_commit_ms, 3),
+            "replayed_events": self.replayed_events,
+        }
+
+
+def _read_segment(path: Path, records: list[dict]) -> None:
+    """
+    Append a segment's records to `records`. A torn write at the end (crash
+    mid-append) is truncated away so later appends start on a clean line.
+    """
+    with open(path, "rb") as handle:
+        data = handle.read()
+    good = 0
+    while good < len(data):
+        end = data.find(b"\n", good)
+        if end == -1:
+            break
+        try:
+            records.append(orjson.loads(data[good:end]))
+        except orjson.JSONDecodeError:
+            break
+        good = end + 1
+    if good < len(data):
+        logger.warning(f"Torn journal write in {path} — truncating {len(data) - good} bytes.")
+        os.truncate(path, good)
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import logging
+from typing import TYPE_CHECKING, Awaitable, Callable
+import asyncpg
+from sqlalchemy.engine import make_url
+from app.battle.manager import default_room
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.battle.manager import BattleManager
+    from app.battle.checkpoint import BattleCheckpointer
+    from app.battle.tiktok import TikTokListener
+    from app.repository.battle_repo import BattleRepository
+    from app.ws.manager import WebSocketManager
+    from app.ws.bus import BroadcastBus
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Bus topic for admin commands forwarded from followers to a room's owner
+TOPIC = "command"
+# Server-side TCP keepalive on the lock connection, so Postgres notices a dead
+# owner (and frees its locks) within seconds rather than hours
+KEEPALIVE_SETTINGS = {"tcp_keepalives_idle": "5", "tcp_keepalives_interval": "1", "tcp_keepalives_count": "3"}
+
+CommandHandler = Callable[[dict], Awaitable[None]]
+
+
+def room_lock_key(room: str) -> int:
+    """Stable signed 64-bit advisory lock key for a room."""
+    digest = hashlib.blake2b(f"battle-room:{room}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class RoomLeadership:
+    """
+    Decides which process runs each creator room's battle, using Postgres
+    session-level advisory locks (one per room) held on a dedicated
+    connection. Only the owner of a room runs its battle: the countdown
+    timer, end_battle, checkpoints and — for the default room — the TikTok
+    listener. Other processes are followers for that room; admin commands
+    they receive are forwarded to the owner over the bus.
+
+    Every LEADER_POLL_SECONDS the loop checks the lock connection and tries
+    to take unowned rooms: the default room and every room with a live
+    checkpoint. If an owner dies its locks are released with its connection,
+    and the next process to poll takes the room over and resumes the battle
+    from its last checkpoint (or its own journal). If this process loses the
+    lock connection it stops running its rooms, since another process may
+    already own them.
+    """
+
+    def __init__(
+        self,
+        battle_manager: "BattleManager",
+        ws_manager: "WebSocketManager",
+        battle_repo: "BattleRepository",
+        checkpointer: "BattleCheckpointer",
+        bus: "BroadcastBus",
+        listener: "TikTokListener | None" = None,
+        dsn: str | None = None,
+        interval: float | None = None,
+    ):
+        self.battle_manager = battle_manager
+        self.ws_manager = ws_manager
+        self.battle_repo = battle_repo
+        self.checkpointer = checkpointer
+        self.bus = bus
+        self.listener = listener
+        self._dsn = dsn or make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self._interval = interval or settings.LEADER_POLL_SECONDS
+        self._conn: asyncpg.Connection | None = None
+        self._owned: set[str] = set()
+        self._lock = asyncio.Lock()  # serializes lock traffic on the single connection
+        self._handler: CommandHandler | None = None
+        self._command_tasks: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        bus.subscribe(TOPIC, self._on_command)
+
+        # Counters
+        self.acquired: int = 0
+        self.lost: int = 0
+        self.forwarded: int = 0
+        self.commands_run: int = 0
+        self.last_error: str | None = None
+
+    def set_command_handler(self, handler: CommandHandler) -> None:
+        """Coroutine that runs a forwarded command in a room this process owns."""
+        self._handler = handler
+
+    async def start(self) -> None:
+        """Claim whatever rooms are free right away, then keep polling in the background."""
+        await self.poll()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop claiming rooms and running forwarded commands. Rooms stay locked until close()."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._handler = None
+        if self._command_tasks:
+            await asyncio.gather(*self._command_tasks, return_exceptions=True)
+        if self.listener is not None and default_room() in self._owned:
+            await self.listener.stop()
+
+    async def close(self) -> None:
+        """
+        Release every room (closing the connection frees the locks). Called
+        after the final checkpoint, so the next owner resumes from it.
+        """
+        self._owned.clear()
+        await self._close()
+
+    def owns(self, room: str) -> bool:
+        return room in self._owned
+
+    def owned_rooms(self) -> list[str]:
+        return sorted(self._owned)
+
+    async def claim(self, room: str) -> bool:
+        """Own `room` if it is (or becomes) ours now. False if another process holds it."""
+        if room in self._owned:
+            return True
+        async with self._lock:
+            if room in self._owned:
+                return True
+            try:
+                conn = await self._connection()
+                got = await conn.fetchval("SELECT pg_try_advisory_lock($1)", room_lock_key(room), timeout=self._interval)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                self.last_error = str(e)
+                logger.warning(f"Could not try the lock for room '{room}': {e}")
+                return False
+            if not got:
+                return False
+            self._owned.add(room)
+        self.acquired += 1
+        logger.info(f"Acquired ownership of room '{room}'.")
+        try:
+            await self._take_over(room)
+        except Exception as e:
+            logger.exception(f"Taking over room '{room}' failed: {e}. Releasing it for the next poll.")
+            await self.release(room)
+            return False
+        return True
+
+    async def is_active(self, room: str) -> bool:
+        """Whether a room is in use: it has a live checkpoint or some process holds its lock."""
+        try:
+            if room in await self.checkpointer.repo.live_rooms():
+                return True
+        except Exception as e:
+            logger.warning(f"Could not list live rooms: {e}")
+        key = room_lock_key(room) & 0xFFFFFFFFFFFFFFFF
+        async with self._lock:
+            try:
+                conn = await self._connection()
+                # A bigint advisory key is stored as (classid, objid) = (high, low) 32 bits
+                return await conn.fetchval(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' "
+                    "AND classid = $1 AND objid = $2 AND objsubid = 1 AND granted)",
+                    key >> 32,
+                    key & 0xFFFFFFFF,
+                    timeout=self._interval,
+                )
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                self.last_error = str(e)
+                logger.warning(f"Could not look up the owner of room '{room}': {e}")
+                return False
+
+    def forward(self, room: str, command: dict) -> bool:
+        """Send an admin command to the room's owner. False if no shared bus can reach it."""
+        if not self.bus.distributed:
+            return False
+        self.bus.publish(TOPIC, {**command, "room": room})
+        self.forwarded += 1
+        return True
+
+    async def poll(self) -> None:
+        """Check the lock connection, then try to take every unowned room that needs an owner."""
+        if not await self._alive():
+            await self._step_down()
+        try:
+            rooms = {default_room(), *await self.checkpointer.repo.live_rooms()}
+        except Exception as e:
+            logger.warning(f"Could not list live rooms: {e}")
+            rooms = {default_room()}
+        for room in sorted(rooms - self._owned):
+            await self.claim(room)
+
+    def stats(self) -> dict:
+        return {
+            "owned_rooms": self.owned_rooms(),
+            "acquired": self.acquired,
+            "lost": self.lost,
+            "forwarded": self.forwarded,
+            "commands_run": self.commands_run,
+            "last_error": self.last_error,
+        }
+
+    async def _take_over(self, room: str) -> None:
+        """Run a newly owned room: resume its battle from the last persisted state."""
+        # Strict: with no checkpoints to compare against, the journal can't be trusted either
+        checkpoints = [battle for battle in await self.checkpointer.load(strict=True) if battle.room == room]
+        resumed = await self.battle_manager.recover(
+            self.ws_manager, self.battle_repo, checkpoints=checkpoints, rooms={room}, checkpointed_only=True
+        )
+        if room != default_room():
+            return
+        if not resumed:
+            await self.battle_manager.start_battle(
+                creator_username=settings.TIKTOK_USERNAME or "system",
+                countries=None,
+                duration_seconds=None,
+                ws_manager=self.ws_manager,
+                room=room,
+            )
+        if self.listener is not None:
+            await self.listener.start()
+
+    async def release(self, room: str) -> None:
+        """Give up a room (e.g. one we failed to take over), so this or another process can claim it."""
+        self._owned.discard(room)
+        self.battle_manager.release(room)
+        if self.listener is not None and room == default_room():
+            await self.listener.stop()
+        async with self._lock:
+            if self._conn is None or self._conn.is_closed():
+                return
+            try:
+                await self._conn.fetchval("SELECT pg_advisory_unlock($1)", room_lock_key(room), timeout=self._interval)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                # Session locks are re-entrant, so the next poll can still retry the take-over
+                self.last_error = str(e)
+                logger.warning(f"Could not unlock room '{room}': {e}")
+
+    async def _step_down(self) -> None:
+        """The lock connection is gone, and with it every lock: stop running our rooms."""
+        if not self._owned:
+            return
+        rooms, self._owned = self._owned, set()
+        self.lost += len(rooms)
+        for room in rooms:
+            logger.warning(f"Lost ownership of room '{room}'; releasing its battle.")
+            self.battle_manager.release(room)
+        if self.listener is not None and default_room() in rooms:
+            await self.listener.stop()
+
+    async def _alive(self) -> bool:
+        """Whether every lock we think we hold is still held."""
+        if self._conn is None or self._conn.is_closed():
+            return not self._owned
+        async with self._lock:
+            try:
+                await self._conn.fetchval("SELECT 1", timeout=self._interval)
+                return True
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                self.last_error = str(e)
+                await self._close()
+                return False
+
+    async def _connection(self) -> asyncpg.Connection:
+        if self._conn is None or self._conn.is_closed():
+            self._conn = await asyncpg.connect(self._dsn, server_settings=KEEPALIVE_SETTINGS)
+        return self._conn
+
+    async def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.is_closed():
+            conn.terminate()
+
+    def _on_command(self, command: dict) -> None:
+        """Bus subscriber: run a forwarded command if this process owns its room."""
+        if self._handler is None or command.get("room") not in self._owned:
+            return
+        task = asyncio.create_task(self._run_command(command))
+        self._command_tasks.add(task)
+        task.add_done_callback(self._command_tasks.discard)
+
+    async def _run_command(self, command: dict) -> None:
+        try:
+            await self._handler(command)
+            self.commands_run += 1
+        except Exception as e:
+            logger.warning(f"Forwarded command {command.get('op')} for room '{command.get('room')}' failed: {e}")
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._interval)
+                try:
+                    await self.poll()
+                except Exception as e:
+                    self.last_error = str(e)
+                    logger.warning(f"Room leadership poll failed: {e}")
+        except asyncio.CancelledError:
+            logger.info("Room leadership stopped.")
+            raise
@@ -1,30 +1,57 @@
 import uuid
+import time
 import asyncio
 import logging
-from datetime import datetime, timezone
 from typing import TYPE_CHECKING
 from app.battle.battle import Battle
+from app.battle.timer import TimerWheel, TimerHandle
 from app.config import get_settings
 
 if TYPE_CHECKING:
     from app.ws.manager import WebSocketManager
+    from app.ws.scheduler import BroadcastScheduler
     from app.repository.battle_repo import BattleRepository
+    from app.battle.journal import BattleJournal
+    from app.battle.outbox import ResultOutbox
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+def default_room() -> str:
+    """Room used by the legacy un-scoped endpoints (/ws, /reset, ...)."""
+    return settings.TIKTOK_USERNAME or "system"
+
+
 class BattleManager:
     """
-    Manages the single active battle instance.
-    Structured to support future multi-creator battles with minimal refactoring:
-    - Replace `current_battle` dict with {creator_id: Battle}
-    - Add `start_battle(creator_id, ...)` keyed routing
+    Registry of concurrent battles, one per creator room.
+    Lookups by room and by battle id are dict-based, so routing stays O(1)
+    however many rooms are live. The broadcaster, WS manager, repository and
+    timer wheel are shared across all rooms, as are the result outbox and the
+    optional crash-recovery journal.
     """
 
-    def __init__(self):
-        self.current_battle: Battle | None = None
-        self._timer_task: asyncio.Task | None = None
+    def __init__(
+        self,
+        broadcaster: "BroadcastScheduler",
+        timer_wheel: TimerWheel,
+        outbox: "ResultOutbox",
+        journal: "BattleJournal | None" = None,
+    ):
+        self.broadcaster = broadcaster
+        self.timer_wheel = timer_wheel
+        self.outbox = outbox
+        self.journal = journal
+        self.battles: dict[str, Battle] = {}
+        self._by_id: dict[uuid.UUID, Battle] = {}
+        self._timers: dict[str, TimerHandle] = {}
+        self._end_tasks: set[asyncio.Task] = set()
+
+    @property
+    def current_battle(self) -> Battle | None:
+        """Battle in the default room."""
+        return self.battles.get(default_room())
 
     async def start_battle(
         self,
@@ -32,86 +59,260 @@ class BattleManager:
         countries: list[str] | None,
         duration_seconds: int | None,
         ws_manager: "WebSocketManager",
-        battle_repo: "BattleRepository",
+        room: str | None = None,
     ) -> Battle:
-        """Start a new battle, canceling any existing one without saving it."""
-        await self._cancel_timer()
+        """Start a new battle in a room, canceling any existing one there without saving it."""
+        room = room or default_room()
+        self._cancel_timer(room)
+        self._drop(room)
 
         if countries is None:
             countries = settings.countries_list
         if duration_seconds is None:
             duration_seconds = settings.BATTLE_DURATION_SECONDS
+        # The score timeline is preallocated for the whole battle
+        duration_seconds = max(1, min(duration_seconds, settings.BATTLE_MAX_DURATION_SECONDS))
 
         battle = Battle(
             battle_id=uuid.uuid4(),
             creator_username=creator_username,
             countries=countries,
             duration_seconds=duration_seconds,
+            room=room,
+            journal=self.journal,
         )
-        self.current_battle = battle
+        if self.journal is not None:
+            self.journal.open_battle(battle)
+        self.battles[room] = battle
+        self._by_id[battle.id] = battle
 
         # Broadcast initial state
-        await ws_manager.broadcast(battle.get_state())
+        binary = battle.binary_frames() if ws_manager.wants_binary(room) else None
+        await ws_manager.broadcast_state(battle.snapshot_text(), room=room, binary=binary)
 
         # Start countdown timer
-        self._timer_task = asyncio.create_task(
-            self._run_timer(battle, ws_manager, battle_repo)
-        )
+        self._schedule_tick(battle, 1, ws_manager)
 
-        logger.info(f"Battle started: {battle.id} by {creator_username}")
+        logger.info(f"Battle started: {battle.id} by {creator_username} in room '{room}'")
         return battle
 
-    async def _run_timer(
+    async def recover(
         self,
-        battle: Battle,
         ws_manager: "WebSocketManager",
         battle_repo: "BattleRepository",
-    ) -> None:
-        """Countdown timer — ticks every second, ends battle when time expires."""
-        try:
-            while not battle.battle_finished:
-                await asyncio.sleep(1)
-                if battle.battle_finished:
-                    break
-                # Broadcast current state every second so clients see live countdown
-                await ws_manager.broadcast(battle.get_state())
-                # Check if time has expired
-                elapsed = (datetime.now(timezone.utc) - battle.started_at).total_seconds()
-                if elapsed >= battle.duration_seconds:
-                    logger.info(f"Timer expired for battle {battle.id}. Auto-ending.")
-                    await battle.end_battle(ws_manager, battle_repo)
-                    break
-        except asyncio.CancelledError:
-            logger.info(f"Timer cancelled for battle {battle.id}")
-
-    async def _cancel_timer(self) -> None:
-        if self._timer_task and not self._timer_task.done():
-            self._timer_task.cancel()
+        checkpoints: list[Battle] | None = None,
+        rooms: set[str] | None = None,
+        checkpointed_only: bool = False,
+    ) -> list[Battle]:
+        """
+        Resume battles interrupted by a crash, redeploy or change of owner:
+        from the local journal and from Postgres checkpoints. When both hold
+        the same battle, the journal copy is used, topped up to any higher
+        checkpointed score (another owner may have continued it). Battles
+        whose time ran out while the process was down are ended (and saved)
+        right away; the rest continue their countdown where they were.
+        `rooms` limits recovery to those rooms. With `checkpointed_only` (a
+        take-over), a journaled battle without a live checkpoint is forgotten
+        instead: its checkpoint is deleted when the battle ends, so another
+        owner finished or replaced it meanwhile. Battles younger than one
+        checkpoint interval are exempt, as they may not have been written
+        yet. Returns the battles that are live again.
+        """
+        candidates = await self.journal.replay() if self.journal is not None else []
+        if rooms is not None:
+            candidates = [battle for battle in candidates if battle.room in rooms]
+        journaled = {battle.id: battle for battle in candidates}
+        checkpointed = set()
+        for battle in checkpoints or []:
+            if rooms is not None and battle.room not in rooms:
+                continue
+            checkpointed.add(battle.id)
+            own = journaled.get(battle.id)
+            if own is None:
+                self._adopt(battle)
+                candidates.append(battle)
+                continue
+            for country, score in battle.scores.items():
+                if score > own.scores.get(country, score):
+                    own.add_score(country, score - own.scores[country])
+        candidates.sort(key=lambda battle: battle.started_at)
+
+        if checkpointed_only:
+            now = time.monotonic()
+            for battle in [battle for battle in candidates if battle.id not in checkpointed]:
+                if now - battle.started_monotonic < settings.CHECKPOINT_INTERVAL_SECONDS:
+                    continue
+                logger.info(f"Journaled battle {battle.id} has no live checkpoint. Forgetting it.")
+                self.journal.forget(battle.id)
+                candidates.remove(battle)
+
+        resumed = []
+        for battle in candidates:
+            # Queued or saved just before the crash, but not compacted yet
+            if self.outbox.contains(battle.id):
+                if self.journal is not None:
+                    self.journal.forget(battle.id)
+                continue
             try:
-                await self._timer_task
-            except asyncio.CancelledError:
-                pass
-        self._timer_task = None
-
-    def get_active_battle(self) -> Battle | None:
-        """Return the current active (unfinished) battle, or None."""
-        if self.current_battle and not self.current_battle.battle_finished:
-            return self.current_battle
+                already_saved = await battle_repo.get_battle_by_id(battle.id) is not None
+            except Exception as e:
+                logger.warning(f"Could not check whether battle {battle.id} was saved: {e}")
+                already_saved = False
+            if already_saved:
+                if self.journal is not None:
+                    self.journal.forget(battle.id)
+                continue
+
+            if battle.time_remaining() == 0:
+                logger.info(f"Recovered battle {battle.id} expired while down. Ending it.")
+                try:
+                    await battle.end_battle(ws_manager, self.outbox)
+                except Exception as e:
+                    # Left in the journal, so the next startup retries
+                    logger.warning(f"Recovered battle {battle.id} could not be ended: {e}")
+                continue
+
+            # A later battle in the same room replaces an earlier one, as a reset would
+            self._cancel_timer(battle.room)
+            self._drop(battle.room)
+            self.battles[battle.room] = battle
+            self._by_id[battle.id] = battle
+
+            elapsed = int(time.monotonic() - battle.started_monotonic)
+            self._schedule_tick(battle, elapsed + 1, ws_manager)
+            self.broadcaster.mark_dirty(battle)
+            resumed.append(battle)
+            logger.info(
+                f"Resumed battle {battle.id} in room '{battle.room}' "
+                f"with {battle.time_remaining()}s remaining"
+            )
+        return resumed
+
+    def _adopt(self, battle: Battle) -> None:
+        """Start journaling a battle restored from elsewhere, seeded with its current scores."""
+        if self.journal is None:
+            return
+        battle.journal = self.journal
+        self.journal.open_battle(battle)
+        for country, score in battle.scores.items():
+            if score:
+                self.journal.record_score(battle, country, score, None)
+
+    def _schedule_tick(
+        self,
+        battle: Battle,
+        tick: int,
+        ws_manager: "WebSocketManager",
+    ) -> None:
+        """Arm the battle's next countdown tick at start + `tick` seconds (drift-free)."""
+        deadline = battle.started_monotonic + min(tick, battle.duration_seconds)
+        self._timers[battle.room] = self.timer_wheel.call_at(
+            deadline, lambda: self._on_tick(battle, tick, ws_manager)
+        )
+
+    def _on_tick(
+        self,
+        battle: Battle,
+        tick: int,
+        ws_manager: "WebSocketManager",
+    ) -> None:
+        """Countdown tick — schedules a frame, ends the battle when time expires."""
+        if battle.battle_finished:
+            return
+        # Schedule a frame every second so clients see live countdown
+        self.broadcaster.mark_dirty(battle)
+        battle.timeline.sample(tick, battle.scores)
+        if tick >= battle.duration_seconds:
+            logger.info(f"Timer expired for battle {battle.id}. Auto-ending.")
+            self._timers.pop(battle.room, None)
+            self._end(battle, ws_manager)
+            return
+        self._schedule_tick(battle, tick + 1, ws_manager)
+
+    def _end(self, battle: Battle, ws_manager: "WebSocketManager", attempt: int = 0) -> None:
+        """End an expired battle in the background; retried if its result can't be queued."""
+        task = asyncio.create_task(battle.end_battle(ws_manager, self.outbox))
+        self._end_tasks.add(task)
+        task.add_done_callback(self._end_tasks.discard)
+        task.add_done_callback(lambda done: self._on_end_done(done, battle, ws_manager, attempt))
+
+    def _on_end_done(
+        self,
+        task: asyncio.Task,
+        battle: Battle,
+        ws_manager: "WebSocketManager",
+        attempt: int,
+    ) -> None:
+        """
+        Re-arm the end of a battle whose result could not be queued, with
+        backoff (OUTBOX_RETRY_BASE_SECONDS doubling up to
+        OUTBOX_RETRY_MAX_SECONDS) — otherwise it would sit at 0s forever.
+        A reset or release cancels the retry like any other timer.
+        """
+        if task.cancelled() or task.exception() is None:
+            return
+        if battle.battle_finished or self.battles.get(battle.room) is not battle:
+            return
+        delay = min(settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** attempt, settings.OUTBOX_RETRY_MAX_SECONDS)
+        logger.warning(f"Ending battle {battle.id} failed (attempt {attempt + 1}); retrying in {delay:g}s.")
+        self._timers[battle.room] = self.timer_wheel.call_at(
+            time.monotonic() + delay, lambda: self._end(battle, ws_manager, attempt + 1)
+        )
+
+    def _cancel_timer(self, room: str) -> None:
+        self.timer_wheel.cancel(self._timers.pop(room, None))
+
+    def _drop(self, room: str, forget: bool = True) -> None:
+        """Forget a room's battle (no save) and any frame still pending for it."""
+        battle = self.battles.pop(room, None)
+        if battle is not None:
+            self._by_id.pop(battle.id, None)
+            self.broadcaster.discard(battle)
+            if forget and self.journal is not None:
+                self.journal.forget(battle.id)
+
+    def release(self, room: str) -> None:
+        """
+        Stop running a room's battle without ending it, because another
+        process now owns the room. Its journal is kept, in case this process
+        takes the room back.
+        """
+        self._cancel_timer(room)
+        self._drop(room, forget=False)
+
+    def get_active_battle(self, room: str | None = None) -> Battle | None:
+        """Return the active (unfinished) battle in a room, or None."""
+        battle = self.battles.get(room or default_room())
+        if battle and not battle.battle_finished:
+            return battle
         return None
 
+    def get_battle_by_id(self, battle_id: uuid.UUID) -> Battle | None:
+        """Return a live battle by id, in any room."""
+        return self._by_id.get(battle_id)
+
+    def active_rooms(self) -> list[str]:
+        """Rooms that currently have an unfinished battle."""
+        return [room for room, battle in self.battles.items() if not battle.battle_finished]
+
     async def reset_battle(
         self,
         ws_manager: "WebSocketManager",
-        battle_repo: "BattleRepository",
         creator_username: str = "admin",
+        room: str | None = None,
     ) -> Battle:
         """Reset (replace) the active battle without saving current one."""
-        await self._cancel_timer()
-        self.current_battle = None
         return await self.start_battle(
             creator_username=creator_username,
             countries=None,
             duration_seconds=None,
             ws_manager=ws_manager,
-            battle_repo=battle_repo,
+            room=room,
         )
+
+    async def shutdown(self) -> None:
+        """Cancel every room's timer and wait for battles that are mid-end."""
+        for room in list(self._timers):
+            self._cancel_timer(room)
+        if self._end_tasks:
+            await asyncio.gather(*self._end_tasks, return_exceptions=True)
@@ -0,0 +1,162 @@
+import re
+from functools import lru_cache
+from app.config import get_settings
+
+settings = get_settings()
+
+# Built-in aliases; extend or override per deployment with COUNTRY_ALIASES
+DEFAULT_ALIASES: dict[str, list[str]] = {
+    "Turkey": ["Türkiye", "Turkiye", "Turkiya"],
+    "Saudi Arabia": ["KSA", "Saudi", "السعودية"],
+    "Egypt": ["Misr", "Masr", "مصر"],
+    "Pakistan": ["PAK", "پاکستان"],
+    "United States": ["USA", "America"],
+    "United Kingdom": ["UK", "Britain", "England"],
+    "United Arab Emirates": ["UAE", "Emirates", "الإمارات"],
+    "Morocco": ["Maroc", "المغرب"],
+    "Algeria": ["Algérie", "Dzair", "الجزائر"],
+    "Iraq": ["العراق"],
+    "Germany": ["Deutschland"],
+    "India": ["Bharat"],
+}
+
+# ISO 3166 alpha-2 codes, used to derive flag emoji (🇹🇷 = regional indicators T + R)
+COUNTRY_CODES: dict[str, str] = {
+    "Turkey": "TR", "Saudi Arabia": "SA", "Egypt": "EG", "Pakistan": "PK",
+    "United States": "US", "United Kingdom": "GB", "United Arab Emirates": "AE",
+    "Russia": "RU", "China": "CN", "India": "IN", "Brazil": "BR", "France": "FR",
+    "Germany": "DE", "Japan": "JP", "Morocco": "MA", "Algeria": "DZ", "Tunisia": "TN",
+    "Iraq": "IQ", "Jordan": "JO", "Syria": "SY", "Lebanon": "LB", "Kuwait": "KW",
+    "Qatar": "QA", "Oman": "OM", "Libya": "LY", "Sudan": "SD", "Yemen": "YE",
+    "Iran": "IR", "Afghanistan": "AF", "Bangladesh": "BD", "Indonesia": "ID",
+    "Malaysia": "MY", "Philippines": "PH", "Vietnam": "VN", "Thailand": "TH",
+    "Nigeria": "NG", "Mexico": "MX", "Argentina": "AR", "Colombia": "CO",
+    "Spain": "ES", "Italy": "IT", "Canada": "CA", "Azerbaijan": "AZ",
+    "Kazakhstan": "KZ", "Uzbekistan": "UZ", "South Korea": "KR", "Poland": "PL",
+    "Ukraine": "UA", "Romania": "RO", "Netherlands": "NL", "Somalia": "SO",
+}
+
+# Aliases this short (KSA, UAE, UK) only match as whole words
+_WHOLE_WORD_MAX_LEN = 3
+# Up to this many terms, testing each with `in` beats the trie regex; measured
+# crossover by benchmarks/bench_comment_matcher.py
+SCAN_MAX_TERMS = 4
+
+
+def flag_emoji(code: str) -> str:
+    """ISO alpha-2 code → flag emoji."""
+    return "".join(chr(0x1F1E6 + ord(ch) - ord("A")) for ch in code.upper())
+
+
+def _trie_pattern(node: dict) -> str:
+    """
+    Render a character trie as a regex. Shared prefixes are factored out,
+    so the engine tests each comment position against one branch per
+    distinct next character instead of every alias in turn.
+    """
+    terminal = "" in node
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 and len(branches[0]) == 1 else f"(?:{'|'.join(branches)})"
+    # Greedy optional suffix: the longest alias wins ("saudi arabia" over "saudi")
+    return f"{body}?" if terminal else body
+
+
+class CountryMatcher:
+    """
+    Precompiled multi-pattern matcher for country mentions in comments.
+    Country names, aliases and flag emoji are merged into one trie-shaped
+    regex over lowercased terms; each comment is lowercased once and scanned
+    in a single pass (re.IGNORECASE is avoided — it is several times slower).
+    Small term sets (up to SCAN_MAX_TERMS) skip the regex: a substring test
+    per term is cheaper than driving the regex engine. Either way, returns the
+    country mentioned first in the comment (the longest term at that spot).
+    """
+
+    def __init__(
+        self,
+        countries: list[str],
+        aliases: dict[str, list[str]] | None = None,
+        scan_max_terms: int | None = None,
+    ):
+        aliases = aliases or {}
+        self._lookup: dict[str, str] = {}
+        self._whole_word: set[str] = set()
+        for country in countries:
+            terms = [country, *aliases.get(country, [])]
+            if country in COUNTRY_CODES:
+                terms.append(flag_emoji(COUNTRY_CODES[country]))
+            for term in terms:
+                key = term.strip().lower()
+                if not key or key in self._lookup:
+                    continue
+                self._lookup[key] = country
+                if len(key) <= _WHOLE_WORD_MAX_LEN and key.isalpha():
+                    self._whole_word.add(key)
+
+        self._scan_terms: list[tuple[str, str]] | None = None
+        self._pattern = None
+        if len(self._lookup) <= (SCAN_MAX_TERMS if scan_max_terms is None else scan_max_terms):
+            # Longest first, so the longest term at a position wins ties
+            self._scan_terms = sorted(self._lookup.items(), key=lambda item: -len(item[0]))
+            return
+        trie: dict = {}
+        for key in self._lookup:
+            node = trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+        self._pattern = re.compile(_trie_pattern(trie)) if trie else None
+
+    def match(self, text: str) -> str | None:
+        if not text:
+            return None
+        text = text.lower()
+        if self._scan_terms is not None:
+            # `in` is the cheap common case: most comments mention no country at all
+            for idx, (key, country) in enumerate(self._scan_terms):
+                if key in text:
+                    return self._first(text, self._scan_terms[idx:])
+            return None
+        if self._pattern is None:
+            return None
+        pos = 0
+        while True:
+            found = self._pattern.search(text, pos)
+            if found is None:
+                return None
+            key = found.group(0)
+            if key not in self._whole_word or self._is_word(text, found.start(), found.end()):
+                country = self._lookup.get(key)
+                if country is not None:
+                    return country
+            pos = found.start() + 1
+
+    def _first(self, text: str, terms: list[tuple[str, str]]) -> str | None:
+        """Of `terms` (longest first), the country whose whole-word match comes first in `text`."""
+        best, best_start = None, len(text)
+        for key, country in terms:
+            start = text.find(key)
+            while start >= 0 and key in self._whole_word and not self._is_word(text, start, start + len(key)):
+                start = text.find(key, start + 1)
+            if 0 <= start < best_start:
+                best, best_start = country, start
+        return best
+
+    @staticmethod
+    def _is_word(text: str, start: int, end: int) -> bool:
+        return (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+
+
+@lru_cache(maxsize=64)
+def _cached_matcher(countries: tuple[str, ...]) -> CountryMatcher:
+    aliases = {country: list(terms) for country, terms in DEFAULT_ALIASES.items()}
+    for country, terms in settings.country_aliases.items():
+        aliases.setdefault(country, []).extend(terms)
+    return CountryMatcher(list(countries), aliases)
+
+
+def get_matcher(countries: list[str]) -> CountryMatcher:
+    """Matcher for a country list, compiled once per distinct list."""
+    return _cached_matcher(tuple(countries))
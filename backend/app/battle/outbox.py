@@ -0,0 +1,267 @@
+import os
+import base64
+import time
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import TYPE_CHECKING
+import orjson
+from sqlalchemy.exc import DataError, IntegrityError, ProgrammingError
+from app.ws.codec import dumps
+from app.config import get_settings
+
+if TYPE_CHECKING:
+    from app.repository.battle_repo import BattleRepository
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ENTRY_SUFFIX = ".json"
+# Errors the database will raise again however often the entry is retried
+PERMANENT_ERRORS = (DataError, IntegrityError, ProgrammingError)
+
+
+class ResultOutbox:
+    """
+    Durable local queue of finished-battle results, so ending a battle never
+    waits on Postgres.
+
+    put() writes the result to its own file (write, fsync, atomic rename) and
+    returns; game_over can go out right away. A background drainer delivers
+    entries oldest first through BattleRepository.save_battle_result — which
+    is idempotent, so a redelivery after a crash is harmless — and deletes
+    each file once it is saved. Failures are retried with exponential backoff
+    per entry (OUTBOX_RETRY_BASE_SECONDS doubling up to
+    OUTBOX_RETRY_MAX_SECONDS), so an entry that keeps failing doesn't hold
+    back the ones behind it. Entries the database rejects outright (bad
+    data, constraint or SQL errors) are moved aside as `.failed` files
+    instead of retried. Entries left on disk at shutdown are delivered after
+    the next startup.
+    """
+
+    def __init__(
+        self,
+        repo: "BattleRepository",
+        directory: str | None = None,
+        retry_base: float | None = None,
+        retry_max: float | None = None,
+    ):
+        self.repo = repo
+        self.directory = Path(directory or settings.OUTBOX_DIR)
+        self._retry_base = retry_base or settings.OUTBOX_RETRY_BASE_SECONDS
+        self._retry_max = retry_max or settings.OUTBOX_RETRY_MAX_SECONDS
+        # battle id → (entry file, wall-clock time it was queued); insertion order = delivery order
+        self._entries: dict[uuid.UUID, tuple[Path, float]] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        # battle id → (current retry delay, monotonic time of the next attempt)
+        self._backoff: dict[uuid.UUID, tuple[float, float]] = {}
+
+        # Counters
+        self.queued: int = 0
+        self.delivered: int = 0
+        self.failures: int = 0
+        self.set_aside: int = 0
+        self.last_error: str | None = None
+
+    async def load(self) -> int:
+        """Pick up entries a previous process left undelivered. Returns how many."""
+        paths = await asyncio.to_thread(self._scan)
+        for path in paths:
+            queued_at, _, battle_id = path.stem.partition("-")
+            try:
+                self._entries[uuid.UUID(battle_id)] = (path, int(queued_at) / 1000)
+            except ValueError:
+                logger.warning(f"Ignoring unrecognised outbox file {path.name}")
+        if self._entries:
+            logger.info(f"Outbox has {len(self._entries)} undelivered battle result(s).")
+        return len(self._entries)
+
+    def start(self) -> None:
+        """Launch the drainer as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the drainer. Undelivered entries stay on disk for the next startup."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def put(
+        self,
+        battle_id: uuid.UUID,
+        creator_username: str,
+        started_at: datetime,
+        ended_at: datetime,
+        duration_seconds: int,
+        winner_country: str | None,
+        rankings: list[dict],
+        timeline: bytes | None = None,
+    ) -> None:
+        """Durably queue a battle result for saving. Returns once it is on disk."""
+        if battle_id in self._entries:
+            return
+        queued_at = time.time()
+        entry = dumps({
+            "battle_id": battle_id,
+            "creator_username": creator_username,
+            "started_at": started_at,
+            "ended_at": ended_at,
+            "duration_seconds": duration_seconds,
+            "winner_country": winner_country,
+            "rankings": rankings,
+            "timeline": base64.b64encode(timeline).decode() if timeline else None,
+        })
+        path = self.directory / f"{int(queued_at * 1000):013d}-{battle_id}{ENTRY_SUFFIX}"
+        await asyncio.to_thread(self._write, path, entry)
+        self._entries[battle_id] = (path, queued_at)
+        self.queued += 1
+        self._wakeup.set()
+
+    def contains(self, battle_id: uuid.UUID) -> bool:
+        """Whether a battle's result is queued but not yet saved."""
+        return battle_id in self._entries
+
+    def depth(self) -> int:
+        return len(self._entries)
+
+    def oldest_age(self) -> float:
+        """Seconds the oldest undelivered entry has been waiting (0 when empty)."""
+        if not self._entries:
+            return 0.0
+        _, queued_at = next(iter(self._entries.values()))
+        return max(0.0, time.time() - queued_at)
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "oldest_age_seconds": round(self.oldest_age(), 3),
+            "queued": self.queued,
+            "delivered": self.delivered,
+            "failures": self.failures,
+            "set_aside": self.set_aside,
+            "retrying": len(self._backoff),
+            "retry_delay_seconds": max((delay for delay, _ in self._backoff.values()), default=0.0),
+            "last_error": self.last_error,
+        }
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                due = self._next_due()
+                if due is None:
+                    # Nothing queued, or everything backing off: wait for a new entry or the next retry
+                    self._wakeup.clear()
+                    retry_at = min((at for _, at in self._backoff.values()), default=None)
+                    timeout = None if retry_at is None else max(0.0, retry_at - time.monotonic())
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                battle_id, path = due
+                if await self._deliver(battle_id, path):
+                    if self._backoff.pop(battle_id, None) is None and self._backoff:
+                        # The database is reachable again: retry the others right away
+                        now = time.monotonic()
+                        self._backoff = {key: (delay, now) for key, (delay, _) in self._backoff.items()}
+                    continue
+                delay, _ = self._backoff.get(battle_id, (0.0, 0.0))
+                delay = min(self._retry_max, max(self._retry_base, delay * 2))
+                self._backoff[battle_id] = (delay, time.monotonic() + delay)
+        except asyncio.CancelledError:
+            logger.info("Result outbox drainer stopped.")
+            raise
+
+    def _next_due(self) -> tuple[uuid.UUID, Path] | None:
+        """Oldest entry that isn't waiting out a retry delay."""
+        now = time.monotonic()
+        for battle_id, (path, _) in self._entries.items():
+            backoff = self._backoff.get(battle_id)
+            if backoff is None or backoff[1] <= now:
+                return battle_id, path
+        return None
+
+    async def _deliver(self, battle_id: uuid.UUID, path: Path) -> bool:
+        """Try one entry. True once it is resolved (saved or set aside), False to retry it later."""
+        try:
+            entry = orjson.loads(await asyncio.to_thread(path.read_bytes))
+        except (OSError, orjson.JSONDecodeError) as e:
+            # Unreadable entries can never be delivered — set them aside
+            logger.error(f"Outbox entry {path.name} is unreadable ({e}); moving it aside.")
+            await self._discard(battle_id, path, ".corrupt")
+            return True
+        try:
+            await self.repo.save_battle_result(
+                battle_id=uuid.UUID(entry["battle_id"]),
+                creator_username=entry["creator_username"],
+                started_at=datetime.fromisoformat(entry["started_at"]),
+                ended_at=datetime.fromisoformat(entry["ended_at"]),
+                duration_seconds=entry["duration_seconds"],
+                winner_country=entry["winner_country"],
+                rankings=entry["rankings"],
+                timeline=base64.b64decode(entry["timeline"]) if entry.get("timeline") else None,
+            )
+        except (*PERMANENT_ERRORS, KeyError, ValueError, TypeError) as e:
+            if getattr(e, "connection_invalidated", False):
+                return self._failed(battle_id, e)
+            logger.error(f"The database rejected battle {battle_id} from the outbox ({e}); moving it aside.")
+            self.failures += 1
+            self.last_error = str(e)
+            await self._discard(battle_id, path, ".failed")
+            return True
+        except Exception as e:
+            return self._failed(battle_id, e)
+
+        await asyncio.to_thread(path.unlink, missing_ok=True)
+        del self._entries[battle_id]
+        self.delivered += 1
+        logger.info(f"Battle {battle_id} delivered from the outbox.")
+        return True
+
+    def _failed(self, battle_id: uuid.UUID, error: Exception) -> bool:
+        self.failures += 1
+        self.last_error = str(error)
+        logger.warning(f"Saving battle {battle_id} from the outbox failed: {error}")
+        return False
+
+    async def _discard(self, battle_id: uuid.UUID, path: Path, suffix: str) -> None:
+        """Stop delivering an entry, keeping its file (renamed) for inspection."""
+        await asyncio.to_thread(_set_aside, path, suffix)
+        del self._entries[battle_id]
+        self._backoff.pop(battle_id, None)
+        self.set_aside += 1
+
+    def _scan(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        # Names start with a zero-padded millisecond timestamp, so they sort by age
+        return sorted(self.directory.glob(f"*{ENTRY_SUFFIX}"))
+
+    def _write(self, path: Path, entry: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as handle:
+            handle.write(entry)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, path)
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _set_aside(path: Path, suffix: str) -> None:
+    try:
+        os.replace(path, path.with_suffix(suffix))
+    except OSError:
+        pass
@@ -3,10 +3,13 @@ import asyncio
 from typing import TYPE_CHECKING
 from TikTokLive import TikTokLiveClient
 from TikTokLive.events import GiftEvent, ConnectEvent, DisconnectEvent, CommentEvent
+from app.battle.ingest import ScoreEvent
+from app.battle.affinity import user_key
 
 if TYPE_CHECKING:
     from app.battle.manager import BattleManager
-    from app.ws.manager import WebSocketManager
+    from app.battle.ingest import GiftIngestor
+    from app.battle.affinity import UserAffinityStore
     from app.repository.battle_repo import BattleRepository
 
 logger = logging.getLogger(__name__)
@@ -41,19 +44,10 @@ def gift_to_points(gift_name: str, coin_value: int) -> int:
     return points
 
 
-def detect_country_from_comment(comment: str, countries: list[str]) -> str | None:
-    """Very simple country mention detection from comment text."""
-    lower = comment.lower()
-    for country in countries:
-        if country.lower() in lower:
-            return country
-    return None
-
-
 class TikTokListener:
     """
     Connects to a TikTok Live stream and translates gift/comment events
-    into battle score updates. Runs as an async background task.
+    into score events on the GiftIngestor queue. Runs as an async background task.
     """
 
     def __init__(
@@ -61,13 +55,17 @@ class TikTokListener:
         username: str,
         session_id: str | None,
         battle_manager: "BattleManager",
-        ws_manager: "WebSocketManager",
+        ingestor: "GiftIngestor",
+        affinity: "UserAffinityStore",
         battle_repo: "BattleRepository",
+        room: str | None = None,
     ):
         self.username = username
+        self.room = room or username
         self.session_id = session_id
         self.battle_manager = battle_manager
-        self.ws_manager = ws_manager
+        self.ingestor = ingestor
+        self.affinity = affinity
         self.battle_repo = battle_repo
         self._task: asyncio.Task | None = None
 
@@ -116,53 +114,46 @@ class TikTokListener:
 
         @client.on(GiftEvent)
         async def on_gift(event: GiftEvent):
-            battle = self.battle_manager.get_active_battle()
-            if not battle:
-                return
-
-            gift_name = event.gift.name if event.gift else "Unknown"
-            coin_value = event.gift.diamond_count if event.gift else 0
-            points = gift_to_points(gift_name, coin_value)
-
-            # Map sender's country to a battle country
-            # For simplicity: gift country determined by sender nickname hints or first country
-            country = _pick_country_for_user(event.user, battle.countries)
-
-            if battle.add_score(country, points):
-                state = battle.get_state()
-                state["last_gift"] = {
-                    "user": event.user.nickname if event.user else "Unknown",
-                    "gift": gift_name,
-                    "points": points,
-                    "country": country,
-                    "is_lion": gift_name.lower() == "lion",
-                }
-                await self.ws_manager.broadcast(state)
+            await self.handle_gift(event)
 
         @client.on(CommentEvent)
         async def on_comment(event: CommentEvent):
-            battle = self.battle_manager.get_active_battle()
-            if not battle:
-                return
-
-            comment_text = event.comment or ""
-            country = detect_country_from_comment(comment_text, battle.countries)
-            if country:
-                # Comments give 1 point to mentioned country
-                if battle.add_score(country, 1):
-                    await self.ws_manager.broadcast(battle.get_state())
+            await self.handle_comment(event)
 
         await client.start()
 
+    async def handle_gift(self, event: GiftEvent) -> None:
+        """Turn a gift into a score event on the ingestion queue."""
+        battle = self.battle_manager.get_active_battle(self.room)
+        if not battle:
+            return
+
+        gift_name = event.gift.name if event.gift else "Unknown"
+        coin_value = event.gift.diamond_count if event.gift else 0
+        points = gift_to_points(gift_name, coin_value)
+
+        # Map sender to a battle country: their explicit choice, else a stable hash
+        country = self.affinity.pick(event.user, battle.countries)
+
+        gift_info = {
+            "user": event.user.nickname if event.user else "Unknown",
+            "gift": gift_name,
+            "points": points,
+            "country": country,
+            "is_lion": gift_name.lower() == "lion",
+        }
+        await self.ingestor.submit(ScoreEvent(battle, country, points, gift_info, user_key(event.user)))
+
+    async def handle_comment(self, event: CommentEvent) -> None:
+        """Comments give 1 point to the mentioned country."""
+        battle = self.battle_manager.get_active_battle(self.room)
+        if not battle:
+            return
+
+        comment_text = event.comment or ""
+        country = battle.matcher.match(comment_text)
+        if country:
+            # Naming a country in chat pins the viewer's future gifts to it
+            self.affinity.choose(event.user, country)
+            await self.ingestor.submit(ScoreEvent(battle, country, 1))
 
-def _pick_country_for_user(user, countries: list[str]) -> str:
-    """
-    Pick a battle country for the gifting user.
-    Strategy: hash user ID to consistently assign them a country.
-    This is stable per-user within a session.
-    """
-    if not user or not countries:
-        return countries[0] if countries else "Unknown"
-    user_id = getattr(user, "id", None) or getattr(user, "uid", "") or ""
-    index = abs(hash(str(user_id))) % len(countries)
-    return countries[index]
@@ -0,0 +1,135 @@
+import sys
+import zlib
+import struct
+from array import array
+
+# Encoded layout (little-endian), zlib-compressed after the version byte:
+#   u16 country count, u32 seconds recorded, u32 duration,
+#   per country: u16 name length + UTF-8 name,
+#   per country: `seconds` int64 deltas from the previous second.
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<HII")
+_NAME_LEN = struct.Struct("<H")
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ScoreTimeline:
+    """
+    Cumulative score of every country at each whole second of a battle.
+    Backed by one preallocated int64 array, (duration + 1) rows of one
+    column per country, so memory is fixed when the battle starts: 8 bytes
+    per country per second, nothing allocated while sampling.
+    Seconds that were never sampled (e.g. while the process was down) hold
+    the last sampled values.
+    """
+
+    def __init__(self, countries: list[str], duration_seconds: int):
+        self.countries = list(countries)
+        self.duration_seconds = duration_seconds
+        self._width = len(self.countries)
+        self._values = array("q", bytes(8 * self._width * (duration_seconds + 1)))
+        self.seconds = 1  # rows recorded; second 0 is all zeros
+
+    def sample(self, second: int, scores: dict[str, int]) -> None:
+        """
+        Record `scores` as the standings at `second`, clamped to the battle
+        length. Samples are current scores, so one for an earlier second than
+        the last recorded just updates the last row.
+        """
+        second = max(min(second, self.duration_seconds), self.seconds - 1)
+        width, values = self._width, self._values
+        # Carry the last recorded row over any skipped seconds
+        last = (self.seconds - 1) * width
+        for row in range(self.seconds, second):
+            values[row * width:(row + 1) * width] = values[last:last + width]
+        start = second * width
+        for idx, country in enumerate(self.countries):
+            values[start + idx] = scores.get(country, 0)
+        self.seconds = second + 1
+
+    def row(self, second: int) -> dict[str, int]:
+        """Scores at a recorded second."""
+        start = second * self._width
+        return dict(zip(self.countries, self._values[start:start + self._width]))
+
+    def frames(self):
+        """Yield (second, scores) for every recorded second, in order."""
+        for second in range(self.seconds):
+            yield second, self.row(second)
+
+    def replay_state(self, second: int, battle_id: str, creator_username: str) -> dict:
+        """A state_update frame (Battle.get_state format) for a recorded second."""
+        scores = self.row(second)
+        # Same ordering as a live battle: score descending, ties in country order
+        order = sorted(range(self._width), key=lambda idx: -scores[self.countries[idx]])
+        return {
+            "type": "state_update",
+            "battle_id": battle_id,
+            "version": second,
+            "creator_username": creator_username,
+            "scores": scores,
+            "rankings": [
+                {"country": self.countries[idx], "score": scores[self.countries[idx]], "position": pos + 1}
+                for pos, idx in enumerate(order)
+            ],
+            "time_remaining": self.duration_seconds - second,
+            "total_seconds": self.duration_seconds,
+            "battle_finished": False,
+            "last_gift": None,
+        }
+
+    def encode(self) -> bytes:
+        """Delta-encode each country's series and compress it."""
+        width, seconds = self._width, self.seconds
+        deltas = array("q")
+        for idx in range(width):
+            series = self._values[idx:seconds * width:width]
+            previous = 0
+            for value in series:
+                deltas.append(value - previous)
+                previous = value
+        names = b"".join(
+            _NAME_LEN.pack(len(raw)) + raw for raw in (country.encode() for country in self.countries)
+        )
+        payload = _HEADER.pack(width, seconds, self.duration_seconds) + names + _little_endian(deltas)
+        return bytes([FORMAT_VERSION]) + zlib.compress(payload, 9)
+
+    @classmethod
+    def decode(cls, blob: bytes) -> "ScoreTimeline":
+        """Inverse of encode(). Raises ValueError on an unknown or corrupt blob."""
+        if not blob or blob[0] != FORMAT_VERSION:
+            raise ValueError("Unsupported score timeline format")
+        try:
+            payload = zlib.decompress(blob[1:])
+            width, seconds, duration = _HEADER.unpack_from(payload)
+            offset = _HEADER.size
+            countries = []
+            for _ in range(width):
+                (length,) = _NAME_LEN.unpack_from(payload, offset)
+                offset += _NAME_LEN.size
+                countries.append(payload[offset:offset + length].decode())
+                offset += length
+            deltas = array("q")
+            deltas.frombytes(payload[offset:offset + 8 * width * seconds])
+        except (zlib.error, struct.error, UnicodeDecodeError) as e:
+            raise ValueError(f"Corrupt score timeline: {e}") from e
+        if len(deltas) != width * seconds or seconds > duration + 1:
+            raise ValueError("Corrupt score timeline: truncated series")
+        if sys.byteorder == "big":
+            deltas.byteswap()
+
+        timeline = cls(countries, duration)
+        timeline.seconds = seconds
+        values = timeline._values
+        for idx in range(width):
+            total = 0
+            for second in range(seconds):
+                total += deltas[idx * seconds + second]
+                values[second * width + idx] = total
+        return timeline
@@ -0,0 +1,128 @@
+import heapq
+import asyncio
+import logging
+import itertools
+from time import monotonic
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class TimerHandle:
+    """A scheduled callback. cancel() is O(1); the heap entry is discarded lazily."""
+
+    __slots__ = ("deadline", "callback", "cancelled")
+
+    def __init__(self, deadline: float, callback: Callable[[], None]):
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    One scheduler for every battle timer, driven by a single asyncio task.
+    Entries live in a heap keyed on absolute time.monotonic() deadlines, so
+    periodic work scheduled as `start + n` never accumulates drift.
+    Add is O(log n); cancel marks the handle and it is dropped when popped.
+    Tracks how late each callback fires relative to its deadline.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, int, TimerHandle]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._cancelled: int = 0
+
+        # Lateness stats (seconds)
+        self.fired: int = 0
+        self.last_lateness: float = 0.0
+        self.max_lateness: float = 0.0
+        self._total_lateness: float = 0.0
+
+    def start(self) -> None:
+        """Launch the scheduler loop as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def call_at(self, deadline: float, callback: Callable[[], None]) -> TimerHandle:
+        """Run `callback` at a time.monotonic() deadline."""
+        handle = TimerHandle(deadline, callback)
+        heapq.heappush(self._heap, (deadline, next(self._seq), handle))
+        # Only an earlier-than-current head needs to shorten the loop's sleep
+        if self._heap[0][2] is handle:
+            self._wakeup.set()
+        return handle
+
+    def cancel(self, handle: TimerHandle | None) -> None:
+        if handle is None or handle.cancelled:
+            return
+        handle.cancel()
+        self._cancelled += 1
+        # Rebuild once cancelled entries dominate, keeping the heap bounded
+        if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def pending(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending(),
+            "fired": self.fired,
+            "last_lateness_ms": round(self.last_lateness * 1000, 3),
+            "max_lateness_ms": round(self.max_lateness * 1000, 3),
+            "avg_lateness_ms": round(self._total_lateness / self.fired * 1000, 3) if self.fired else 0.0,
+        }
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                if not self._heap:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                deadline, _, handle = self._heap[0]
+                if handle.cancelled:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+                    continue
+                delay = deadline - monotonic()
+                if delay > 0:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                heapq.heappop(self._heap)
+                handle.cancelled = True  # fired; a late cancel() is a no-op
+                self._record(-delay)
+                try:
+                    handle.callback()
+                except Exception as e:
+                    logger.exception(f"Timer callback failed: {e}")
+        except asyncio.CancelledError:
+            logger.info("Timer wheel stopped.")
+
+    def _record(self, lateness: float) -> None:
+        self.fired += 1
+        self.last_lateness = lateness
+        self._total_lateness += lateness
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
@@ -13,7 +13,75 @@ class Settings(BaseSettings):
 
     # Battle defaults
     BATTLE_DURATION_SECONDS: int = 300  # 5 minutes
+    BATTLE_MAX_DURATION_SECONDS: int = 6 * 3600  # longest battle an admin may start
     DEFAULT_COUNTRIES: str = "Turkey,Saudi Arabia,Egypt,Pakistan"
+    # Extra comment aliases, e.g. "Turkey=TR|Türk;Saudi Arabia=KSA"
+    COUNTRY_ALIASES: str = ""
+
+    # Broadcasting
+    BROADCAST_MAX_FPS: int = 10  # max state frames per second
+    WS_SEND_QUEUE_SIZE: int = 32  # outgoing frames buffered per client
+    WS_MAX_DROPPED_FRAMES: int = 256  # evict clients that drop more without ever catching up
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    # Server-Sent Events (/events) for read-only spectators
+    SSE_BUFFER_SIZE: int = 256  # encoded events kept per room for Last-Event-ID resume
+    SSE_KEEPALIVE_SECONDS: float = 15.0
+    SSE_RETRY_MS: int = 3000  # client reconnect delay
+
+    # Cross-process broadcast bus: "memory" (single process) or "postgres" (LISTEN/NOTIFY)
+    BUS_BACKEND: str = "memory"
+    BUS_CHANNEL: str = "battle_broadcast"
+    BUS_QUEUE_SIZE: int = 1000  # messages waiting to be NOTIFYed
+    # Run battles (timers, TikTok listener, ingestion, persistence) in this process.
+    # Set false on WS-only workers fed by the postgres bus.
+    BATTLE_ENGINE_ENABLED: bool = True
+
+    # Per-room battle ownership across processes (Postgres advisory locks)
+    LEADER_ELECTION_ENABLED: bool = False
+    LEADER_POLL_SECONDS: float = 1.0  # how often unowned rooms are claimed
+
+    # Gift ingestion
+    INGEST_QUEUE_SIZE: int = 10000
+    INGEST_BATCH_SIZE: int = 500
+    INGEST_OVERFLOW_POLICY: str = "drop_low"  # "block" or "drop_low"
+    INGEST_DROP_BELOW_POINTS: int = 10  # drop_low sheds events worth less than this
+
+    # Viewer → country affinity
+    AFFINITY_CACHE_SIZE: int = 200_000  # max users kept in memory (LRU)
+    AFFINITY_FLUSH_SECONDS: float = 5.0  # batch write-through interval
+    AFFINITY_WARM_USERS: int = 50_000  # recent users loaded at startup
+
+    # Live score checkpoints (Postgres)
+    CHECKPOINT_INTERVAL_SECONDS: float = 3.0
+    CHECKPOINT_POOL_SIZE: int = 2  # dedicated connections, separate from the request pool
+
+    # Per-gift event log (Postgres, COPY-batched, daily partitions)
+    GIFT_EVENTS_ENABLED: bool = True
+    GIFT_EVENTS_BATCH_SIZE: int = 5000  # flush once this many events are buffered
+    GIFT_EVENTS_FLUSH_SECONDS: float = 2.0  # ...or this often, whichever comes first
+    GIFT_EVENTS_BUFFER_MAX: int = 200_000  # oldest events are shed beyond this while the DB is down
+    GIFT_EVENTS_RETENTION_DAYS: int = 30
+
+    # Battle result outbox (local durable queue in front of Postgres)
+    OUTBOX_DIR: str = "outbox"
+    OUTBOX_RETRY_BASE_SECONDS: float = 1.0
+    OUTBOX_RETRY_MAX_SECONDS: float = 60.0
+
+    # Finished-battle detail responses kept in memory (LRU)
+    BATTLE_DETAIL_CACHE_SIZE: int = 10_000
+
+    # Longest ?window= accepted by GET /leaderboard (days)
+    LEADERBOARD_MAX_WINDOW_DAYS: int = 366
+
+    # Upper bound for ?speed= on /ws/replay/{battle_id}
+    REPLAY_MAX_SPEED: float = 32.0
+
+    # Crash-recovery journal
+    JOURNAL_ENABLED: bool = True
+    JOURNAL_DIR: str = "journal"
+    JOURNAL_FSYNC_SECONDS: float = 0.05  # group-commit interval
+    JOURNAL_SEGMENT_BYTES: int = 8 * 1024 * 1024  # rotate segments at this size
 
     # App
     APP_HOST: str = "0.0.0.0"
@@ -24,6 +92,15 @@ class Settings(BaseSettings):
     def countries_list(self) -> list[str]:
         return [c.strip() for c in self.DEFAULT_COUNTRIES.split(",")]
 
+    @property
+    def country_aliases(self) -> dict[str, list[str]]:
+        aliases: dict[str, list[str]] = {}
+        for entry in self.COUNTRY_ALIASES.split(";"):
+            country, _, terms = entry.partition("=")
+            if country.strip() and terms:
+                aliases[country.strip()] = [t.strip() for t in terms.split("|") if t.strip()]
+        return aliases
+
     @property
     def cors_origins_list(self) -> list[str]:
         return [o.strip() for o in self.CORS_ORIGINS.split(",")]
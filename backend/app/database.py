@@ -20,6 +20,24 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Small dedicated pool for the background checkpoint writer, so periodic
+# live-score writes can never starve request handlers of connections
+checkpoint_engine = create_async_engine(
+    settings.DATABASE_URL,
+    echo=False,
+    pool_pre_ping=True,
+    pool_size=settings.CHECKPOINT_POOL_SIZE,
+    max_overflow=0,
+)
+
+CheckpointSessionLocal = async_sessionmaker(
+    bind=checkpoint_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 
 class Base(DeclarativeBase):
     pass
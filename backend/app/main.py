@@ -1,15 +1,36 @@
+import time
+import uuid
 import logging
 import asyncio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import get_settings
-from app.database import engine
+from app.database import engine, checkpoint_engine
 from app.models import Base
-from app.battle.manager import BattleManager
+from app.battle.manager import BattleManager, default_room
 from app.battle.tiktok import TikTokListener
+from app.battle.timer import TimerWheel
+from app.battle.ingest import GiftIngestor
+from app.battle.affinity import UserAffinityStore
+from app.battle.journal import BattleJournal
+from app.battle.checkpoint import BattleCheckpointer
+from app.battle.leader import RoomLeadership
+from app.battle.gift_log import GiftEventRecorder
+from app.battle.outbox import ResultOutbox
+from app.battle.timeline import ScoreTimeline
 from app.ws.manager import WebSocketManager
+from app.ws.scheduler import BroadcastScheduler
+from app.ws.codec import BINARY_SUBPROTOCOL, dumps_text
+from app.ws.bus import create_bus
+from app.ws.sse import EventStream
 from app.repository.battle_repo import BattleRepository
+from app.repository.affinity_repo import AffinityRepository
+from app.repository.checkpoint_repo import CheckpointRepository
+from app.repository.gift_event_repo import GiftEventRepository
+from app.repository.leaderboard_cache import LeaderboardCache
+from app.repository.battle_detail_cache import BattleDetailCache
 from app.routers import battles, leaderboard, admin
 
 logging.basicConfig(
@@ -26,42 +47,134 @@ async def lifespan(app: FastAPI):
     logger.info("Starting up Country Battle Live...")
 
     # Initialize singleton services
-    ws_manager = WebSocketManager()
-    battle_repo = BattleRepository()
-    battle_manager = BattleManager()
+    bus = create_bus()
+    ws_manager = WebSocketManager(bus=bus)
+    events = EventStream(bus)
+    ws_manager.add_observer(events.watching)
+    broadcaster = BroadcastScheduler(ws_manager)
+    leaderboard = LeaderboardCache(bus)
+    battle_repo = BattleRepository(leaderboard)
+    timer_wheel = TimerWheel()
+    outbox = ResultOutbox(battle_repo)
+    journal = BattleJournal() if settings.JOURNAL_ENABLED else None
+    battle_manager = BattleManager(broadcaster, timer_wheel, outbox, journal)
+    checkpointer = BattleCheckpointer(battle_manager, CheckpointRepository())
+    gift_recorder = GiftEventRecorder(GiftEventRepository()) if settings.GIFT_EVENTS_ENABLED else None
+    ingestor = GiftIngestor(battle_manager, broadcaster, recorder=gift_recorder)
+    affinity = UserAffinityStore(AffinityRepository())
 
     # Store on app.state (no global mutable state)
+    app.state.bus = bus
     app.state.ws_manager = ws_manager
+    app.state.events = events
+    app.state.broadcaster = broadcaster
     app.state.battle_repo = battle_repo
+    app.state.leaderboard = leaderboard
+    app.state.battle_details = BattleDetailCache()
     app.state.battle_manager = battle_manager
+    app.state.timer_wheel = timer_wheel
+    app.state.outbox = outbox
+    app.state.journal = journal
+    app.state.checkpointer = checkpointer
+    app.state.ingestor = ingestor
+    app.state.gift_recorder = gift_recorder
+    app.state.affinity = affinity
 
-    # Start initial battle automatically
-    await battle_manager.start_battle(
-        creator_username=settings.TIKTOK_USERNAME or "system",
-        countries=None,
-        duration_seconds=None,
-        ws_manager=ws_manager,
-        battle_repo=battle_repo,
-    )
+    # Listen before anything is published, so no frame from another process is missed
+    await bus.start()
+    broadcaster.start()
 
-    # Start TikTok listener if configured
-    tiktok_listener = TikTokListener(
-        username=settings.TIKTOK_USERNAME,
-        session_id=settings.TIKTOK_SESSION_ID or None,
-        battle_manager=battle_manager,
-        ws_manager=ws_manager,
-        battle_repo=battle_repo,
-    )
+    try:
+        await leaderboard.load(battle_repo)
+    except Exception as e:
+        # Retried on the first /leaderboard request
+        logger.warning(f"Could not preload leaderboard: {e}")
+
+    tiktok_listener = None
+    app.state.leadership = None
+    if settings.BATTLE_ENGINE_ENABLED:
+        timer_wheel.start()
+        if journal:
+            journal.start()
+        ingestor.start()
+        if gift_recorder:
+            gift_recorder.start()
+        await affinity.warm_up()
+        affinity.start()
+
+        # Deliver results a previous process queued but never saved
+        await outbox.load()
+        outbox.start()
+
+        tiktok_listener = TikTokListener(
+            username=settings.TIKTOK_USERNAME,
+            session_id=settings.TIKTOK_SESSION_ID or None,
+            battle_manager=battle_manager,
+            ingestor=ingestor,
+            affinity=affinity,
+            battle_repo=battle_repo,
+            room=default_room(),
+        )
+
+        if settings.LEADER_ELECTION_ENABLED:
+            # Rooms are run by whichever process holds their lock; it resumes
+            # them, starts the default battle and the TikTok listener
+            leadership = RoomLeadership(
+                battle_manager, ws_manager, battle_repo, checkpointer, bus, listener=tiktok_listener
+            )
+            leadership.set_command_handler(lambda command: admin.run_command(app.state, command))
+            app.state.leadership = leadership
+            checkpointer.start()
+            await leadership.start()
+        else:
+            # Resume battles interrupted by a crash or redeploy
+            resumed = await battle_manager.recover(ws_manager, battle_repo, checkpoints=await checkpointer.load())
+            checkpointer.start()
+
+            # Start initial battle automatically, unless the default room's battle was resumed
+            if not any(battle.room == default_room() for battle in resumed):
+                await battle_manager.start_battle(
+                    creator_username=settings.TIKTOK_USERNAME or "system",
+                    countries=None,
+                    duration_seconds=None,
+                    ws_manager=ws_manager,
+                    room=default_room(),
+                )
+
+            # Start TikTok listener if configured (feeds the default room)
+            await tiktok_listener.start()
+    else:
+        logger.info("Battle engine disabled: serving WebSocket clients from the broadcast bus only.")
     app.state.tiktok_listener = tiktok_listener
-    await tiktok_listener.start()
 
     logger.info("Startup complete.")
     yield
 
     # --- Shutdown ---
     logger.info("Shutting down...")
-    await tiktok_listener.stop()
+    leadership = app.state.leadership
+    if settings.BATTLE_ENGINE_ENABLED:
+        await tiktok_listener.stop()
+        if leadership:
+            await leadership.stop()
+        await ingestor.stop()
+        if gift_recorder:
+            await gift_recorder.stop()
+        await affinity.stop()
+        await battle_manager.shutdown()
+        await checkpointer.stop()
+        if leadership:
+            # After the final checkpoint, so the next owner resumes from it
+            await leadership.close()
+        await outbox.stop()
+        if journal:
+            # Live battles stay journaled and are resumed on the next startup
+            await journal.stop()
+        await timer_wheel.stop()
+    await broadcaster.stop()
+    await bus.stop()
     await engine.dispose()
+    await checkpoint_engine.dispose()
     logger.info("Shutdown complete.")
 
 
@@ -78,6 +191,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Routers
@@ -93,16 +207,88 @@ async def health():
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
+    await _serve_websocket(websocket, default_room())
+
+
+@app.websocket("/ws/{room}")
+async def room_websocket_endpoint(websocket: WebSocket, room: str):
+    await _serve_websocket(websocket, room)
+
+
+@app.get("/events")
+async def events_endpoint(request: Request):
+    return _serve_events(request, default_room())
+
+
+@app.get("/events/{room}")
+async def room_events_endpoint(request: Request, room: str):
+    return _serve_events(request, room)
+
+
+@app.websocket("/ws/replay/{battle_id}")
+async def replay_websocket_endpoint(websocket: WebSocket, battle_id: uuid.UUID):
+    """
+    Replay a finished battle from its saved score timeline: one state_update
+    per recorded second, `?speed=N` times faster than real time, then the
+    original game_over. Same frames as the live /ws feed.
+    """
+    battle_repo: BattleRepository = websocket.app.state.battle_repo
+    try:
+        speed = float(websocket.query_params.get("speed", 1))
+    except ValueError:
+        speed = 1.0
+    speed = min(max(speed, 0.1), settings.REPLAY_MAX_SPEED)
+
+    await websocket.accept()
+    try:
+        battle = await battle_repo.get_battle_with_timeline(battle_id)
+        try:
+            timeline = ScoreTimeline.decode(battle.timeline) if battle and battle.timeline else None
+        except ValueError as e:
+            logger.warning(f"Battle {battle_id} has an unreadable timeline: {e}")
+            timeline = None
+        if timeline is None:
+            await websocket.send_text(dumps_text({"type": "no_battle", "message": "No replay for this battle"}))
+            await websocket.close()
+            return
+
+        started = time.monotonic()
+        for second in range(timeline.seconds):
+            # Paced against the start time, so slow sends don't accumulate drift
+            delay = started + second / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await websocket.send_text(dumps_text(
+                timeline.replay_state(second, str(battle.id), battle.creator_username)
+            ))
+
+        await websocket.send_text(dumps_text({
+            "type": "game_over",
+            "battle_id": str(battle.id),
+            "winner": battle.winner_country,
+            "rankings": [
+                {"country": r.country_name, "score": r.final_score, "position": r.position}
+                for r in battle.results
+            ],
+            "duration_seconds": battle.duration_seconds,
+        }))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+async def _serve_websocket(websocket: WebSocket, room: str) -> None:
     ws_manager: WebSocketManager = websocket.app.state.ws_manager
     battle_manager: BattleManager = websocket.app.state.battle_manager
 
-    await ws_manager.connect(websocket)
+    # Opt-in delta protocol: /ws?mode=delta; opt-in binary frames: Sec-WebSocket-Protocol
+    binary = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", ())
+    await ws_manager.connect(
+        websocket, room, delta=websocket.query_params.get("mode") == "delta", binary=binary
+    )
     try:
         # Send current state immediately on connect
-        battle = battle_manager.get_active_battle()
-        if battle:
-            await ws_manager.send_to(websocket, battle.get_state())
-        else:
+        if not await _send_snapshot(ws_manager, battle_manager, websocket, room, binary, droppable=True):
             await ws_manager.send_to(websocket, {"type": "no_battle", "message": "No active battle"})
 
         # Keep connection alive — client can send pings
@@ -111,13 +297,63 @@ async def websocket_endpoint(websocket: WebSocket):
                 data = await asyncio.wait_for(websocket.receive_text(), timeout=30)
                 if data == "ping":
                     await ws_manager.send_to(websocket, {"type": "pong"})
+                elif data == "resync":
+                    # Delta client detected a version gap (or binary client an unknown battle)
+                    await _send_snapshot(ws_manager, battle_manager, websocket, room, binary)
             except asyncio.TimeoutError:
-                # Send keepalive
-                try:
-                    await ws_manager.send_to(websocket, {"type": "ping"})
-                except Exception:
-                    break
+                # Send keepalive (queued; a dead client is evicted by its writer)
+                await ws_manager.send_to(websocket, {"type": "ping"})
     except WebSocketDisconnect:
         pass
     finally:
         await ws_manager.disconnect(websocket)
+
+
+def _serve_events(request: Request, room: str) -> StreamingResponse:
+    """
+    Read-only Server-Sent Events feed of a room: the same state_update and
+    game_over frames as /ws, shared pre-encoded by every SSE client.
+    Browsers resume with Last-Event-ID on reconnect.
+    """
+    events: EventStream = request.app.state.events
+    snapshot = _current_snapshot(request.app.state.ws_manager, request.app.state.battle_manager, room)
+    return StreamingResponse(
+        events.stream(room, request.headers.get("last-event-id"), snapshot),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx-style proxies from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+async def _send_snapshot(
+    ws_manager: WebSocketManager,
+    battle_manager: BattleManager,
+    websocket: WebSocket,
+    room: str,
+    binary: bool,
+    droppable: bool = False,
+) -> bool:
+    """Send a room's current state in the client's format. False if there is none."""
+    if binary:
+        battle = battle_manager.get_active_battle(room)
+        frames = battle.binary_frames() if battle else ws_manager.latest_binary(room)
+        if frames:
+            ws_manager.send_binary_state(websocket, *frames)
+            return True
+    # JSON also works for binary clients, e.g. when the battle's owner sent no binary frames
+    snapshot = _current_snapshot(ws_manager, battle_manager, room)
+    if snapshot:
+        await ws_manager.send_encoded(websocket, snapshot, droppable=droppable)
+        return True
+    return False
+
+
+def _current_snapshot(ws_manager: WebSocketManager, battle_manager: BattleManager, room: str) -> str | None:
+    """State frame for a room: from the local battle, else the last one seen on the bus."""
+    battle = battle_manager.get_active_battle(room)
+    if battle:
+        return battle.snapshot_text()
+    return ws_manager.latest_state(room)
@@ -1,13 +1,19 @@
 import uuid
-from datetime import datetime
-from sqlalchemy import String, Integer, ForeignKey, UniqueConstraint, DateTime, func
+from datetime import date, datetime
+from sqlalchemy import String, Integer, BigInteger, LargeBinary, ForeignKey, UniqueConstraint, Index, Date, DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.database import Base
 
 
 class Battle(Base):
     __tablename__ = "battles"
+    __table_args__ = (
+        # Keyset pagination for GET /history, optionally filtered
+        Index("ix_battles_started_at_id", "started_at", "id"),
+        Index("ix_battles_creator_started_at_id", "creator_username", "started_at", "id"),
+        Index("ix_battles_winner_started_at_id", "winner_country", "started_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -19,9 +25,12 @@ class Battle(Base):
     ended_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     duration_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
     winner_country: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # ScoreTimeline.encode() output; only loaded on demand (replays)
+    timeline: Mapped[bytes | None] = mapped_column(LargeBinary, nullable=True, deferred=True)
 
     results: Mapped[list["BattleResult"]] = relationship(
-        "BattleResult", back_populates="battle", cascade="all, delete-orphan"
+        "BattleResult", back_populates="battle", cascade="all, delete-orphan",
+        order_by="BattleResult.position",
     )
 
 
@@ -55,3 +64,85 @@ class CountryStatistics(Base):
     total_second_place: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     total_third_place: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     total_battles: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class CountryDailyStats(Base):
+    """
+    country_statistics bucketed by the UTC day a battle started, so windowed
+    leaderboards sum a handful of rows instead of scanning battle_results.
+    """
+
+    __tablename__ = "country_daily_stats"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    country_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    total_wins: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_second_place: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_third_place: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_battles: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class UserAffinity(Base):
+    __tablename__ = "user_affinity"
+
+    user_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    country_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), index=True
+    )
+
+
+class LiveBattle(Base):
+    """Checkpoint of a battle in progress; deleted once the battle ends."""
+
+    __tablename__ = "live_battles"
+
+    battle_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    room: Mapped[str] = mapped_column(String(255), nullable=False, index=True)
+    creator_username: Mapped[str] = mapped_column(String(255), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    duration_seconds: Mapped[int] = mapped_column(Integer, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_gift: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    scores: Mapped[list["LiveBattleScore"]] = relationship(
+        "LiveBattleScore", back_populates="battle", cascade="all, delete-orphan"
+    )
+
+
+class LiveBattleScore(Base):
+    __tablename__ = "live_battle_scores"
+
+    battle_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("live_battles.battle_id", ondelete="CASCADE"), primary_key=True
+    )
+    country_name: Mapped[str] = mapped_column(String(255), primary_key=True)
+    slot: Mapped[int] = mapped_column(Integer, nullable=False)  # order in the battle's country list
+    score: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    battle: Mapped["LiveBattle"] = relationship("LiveBattle", back_populates="scores")
+
+
+class GiftEvent(Base):
+    """
+    One row per scored gift. Range-partitioned by day on created_at (hence
+    the composite primary key); old partitions are dropped by retention.
+    """
+
+    __tablename__ = "gift_events"
+    __table_args__ = {"postgresql_partition_by": "RANGE (created_at)"}
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
+    battle_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    nickname: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    gift_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    points: Mapped[int] = mapped_column(Integer, nullable=False)
+    country_name: Mapped[str] = mapped_column(String(255), nullable=False)
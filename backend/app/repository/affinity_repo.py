@@ -0,0 +1,39 @@
+import logging
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models import UserAffinity
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement (asyncpg caps a statement at 32767 bind parameters)
+UPSERT_CHUNK = 5000
+
+
+class AffinityRepository:
+    """Batched persistence for the user → country affinity store."""
+
+    async def upsert_many(self, choices: dict[str, str]) -> None:
+        """Write a batch of user → country choices in one multi-row upsert."""
+        rows = [{"user_id": user_id, "country_name": country} for user_id, country in choices.items()]
+        if not rows:
+            return
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                for start in range(0, len(rows), UPSERT_CHUNK):
+                    stmt = pg_insert(UserAffinity).values(rows[start:start + UPSERT_CHUNK])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["user_id"],
+                        set_={"country_name": stmt.excluded.country_name, "updated_at": func.now()},
+                    )
+                    await session.execute(stmt)
+
+    async def load_recent(self, limit: int) -> list[tuple[str, str]]:
+        """Most recently updated (user_id, country) pairs, newest first."""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(UserAffinity.user_id, UserAffinity.country_name)
+                .order_by(UserAffinity.updated_at.desc())
+                .limit(limit)
+            )
+            return [(row.user_id, row.country_name) for row in result]
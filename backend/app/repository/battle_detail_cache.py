@@ -0,0 +1,43 @@
+import uuid
+from collections import OrderedDict
+from app.config import get_settings
+from app.schemas import BattleDetailResponse
+
+settings = get_settings()
+
+
+class BattleDetailCache:
+    """
+    Bounded LRU of serialized GET /battle/{id} responses.
+    Only saved (finished) battles are ever in the database, and they never
+    change, so an entry is valid forever; the LRU bound
+    (BATTLE_DETAIL_CACHE_SIZE) only caps memory. Misses are not cached,
+    since a battle still in the result outbox appears later.
+    """
+
+    def __init__(self, capacity: int | None = None):
+        self._capacity = capacity or settings.BATTLE_DETAIL_CACHE_SIZE
+        self._entries: OrderedDict[uuid.UUID, bytes] = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, battle_id: uuid.UUID) -> bytes | None:
+        body = self._entries.get(battle_id)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(battle_id)
+        self.hits += 1
+        return body
+
+    def put(self, battle_id: uuid.UUID, battle) -> bytes:
+        """Serialize a battle ORM row (with results loaded) and remember it."""
+        body = BattleDetailResponse.model_validate(battle).model_dump_json().encode()
+        self._entries[battle_id] = body
+        self._entries.move_to_end(battle_id)
+        if len(self._entries) > self._capacity:
+            self._entries.popitem(last=False)
+        return body
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -1,21 +1,142 @@
 import uuid
+import base64
 import logging
-from datetime import datetime
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import insert as pg_insert
-from app.models import Battle as BattleModel, BattleResult, CountryStatistics
+from datetime import date, datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+from sqlalchemy import Select, select, text, tuple_, func
+from sqlalchemy.orm import joinedload, undefer
+from app.models import Battle as BattleModel, CountryStatistics, CountryDailyStats
 from app.database import AsyncSessionLocal
 
+if TYPE_CHECKING:
+    from app.repository.leaderboard_cache import LeaderboardCache
+
 logger = logging.getLogger(__name__)
 
 
+# One round-trip for the whole end-of-battle write. Rankings travel as
+# parallel arrays and are expanded server-side with unnest(); data-modifying
+# CTEs run even when the outer statement doesn't read them. If the battle
+# row already exists (a retried save) nothing else is written. The battle is
+# also counted in its day's country_daily_stats bucket. The upserted
+# all-time statistics rows are returned for the leaderboard cache.
+SAVE_BATTLE_SQL = text("""
+WITH b AS (
+    INSERT INTO battles (id, creator_username, started_at, ended_at, duration_seconds, winner_country, timeline)
+    VALUES (:battle_id, :creator_username, :started_at, :ended_at, :duration_seconds, :winner_country, :timeline)
+    ON CONFLICT (id) DO NOTHING
+    RETURNING id
+), ranked AS (
+    SELECT * FROM unnest(
+        CAST(:countries AS varchar[]), CAST(:scores AS integer[]), CAST(:positions AS integer[])
+    ) AS t(country_name, final_score, position)
+), results AS (
+    INSERT INTO battle_results (id, battle_id, country_name, final_score, position)
+    SELECT gen_random_uuid(), b.id, ranked.country_name, ranked.final_score, ranked.position
+    FROM b, ranked
+), daily AS (
+    INSERT INTO country_daily_stats
+        (day, country_name, total_wins, total_second_place, total_third_place, total_battles)
+    SELECT CAST(:day AS date), country_name,
+           (position = 1)::int, (position = 2)::int, (position = 3)::int, 1
+    FROM b, ranked
+    ON CONFLICT (day, country_name) DO UPDATE SET
+        total_wins = country_daily_stats.total_wins + EXCLUDED.total_wins,
+        total_second_place = country_daily_stats.total_second_place + EXCLUDED.total_second_place,
+        total_third_place = country_daily_stats.total_third_place + EXCLUDED.total_third_place,
+        total_battles = country_daily_stats.total_battles + 1
+)
+INSERT INTO country_statistics
+    (id, country_name, total_wins, total_second_place, total_third_place, total_battles)
+SELECT gen_random_uuid(), country_name,
+       (position = 1)::int, (position = 2)::int, (position = 3)::int, 1
+FROM ranked
+WHERE EXISTS (SELECT 1 FROM b)
+ON CONFLICT (country_name) DO UPDATE SET
+    total_wins = country_statistics.total_wins + EXCLUDED.total_wins,
+    total_second_place = country_statistics.total_second_place + EXCLUDED.total_second_place,
+    total_third_place = country_statistics.total_third_place + EXCLUDED.total_third_place,
+    total_battles = country_statistics.total_battles + 1
+RETURNING country_name, total_wins, total_second_place, total_third_place, total_battles
+""")
+
+
+# Recomputes the daily buckets for battles started in [:start, :end) from
+# raw results. Days are whole UTC days; the caller clears them first.
+REBUILD_DAILY_STATS_SQL = text("""
+INSERT INTO country_daily_stats
+    (day, country_name, total_wins, total_second_place, total_third_place, total_battles)
+SELECT CAST(b.started_at AT TIME ZONE 'UTC' AS date), r.country_name,
+       count(*) FILTER (WHERE r.position = 1),
+       count(*) FILTER (WHERE r.position = 2),
+       count(*) FILTER (WHERE r.position = 3),
+       count(*)
+FROM battles b
+JOIN battle_results r ON r.battle_id = b.id
+WHERE b.started_at >= :start AND b.started_at < :end
+GROUP BY 1, 2
+""")
+
+
+def stats_day(started_at: datetime) -> date:
+    """country_daily_stats bucket of a battle: the UTC day it started."""
+    return started_at.astimezone(timezone.utc).date()
+
+
+def _utc_midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def encode_cursor(battle: BattleModel) -> str:
+    """Opaque keyset cursor pointing just past `battle` in history order."""
+    raw = f"{battle.started_at.isoformat()}|{battle.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        started_at, _, battle_id = raw.partition("|")
+        return datetime.fromisoformat(started_at), uuid.UUID(battle_id)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def history_query(
+    limit: int,
+    cursor: tuple[datetime, uuid.UUID] | None = None,
+    creator: str | None = None,
+    winner: str | None = None,
+) -> Select:
+    """
+    Newest-first page of battles, keyset-paginated on (started_at, id).
+    Each page is an index range scan that starts at the cursor, so its cost
+    does not depend on how deep into history it is (unlike OFFSET).
+    Backed by ix_battles_started_at_id and the per-creator/per-winner
+    composite indexes from migration 0005.
+    """
+    stmt = select(BattleModel)
+    if creator is not None:
+        stmt = stmt.where(BattleModel.creator_username == creator)
+    if winner is not None:
+        stmt = stmt.where(BattleModel.winner_country == winner)
+    if cursor is not None:
+        stmt = stmt.where(tuple_(BattleModel.started_at, BattleModel.id) < tuple_(*cursor))
+    return stmt.order_by(BattleModel.started_at.desc(), BattleModel.id.desc()).limit(limit)
+
+
 class BattleRepository:
     """
     All database writes are async and wrapped in a single transaction.
     Uses PostgreSQL upsert for country_statistics to handle concurrency.
+    With a leaderboard cache attached, the statistics a save commits are
+    written through to it.
     """
 
+    def __init__(self, leaderboard: "LeaderboardCache | None" = None):
+        self.leaderboard = leaderboard
+
     async def save_battle_result(
         self,
         battle_id: uuid.UUID,
@@ -25,84 +146,67 @@ class BattleRepository:
         duration_seconds: int,
         winner_country: str | None,
         rankings: list[dict],
+        timeline: bytes | None = None,
     ) -> None:
         """
-        Atomically:
-        1. Insert battle row
-        2. Insert 4 battle_result rows
-        3. Upsert country_statistics for each country
+        Atomically, in a single statement (one round-trip):
+        1. Insert battle row (with its encoded score timeline, if any)
+        2. Insert one battle_result row per country
+        3. Upsert country_statistics and the day's country_daily_stats for each country
         """
         async with AsyncSessionLocal() as session:
             async with session.begin():
-                # 1. Insert battle
-                battle_row = BattleModel(
-                    id=battle_id,
-                    creator_username=creator_username,
-                    started_at=started_at,
-                    ended_at=ended_at,
-                    duration_seconds=duration_seconds,
-                    winner_country=winner_country,
-                )
-                session.add(battle_row)
-                await session.flush()  # Ensure battle_id exists for FK
-
-                # 2. Insert battle_results (one per country, unique constraint protected)
-                for entry in rankings:
-                    result_row = BattleResult(
-                        id=uuid.uuid4(),
-                        battle_id=battle_id,
-                        country_name=entry["country"],
-                        final_score=entry["score"],
-                        position=entry["position"],
-                    )
-                    session.add(result_row)
-
-                # 3. Upsert country_statistics using PostgreSQL ON CONFLICT
-                for entry in rankings:
-                    country = entry["country"]
-                    position = entry["position"]
-
-                    stmt = pg_insert(CountryStatistics).values(
-                        id=uuid.uuid4(),
-                        country_name=country,
-                        total_wins=1 if position == 1 else 0,
-                        total_second_place=1 if position == 2 else 0,
-                        total_third_place=1 if position == 3 else 0,
-                        total_battles=1,
-                    ).on_conflict_do_update(
-                        index_elements=["country_name"],
-                        set_={
-                            "total_wins": CountryStatistics.total_wins + (1 if position == 1 else 0),
-                            "total_second_place": CountryStatistics.total_second_place + (1 if position == 2 else 0),
-                            "total_third_place": CountryStatistics.total_third_place + (1 if position == 3 else 0),
-                            "total_battles": CountryStatistics.total_battles + 1,
-                        }
-                    )
-                    await session.execute(stmt)
+                result = await session.execute(SAVE_BATTLE_SQL, {
+                    "battle_id": battle_id,
+                    "creator_username": creator_username,
+                    "started_at": started_at,
+                    "ended_at": ended_at,
+                    "duration_seconds": duration_seconds,
+                    "winner_country": winner_country,
+                    "timeline": timeline,
+                    "day": stats_day(started_at),
+                    "countries": [entry["country"] for entry in rankings],
+                    "scores": [entry["score"] for entry in rankings],
+                    "positions": [entry["position"] for entry in rankings],
+                })
+                stats = [dict(row) for row in result.mappings()]
+
+        # Committed — publish the new statistics
+        if self.leaderboard is not None:
+            self.leaderboard.apply(stats)
 
         logger.info(f"Battle {battle_id} saved to DB successfully.")
 
-    async def get_history(self, limit: int = 20) -> list[BattleModel]:
+    async def get_history(
+        self,
+        limit: int = 20,
+        cursor: tuple[datetime, uuid.UUID] | None = None,
+        creator: str | None = None,
+        winner: str | None = None,
+    ) -> list[BattleModel]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(history_query(limit, cursor, creator, winner))
+            return list(result.scalars().all())
+
+    async def get_battle_by_id(self, battle_id: uuid.UUID) -> BattleModel | None:
+        """A battle with its results (ordered by position), in one joined query."""
         async with AsyncSessionLocal() as session:
             result = await session.execute(
                 select(BattleModel)
-                .order_by(BattleModel.started_at.desc())
-                .limit(limit)
+                .options(joinedload(BattleModel.results))
+                .where(BattleModel.id == battle_id)
             )
-            return list(result.scalars().all())
+            return result.unique().scalar_one_or_none()
 
-    async def get_battle_by_id(self, battle_id: uuid.UUID) -> BattleModel | None:
+    async def get_battle_with_timeline(self, battle_id: uuid.UUID) -> BattleModel | None:
+        """Like get_battle_by_id, but also loads the (deferred) score timeline."""
         async with AsyncSessionLocal() as session:
             result = await session.execute(
-                select(BattleModel).where(BattleModel.id == battle_id)
+                select(BattleModel)
+                .options(joinedload(BattleModel.results), undefer(BattleModel.timeline))
+                .where(BattleModel.id == battle_id)
             )
-            battle = result.scalar_one_or_none()
-            if battle:
-                # Eager load results
-                await session.execute(
-                    select(BattleResult).where(BattleResult.battle_id == battle_id)
-                )
-            return battle
+            return result.unique().scalar_one_or_none()
 
     async def get_leaderboard(self) -> list[CountryStatistics]:
         async with AsyncSessionLocal() as session:
@@ -111,3 +215,55 @@ class BattleRepository:
                 .order_by(CountryStatistics.total_wins.desc())
             )
             return list(result.scalars().all())
+
+    async def get_windowed_leaderboard(self, days: int, today: date | None = None) -> list[dict]:
+        """
+        Country statistics over the last `days` UTC days (today included),
+        summed from the daily rollups — at most `days` rows per country.
+        """
+        today = today or datetime.now(timezone.utc).date()
+        since = today - timedelta(days=days - 1)
+        totals = [
+            func.sum(getattr(CountryDailyStats, field)).label(field)
+            for field in ("total_wins", "total_second_place", "total_third_place", "total_battles")
+        ]
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(CountryDailyStats.country_name, *totals)
+                .where(CountryDailyStats.day >= since)
+                .group_by(CountryDailyStats.country_name)
+                .order_by(
+                    totals[0].desc(), totals[1].desc(), totals[2].desc(), CountryDailyStats.country_name
+                )
+            )
+            return [dict(row) for row in result.mappings()]
+
+    async def get_started_day_range(self) -> tuple[date, date] | None:
+        """UTC days of the oldest and newest saved battles, or None if there are none."""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(func.min(BattleModel.started_at), func.max(BattleModel.started_at))
+            )
+            first, last = result.one()
+        if first is None:
+            return None
+        return stats_day(first), stats_day(last)
+
+    async def rebuild_daily_stats(self, start: date, end: date) -> int:
+        """
+        Recompute the daily rollups for days in [start, end) from battle
+        history, in one transaction. The table is locked against concurrent
+        saves meanwhile, so a battle saved during the rebuild is neither
+        lost nor counted twice. Returns the number of rollup rows written.
+        """
+        async with AsyncSessionLocal() as session:
+            async with session.begin():
+                await session.execute(text("LOCK TABLE country_daily_stats IN SHARE ROW EXCLUSIVE MODE"))
+                await session.execute(
+                    CountryDailyStats.__table__.delete()
+                    .where(CountryDailyStats.day >= start, CountryDailyStats.day < end)
+                )
+                result = await session.execute(
+                    REBUILD_DAILY_STATS_SQL, {"start": _utc_midnight(start), "end": _utc_midnight(end)}
+                )
+                return result.rowcount
@@ -0,0 +1,76 @@
+import uuid
+import logging
+from sqlalchemy import select, delete, func
+from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.models import LiveBattle, LiveBattleScore
+from app.database import CheckpointSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointRepository:
+    """
+    Live battle checkpoints. Uses the dedicated checkpoint connection pool,
+    never the request pool.
+    """
+
+    async def write(
+        self,
+        battles: list[dict],
+        scores: list[dict],
+        rooms: list[str],
+        live_ids: list[uuid.UUID],
+    ) -> None:
+        """
+        In one transaction:
+        1. Upsert the changed battles' header rows
+        2. Upsert their per-country running scores (one multi-row statement)
+        3. Delete checkpoints of battles in `rooms` that are no longer live
+        """
+        async with CheckpointSessionLocal() as session:
+            async with session.begin():
+                if battles:
+                    stmt = pg_insert(LiveBattle).values(battles)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["battle_id"],
+                        set_={
+                            "version": stmt.excluded.version,
+                            "last_gift": stmt.excluded.last_gift,
+                            "updated_at": func.now(),
+                        },
+                    )
+                    await session.execute(stmt)
+
+                if scores:
+                    stmt = pg_insert(LiveBattleScore).values(scores)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["battle_id", "country_name"],
+                        set_={"score": stmt.excluded.score, "position": stmt.excluded.position},
+                    )
+                    await session.execute(stmt)
+
+                if rooms:
+                    # Scores go with their battle (ON DELETE CASCADE)
+                    await session.execute(
+                        delete(LiveBattle).where(
+                            LiveBattle.room.in_(rooms),
+                            LiveBattle.battle_id.not_in(live_ids),
+                        )
+                    )
+
+    async def load_live(self) -> list[LiveBattle]:
+        """Every checkpointed battle with its scores, oldest first."""
+        async with CheckpointSessionLocal() as session:
+            result = await session.execute(
+                select(LiveBattle)
+                .options(selectinload(LiveBattle.scores))
+                .order_by(LiveBattle.started_at)
+            )
+            return list(result.scalars().all())
+
+    async def live_rooms(self) -> list[str]:
+        """Rooms with a checkpointed battle."""
+        async with CheckpointSessionLocal() as session:
+            result = await session.execute(select(LiveBattle.room).distinct())
+            return list(result.scalars().all())
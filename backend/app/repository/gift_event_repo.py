@@ -0,0 +1,92 @@
+import logging
+from datetime import date, timedelta
+from sqlalchemy import text
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+TABLE = "gift_events"
+PARTITION_PREFIX = f"{TABLE}_p"  # gift_events_p20261017
+DEFAULT_PARTITION = f"{TABLE}_default"
+COPY_COLUMNS = ["battle_id", "user_id", "nickname", "gift_name", "points", "country_name", "created_at"]
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+class GiftEventRepository:
+    """
+    Bulk writes and partition maintenance for the gift_events log.
+    Rows are loaded with asyncpg's binary COPY protocol: one round-trip per
+    batch, however many events it holds.
+    """
+
+    async def copy_events(self, rows: list[tuple]) -> None:
+        """COPY a batch of rows (in COPY_COLUMNS order) into gift_events."""
+        if not rows:
+            return
+        async with engine.connect() as conn:
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(TABLE, records=rows, columns=COPY_COLUMNS)
+
+    async def ensure_partitions(self, today: date, days_ahead: int = 2) -> None:
+        """
+        Create daily partitions from yesterday through `days_ahead` days from
+        now, each in its own transaction so one failing day doesn't block the
+        others. Rows that already landed in the DEFAULT partition for a day
+        (e.g. after maintenance was down) are moved into the new partition —
+        Postgres refuses to create a partition whose range DEFAULT still holds.
+        """
+        for offset in range(-1, days_ahead + 1):
+            day = today + timedelta(days=offset)
+            try:
+                await self._ensure_partition(day)
+            except Exception as e:
+                logger.error(f"Could not create gift event partition {partition_name(day)}: {e}")
+
+    async def _ensure_partition(self, day: date) -> None:
+        name = partition_name(day)
+        start, end = day.isoformat(), (day + timedelta(days=1)).isoformat()
+        values = f"FROM ('{start}') TO ('{end}')"
+        in_range = f"created_at >= '{start}' AND created_at < '{end}'"
+        exists = text("SELECT to_regclass(CAST(:name AS text)) IS NOT NULL")
+        async with engine.begin() as conn:
+            if await conn.scalar(exists, {"name": name}):
+                return
+            # Keep writers (and other maintainers) out of DEFAULT until the day's rows have moved
+            await conn.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN SHARE ROW EXCLUSIVE MODE"))
+            if await conn.scalar(exists, {"name": name}):
+                return
+            stray = await conn.scalar(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+            if not stray:
+                await conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {values}"))
+                return
+            logger.error(
+                f"{stray} gift events for {day.isoformat()} are in {DEFAULT_PARTITION}; "
+                f"moving them into {name}."
+            )
+            await conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+            await conn.execute(text(
+                f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+                f"INSERT INTO {name} SELECT * FROM moved"
+            ))
+            await conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {values}"))
+
+    async def drop_partitions_before(self, cutoff: date) -> list[str]:
+        """Drop daily partitions that hold only days before `cutoff`. Returns the dropped names."""
+        async with engine.begin() as conn:
+            result = await conn.execute(text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :table"
+            ), {"table": TABLE})
+            dropped = []
+            for name in result.scalars().all():
+                if not name.startswith(PARTITION_PREFIX):
+                    continue  # the DEFAULT partition
+                if name < partition_name(cutoff):
+                    await conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    dropped.append(name)
+            return dropped
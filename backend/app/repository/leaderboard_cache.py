@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import logging
+from typing import TYPE_CHECKING
+from app.ws.codec import dumps
+
+if TYPE_CHECKING:
+    from app.repository.battle_repo import BattleRepository
+    from app.ws.bus import BroadcastBus
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ("total_wins", "total_second_place", "total_third_place", "total_battles")
+TOPIC = "leaderboard"
+
+
+class LeaderboardCache:
+    """
+    In-process, pre-serialized copy of country_statistics.
+    Loaded once from the DB, then kept current write-through: the rows
+    save_battle_result upserts are applied as soon as its transaction
+    commits, so GET /leaderboard never needs Postgres. Every change bumps
+    `version` and re-encodes the body once; the ETag is a content hash, so
+    it is identical across processes holding the same data.
+    With a bus attached, applied rows are published on it, so the caches of
+    other processes on a distributed bus stay current too.
+    """
+
+    def __init__(self, bus: "BroadcastBus | None" = None):
+        self.bus = bus
+        if bus is not None:
+            bus.subscribe(TOPIC, self._merge)
+        self._rows: dict[str, dict] = {}
+        self._load_lock = asyncio.Lock()
+        self.loaded: bool = False
+        self.version: int = 0
+        self.body: bytes = b"[]"
+        self.etag: str = ""
+        self._encode()
+
+    async def load(self, repo: "BattleRepository") -> None:
+        """(Re)load the full leaderboard from the DB."""
+        async with self._load_lock:
+            if self.loaded:
+                return
+            stats = await repo.get_leaderboard()
+            rows = {
+                row.country_name: {"country_name": row.country_name, **{f: getattr(row, f) for f in STAT_FIELDS}}
+                for row in stats
+            }
+            # A save that committed while the query ran is already newer
+            rows.update(self._rows)
+            self._rows = rows
+            self.loaded = True
+            self._encode()
+
+    def apply(self, rows: list[dict]) -> None:
+        """Merge freshly upserted country_statistics rows."""
+        if not rows:
+            return
+        if self.bus is not None:
+            self.bus.publish(TOPIC, rows)
+        else:
+            self._merge(rows)
+
+    def _merge(self, rows: list[dict]) -> None:
+        for row in rows:
+            self._rows[row["country_name"]] = {"country_name": row["country_name"], **{f: row[f] for f in STAT_FIELDS}}
+        self._encode()
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """Whether an If-None-Match header already names the current body."""
+        if not if_none_match or not self.loaded:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags
+
+    def _encode(self) -> None:
+        ranked = sorted(
+            self._rows.values(),
+            key=lambda row: (-row["total_wins"], -row["total_second_place"], -row["total_third_place"], row["country_name"]),
+        )
+        self.body = dumps(ranked)
+        self.etag = f'"{hashlib.blake2b(self.body, digest_size=8).hexdigest()}"'
+        self.version += 1
@@ -1,6 +1,7 @@
 import logging
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 from app.schemas import ManualScoreRequest, StartBattleRequest, MessageResponse
+from app.battle.manager import default_room
 
 router = APIRouter(tags=["Admin"])
 logger = logging.getLogger(__name__)
@@ -9,8 +10,143 @@ logger = logging.getLogger(__name__)
 @router.post("/manual-score", response_model=MessageResponse)
 async def manual_score(request: Request, payload: ManualScoreRequest):
     """Add points manually to a country in the active battle."""
+    return await _manual_score(request, payload, room=None)
+
+
+@router.post("/rooms/{room}/manual-score", response_model=MessageResponse)
+async def room_manual_score(request: Request, room: str, payload: ManualScoreRequest):
+    """Add points manually to a country in a room's active battle."""
+    return await _manual_score(request, payload, room=room)
+
+
+@router.post("/reset", response_model=MessageResponse)
+async def reset_battle(request: Request, payload: StartBattleRequest | None = None):
+    """
+    Reset the active battle (start a fresh one).
+    Does NOT delete battle history from the database.
+    """
+    return await _reset(request, payload, room=None)
+
+
+@router.post("/rooms/{room}/reset", response_model=MessageResponse)
+async def room_reset_battle(request: Request, room: str, payload: StartBattleRequest | None = None):
+    """Reset (or open) a room's battle. Does NOT delete battle history."""
+    return await _reset(request, payload, room=room)
+
+
+@router.get("/active-battle")
+async def get_active_battle(request: Request):
+    """Return the current active battle state."""
+    return _active_battle(request, room=None)
+
+
+@router.get("/rooms/{room}/active-battle")
+async def get_room_active_battle(request: Request, room: str):
+    """Return a room's active battle state."""
+    return _active_battle(request, room=room)
+
+
+@router.get("/rooms")
+async def list_rooms(request: Request):
+    """Return rooms with an active battle and their viewer counts."""
     battle_manager = request.app.state.battle_manager
-    battle = battle_manager.get_active_battle()
+    ws_manager = request.app.state.ws_manager
+    return [
+        {
+            "room": room,
+            "battle_id": str(battle_manager.battles[room].id),
+            "viewers": ws_manager.connection_count(room),
+        }
+        for room in battle_manager.active_rooms()
+    ]
+
+
+@router.get("/stats")
+async def get_stats(request: Request):
+    """Runtime counters for the timer wheel, gift ingestion, persistence and WebSocket/SSE fan-out."""
+    ws_manager = request.app.state.ws_manager
+    return {
+        "timer": request.app.state.timer_wheel.stats(),
+        "ingest": request.app.state.ingestor.stats(),
+        "gift_events": request.app.state.gift_recorder.stats() if request.app.state.gift_recorder else None,
+        "affinity": request.app.state.affinity.stats(),
+        "journal": request.app.state.journal.stats() if request.app.state.journal else None,
+        "checkpoint": request.app.state.checkpointer.stats(),
+        "outbox": request.app.state.outbox.stats(),
+        "battle_details": request.app.state.battle_details.stats(),
+        "bus": request.app.state.bus.stats(),
+        "leadership": request.app.state.leadership.stats() if request.app.state.leadership else None,
+        "ws": {
+            "connections": ws_manager.connection_count(),
+            "frames_dropped": ws_manager.frames_dropped,
+            "clients_evicted": ws_manager.clients_evicted,
+        },
+        "sse": request.app.state.events.stats(),
+    }
+
+
+async def run_command(state, command: dict) -> None:
+    """Run an admin command a follower forwarded to this process (the room's owner)."""
+    op, room = command.pop("op"), command.pop("room")
+    try:
+        if op == "manual_score":
+            await _apply_manual_score(state, ManualScoreRequest(**command), room)
+        elif op == "reset":
+            await _apply_reset(state, StartBattleRequest(**command) if command else None, room)
+        else:
+            logger.warning(f"Ignoring unknown forwarded command {op!r}")
+    except HTTPException as e:
+        logger.warning(f"Forwarded {op} for room '{room}' rejected: {e.detail}")
+
+
+async def _forward(
+    request: Request, room: str | None, op: str, payload, opens_room: bool = False
+) -> MessageResponse | None:
+    """
+    With leader election, hand the command to the room's owner unless this
+    process owns the room (or can claim it now). None means: run it here.
+    Only a command that `opens_room` (reset) may claim a room nobody is
+    using; anything else there is a 404, without taking a lock.
+    """
+    leadership = request.app.state.leadership
+    if leadership is None:
+        return None
+    room = room or default_room()
+    if leadership.owns(room):
+        return None
+    if not opens_room and room != default_room() and not await leadership.is_active(room):
+        raise HTTPException(status_code=404, detail="No active battle running.")
+    if await leadership.claim(room):
+        return None
+    command = {"op": op, **(payload.model_dump() if payload else {})}
+    if not leadership.forward(room, command):
+        raise HTTPException(status_code=503, detail=f"Room '{room}' is run by another process and no shared bus is configured.")
+    return MessageResponse(message="Forwarded", detail=f"Sent to the process that owns room '{room}'")
+
+
+async def _release_if_idle(request: Request, room: str | None) -> None:
+    """Give back a room this process claimed for a command that left no battle running in it."""
+    leadership = request.app.state.leadership
+    room = room or default_room()
+    if leadership is None or room == default_room() or not leadership.owns(room):
+        return
+    if request.app.state.battle_manager.get_active_battle(room) is None:
+        await leadership.release(room)
+
+
+async def _manual_score(request: Request, payload: ManualScoreRequest, room: str | None) -> MessageResponse:
+    forwarded = await _forward(request, room, "manual_score", payload)
+    if forwarded:
+        return forwarded
+    try:
+        return await _apply_manual_score(request.app.state, payload, room)
+    finally:
+        await _release_if_idle(request, room)
+
+
+async def _apply_manual_score(state, payload: ManualScoreRequest, room: str | None) -> MessageResponse:
+    battle_manager = state.battle_manager
+    battle = battle_manager.get_active_battle(room)
 
     if not battle:
         raise HTTPException(status_code=404, detail="No active battle running.")
@@ -36,8 +172,15 @@ async def manual_score(request: Request, payload: ManualScoreRequest):
     if not success:
         raise HTTPException(status_code=409, detail="Battle already finished.")
 
-    ws_manager = request.app.state.ws_manager
-    await ws_manager.broadcast(battle.get_state())
+    recorder = state.gift_recorder
+    if gift_info and recorder is not None:
+        recorder.record(battle.id, None, "Admin", payload.gift, payload.points, payload.country)
+
+    broadcaster = state.broadcaster
+    if gift_info and gift_info["is_lion"]:
+        await broadcaster.flush_now(battle)
+    else:
+        broadcaster.mark_dirty(battle)
 
     return MessageResponse(
         message="Score updated",
@@ -45,17 +188,21 @@ async def manual_score(request: Request, payload: ManualScoreRequest):
     )
 
 
-@router.post("/reset", response_model=MessageResponse)
-async def reset_battle(request: Request, payload: StartBattleRequest | None = None):
-    """
-    Reset the active battle (start a fresh one).
-    Does NOT delete battle history from the database.
-    """
-    battle_manager = request.app.state.battle_manager
-    ws_manager = request.app.state.ws_manager
-    battle_repo = request.app.state.battle_repo
+async def _reset(request: Request, payload: StartBattleRequest | None, room: str | None) -> MessageResponse:
+    forwarded = await _forward(request, room, "reset", payload, opens_room=True)
+    if forwarded:
+        return forwarded
+    try:
+        return await _apply_reset(request.app.state, payload, room)
+    finally:
+        await _release_if_idle(request, room)
+
+
+async def _apply_reset(state, payload: StartBattleRequest | None, room: str | None) -> MessageResponse:
+    battle_manager = state.battle_manager
+    ws_manager = state.ws_manager
 
-    creator = (payload.creator_username if payload else None) or "admin"
+    creator = (payload.creator_username if payload else None) or room or "admin"
     countries = (payload.countries if payload else None)
     duration = (payload.duration_seconds if payload else None)
 
@@ -64,7 +211,7 @@ async def reset_battle(request: Request, payload: StartBattleRequest | None = No
         countries=countries,
         duration_seconds=duration,
         ws_manager=ws_manager,
-        battle_repo=battle_repo,
+        room=room,
     )
 
     return MessageResponse(
@@ -73,13 +220,22 @@ async def reset_battle(request: Request, payload: StartBattleRequest | None = No
     )
 
 
-@router.get("/active-battle")
-async def get_active_battle(request: Request):
-    """Return the current active battle state."""
+def _active_battle(request: Request, room: str | None):
     battle_manager = request.app.state.battle_manager
-    battle = battle_manager.get_active_battle()
+    battle = battle_manager.get_active_battle(room)
 
     if not battle:
-        return {"active": False, "battle": None}
+        # Run by another process: answer from the last state frame it broadcast
+        snapshot = request.app.state.ws_manager.latest_state(room or default_room())
+        if snapshot is None:
+            return {"active": False, "battle": None}
+        return Response(
+            content=b'{"active":true,"battle":' + snapshot.encode() + b"}",
+            media_type="application/json",
+        )
 
-    return {"active": True, "battle": battle.get_state()}
+    # Splice the cached snapshot bytes in instead of re-serializing the state
+    return Response(
+        content=b'{"active":true,"battle":' + battle.snapshot() + b"}",
+        media_type="application/json",
+    )
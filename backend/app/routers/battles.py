@@ -1,39 +1,59 @@
 import uuid
 import logging
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.models import Battle as BattleModel, BattleResult
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from app.schemas import BattleDetailResponse, BattleHistoryItem
-from app.repository.battle_repo import BattleRepository
+from app.repository.battle_repo import BattleRepository, encode_cursor, decode_cursor
 
 router = APIRouter(tags=["Battles"])
 logger = logging.getLogger(__name__)
 repo = BattleRepository()
 
+# Saved battles never change
+IMMUTABLE = "public, max-age=31536000, immutable"
+
 
 @router.get("/history", response_model=list[BattleHistoryItem])
-async def get_history():
-    """Return the last 20 completed battles."""
-    battles = await repo.get_history(limit=20)
+async def get_history(
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    creator: str | None = None,
+    winner: str | None = None,
+):
+    """
+    Return completed battles, newest first, one page at a time.
+    When more battles exist, the X-Next-Cursor header carries the cursor
+    for the next page.
+    """
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # One extra row tells us whether there is a next page
+    battles = await repo.get_history(limit=limit + 1, cursor=position, creator=creator, winner=winner)
+    if len(battles) > limit:
+        battles = battles[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(battles[-1])
     return battles
 
 
 @router.get("/battle/{battle_id}", response_model=BattleDetailResponse)
-async def get_battle(battle_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    """Return full details of a specific battle including country results."""
-    result = await db.execute(
-        select(BattleModel).where(BattleModel.id == battle_id)
-    )
-    battle = result.scalar_one_or_none()
-    if not battle:
-        raise HTTPException(status_code=404, detail="Battle not found")
-
-    results_q = await db.execute(
-        select(BattleResult)
-        .where(BattleResult.battle_id == battle_id)
-        .order_by(BattleResult.position)
-    )
-    battle.results = list(results_q.scalars().all())
-    return battle
+async def get_battle(request: Request, battle_id: uuid.UUID):
+    """
+    Return full details of a specific battle including country results.
+    Finished battles are immutable: responses come from an in-memory LRU
+    and are marked cacheable forever.
+    """
+    headers = {"Cache-Control": IMMUTABLE, "ETag": f'"{battle_id}"'}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    cache = request.app.state.battle_details
+    body = cache.get(battle_id)
+    if body is None:
+        battle = await repo.get_battle_by_id(battle_id)
+        if not battle:
+            raise HTTPException(status_code=404, detail="Battle not found")
+        body = cache.put(battle_id, battle)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,15 +1,49 @@
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from app.config import get_settings
 from app.schemas import LeaderboardEntry
-from app.repository.battle_repo import BattleRepository
 
 router = APIRouter(tags=["Leaderboard"])
 logger = logging.getLogger(__name__)
-repo = BattleRepository()
+settings = get_settings()
+
+
+def parse_window(window: str) -> int:
+    """'7d' → 7. Raises ValueError for anything else or out of range."""
+    if not window.endswith("d") or not window[:-1].isdigit():
+        raise ValueError(f"Invalid window {window!r}; expected e.g. 1d, 7d, 30d")
+    days = int(window[:-1])
+    if not 1 <= days <= settings.LEADERBOARD_MAX_WINDOW_DAYS:
+        raise ValueError(f"Window must be between 1d and {settings.LEADERBOARD_MAX_WINDOW_DAYS}d")
+    return days
 
 
 @router.get("/leaderboard", response_model=list[LeaderboardEntry])
-async def get_leaderboard():
-    """Return country statistics sorted by total wins descending."""
-    stats = await repo.get_leaderboard()
-    return stats
+async def get_leaderboard(
+    request: Request,
+    window: str | None = Query(None, description="Last N UTC days, e.g. 1d, 7d, 30d (default: all time)"),
+):
+    """
+    Return country statistics sorted by total wins descending.
+    All time: served from the in-memory leaderboard cache; supports
+    If-None-Match → 304. With ?window=Nd: summed from the daily rollups.
+    """
+    if window is not None:
+        try:
+            days = parse_window(window)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await request.app.state.battle_repo.get_windowed_leaderboard(days)
+
+    cache = request.app.state.leaderboard
+    if not cache.loaded:
+        try:
+            await cache.load(request.app.state.battle_repo)
+        except Exception as e:
+            logger.warning(f"Leaderboard load failed: {e}")
+            raise HTTPException(status_code=503, detail="Leaderboard temporarily unavailable.")
+
+    headers = {"ETag": cache.etag, "Cache-Control": "no-cache"}
+    if cache.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cache.body, media_type="application/json", headers=headers)
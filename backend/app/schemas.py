@@ -1,6 +1,9 @@
 import uuid
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from app.config import get_settings
+
+settings = get_settings()
 
 
 # --- Battle Schemas ---
@@ -72,14 +75,15 @@ class LeaderboardEntry(BaseModel):
 
 class ManualScoreRequest(BaseModel):
     country: str
-    points: int
+    # Final scores are saved as Postgres integers
+    points: int = Field(ge=-1_000_000, le=1_000_000)
     gift: str | None = None
 
 
 class StartBattleRequest(BaseModel):
     creator_username: str = "admin"
     countries: list[str] | None = None
-    duration_seconds: int | None = None
+    duration_seconds: int | None = Field(default=None, ge=1, le=settings.BATTLE_MAX_DURATION_SECONDS)
 
 
 # --- Generic ---
@@ -0,0 +1,305 @@
+import abc
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Callable
+import orjson
+import asyncpg
+from sqlalchemy.engine import make_url
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# NOTIFY payloads must stay under 8000 bytes; leave room for the chunk header
+CHUNK_BYTES = 7800
+# Incomplete multi-chunk messages kept while waiting for their remaining chunks
+MAX_PARTIAL_MESSAGES = 256
+RECONNECT_MAX_SECONDS = 10.0
+
+Subscriber = Callable[[Any], None]
+
+
+class BroadcastBus(abc.ABC):
+    """
+    Pub/sub underneath WebSocketManager (and the leaderboard cache): every
+    message published on a topic is handed to that topic's subscribers in
+    this process and, for distributed backends, in every other process on
+    the bus. Subscribers are plain callbacks and must not block. Payloads
+    must be JSON-serializable.
+    """
+
+    # Whether other processes receive what this one publishes
+    distributed: bool = False
+
+    def __init__(self):
+        self._subscribers: dict[str, list[Subscriber]] = {}
+        self.published: int = 0
+        self.received: int = 0
+
+    def subscribe(self, topic: str, callback: Subscriber) -> None:
+        self._subscribers.setdefault(topic, []).append(callback)
+
+    @abc.abstractmethod
+    def publish(self, topic: str, payload: Any, droppable: bool = False) -> None:
+        """Deliver to local subscribers now and queue for other processes. Never waits on I/O."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__, "published": self.published, "received": self.received}
+
+    def _dispatch(self, topic: str, payload: Any) -> None:
+        for callback in self._subscribers.get(topic, ()):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.warning(f"Bus subscriber for '{topic}' failed: {e}")
+
+
+class InProcessBus(BroadcastBus):
+    """Single-process bus: publish() is a direct call to the subscribers."""
+
+    def publish(self, topic: str, payload: Any, droppable: bool = False) -> None:
+        self.published += 1
+        self._dispatch(topic, payload)
+
+
+class PostgresBus(BroadcastBus):
+    """
+    Bus over Postgres LISTEN/NOTIFY on BUS_CHANNEL, using the database the
+    app already runs — no extra infrastructure.
+
+    One dedicated asyncpg connection both listens and notifies. publish()
+    delivers locally right away and queues the message; a background task
+    sends everything queued in a single `pg_notify` statement per round-trip.
+    Messages over the NOTIFY size limit are split into chunks tagged
+    `origin:seq:index:count:` and reassembled by receivers; a process
+    ignores its own notifications (already delivered locally).
+
+    The send queue holds BUS_QUEUE_SIZE messages; when full, the oldest
+    droppable message (a superseded state frame) goes first. Must-deliver
+    messages are never shed: if the queue holds nothing else, a new one is
+    rejected instead (logged, and counted as `rejected`). If the
+    connection drops it is re-established with backoff; must-deliver
+    messages wait for it, while state frames are dropped and WS clients
+    recover with the next one.
+    """
+
+    distributed = True
+
+    def __init__(
+        self,
+        dsn: str | None = None,
+        channel: str | None = None,
+        queue_size: int | None = None,
+    ):
+        super().__init__()
+        self._dsn = dsn or make_url(settings.DATABASE_URL).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self.channel = channel or settings.BUS_CHANNEL
+        self._queue_size = queue_size or settings.BUS_QUEUE_SIZE
+        self._origin = uuid.uuid4().hex[:12]
+        self._seq: int = 0
+        self._queue: deque[tuple[list[str], bool]] = deque()
+        self._partials: OrderedDict[str, list[str | None]] = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._conn: asyncpg.Connection | None = None
+        self._task: asyncio.Task | None = None
+
+        # Counters
+        self.notifications_sent: int = 0
+        self.dropped: int = 0
+        self.rejected: int = 0
+        self.reconnects: int = 0
+        self.last_error: str | None = None
+
+    async def start(self) -> None:
+        """Connect and LISTEN (so nothing published after startup is missed), then start sending."""
+        try:
+            await self._connect()
+        except Exception as e:
+            # The sender keeps retrying
+            self.last_error = str(e)
+            logger.warning(f"Broadcast bus could not connect yet: {e}")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        await self._close()
+
+    def publish(self, topic: str, payload: Any, droppable: bool = False) -> None:
+        self.published += 1
+        self._dispatch(topic, payload)
+
+        if len(self._queue) >= self._queue_size and not self._shed(topic, droppable):
+            return
+        self._queue.append((self._chunk(orjson.dumps([topic, payload])), droppable))
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "channel": self.channel,
+            "connected": self._conn is not None and not self._conn.is_closed(),
+            "queued": len(self._queue),
+            "notifications_sent": self.notifications_sent,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+    def _shed(self, topic: str, droppable: bool) -> bool:
+        """
+        Make room for one new message by dropping the oldest queued droppable
+        one. With none queued, the new message is not sent: a droppable one is
+        dropped, a must-deliver one rejected. Returns whether to queue it.
+        """
+        for idx, (_, queued_droppable) in enumerate(self._queue):
+            if queued_droppable:
+                del self._queue[idx]
+                self.dropped += 1
+                return True
+        if droppable:
+            self.dropped += 1
+            return False
+        self.rejected += 1
+        logger.error(
+            f"Broadcast bus queue is full of must-deliver messages; "
+            f"not sending a '{topic}' message to other processes."
+        )
+        return False
+
+    def _requeue(self, unsent: deque[tuple[list[str], bool]]) -> None:
+        """
+        After a failed send: put the unsent batch back ahead of what was
+        published since, keeping only must-deliver messages. State frames
+        are stale by the time the bus reconnects.
+        """
+        queued = len(unsent) + len(self._queue)
+        self._queue = deque(item for item in (*unsent, *self._queue) if not item[1])
+        self.dropped += queued - len(self._queue)
+
+    def _chunk(self, data: bytes) -> list[str]:
+        self._seq += 1
+        parts = []
+        start = 0
+        while start < len(data) or not parts:
+            end = min(start + CHUNK_BYTES, len(data))
+            # Never split a UTF-8 sequence: back up to a character boundary
+            while end < len(data) and data[end] & 0xC0 == 0x80:
+                end -= 1
+            parts.append(data[start:end].decode())
+            start = end
+        return [f"{self._origin}:{self._seq}:{idx}:{len(parts)}:{part}" for idx, part in enumerate(parts)]
+
+    async def _run(self) -> None:
+        delay = 0.0
+        batch: deque[tuple[list[str], bool]] = deque()
+        try:
+            while True:
+                connected = self._conn is not None and not self._conn.is_closed()
+                if connected and not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                try:
+                    if not connected:
+                        await self._connect()
+                        self.reconnects += 1
+                    if self._queue:
+                        batch, self._queue = self._queue, deque()
+                        chunks = [chunk for parts, _ in batch for chunk in parts]
+                        # Notifications from one statement are delivered together, in order
+                        await self._conn.execute(
+                            "SELECT pg_notify($1, chunk) FROM unnest($2::text[]) AS chunk",
+                            self.channel,
+                            chunks,
+                        )
+                        self.notifications_sent += len(chunks)
+                        batch = deque()
+                    delay = 0.0
+                except (OSError, asyncpg.PostgresError, asyncpg.InterfaceError) as e:
+                    self.last_error = str(e)
+                    self._requeue(batch)
+                    batch = deque()
+                    await self._close()
+                    delay = min(RECONNECT_MAX_SECONDS, max(0.5, delay * 2))
+                    logger.warning(f"Broadcast bus send failed ({e}); reconnecting in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            logger.info("Broadcast bus stopped.")
+            raise
+
+    async def _connect(self) -> None:
+        conn = await asyncpg.connect(self._dsn)
+        await conn.add_listener(self.channel, self._on_notify)
+        conn.add_termination_listener(self._on_terminate)
+        self._conn = conn
+        logger.info(f"Broadcast bus listening on '{self.channel}'.")
+
+    async def _close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None and not conn.is_closed():
+            try:
+                await conn.close(timeout=2)
+            except Exception:
+                conn.terminate()
+
+    def _on_terminate(self, conn: asyncpg.Connection) -> None:
+        logger.warning("Broadcast bus connection lost.")
+        # Wake the sender so it reconnects (and resumes listening) even when idle
+        self._wakeup.set()
+
+    def _on_notify(self, conn: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            origin, seq, idx, count, body = payload.split(":", 4)
+            idx, count = int(idx), int(count)
+        except ValueError:
+            logger.warning("Ignoring malformed bus notification.")
+            return
+        if origin == self._origin:
+            return
+        if count > 1:
+            key = f"{origin}:{seq}"
+            parts = self._partials.get(key)
+            if parts is None:
+                parts = self._partials[key] = [None] * count
+                if len(self._partials) > MAX_PARTIAL_MESSAGES:
+                    self._partials.popitem(last=False)
+            parts[idx] = body
+            if any(part is None for part in parts):
+                return
+            del self._partials[key]
+            body = "".join(parts)
+        try:
+            topic, message = orjson.loads(body)
+        except (orjson.JSONDecodeError, ValueError):
+            logger.warning("Ignoring undecodable bus message.")
+            return
+        self.received += 1
+        self._dispatch(topic, message)
+
+
+def create_bus(backend: str | None = None) -> BroadcastBus:
+    """Bus for BUS_BACKEND: "memory" (single process) or "postgres" (LISTEN/NOTIFY)."""
+    backend = backend or settings.BUS_BACKEND
+    if backend == "memory":
+        return InProcessBus()
+    if backend == "postgres":
+        return PostgresBus()
+    raise ValueError(f"Unknown BUS_BACKEND {backend!r}; expected 'memory' or 'postgres'")
@@ -0,0 +1,109 @@
+import struct
+import uuid
+from functools import lru_cache
+import orjson
+
+# Opt-in binary wire format, negotiated via Sec-WebSocket-Protocol. Every
+# frame starts with a kind byte; integers are little-endian.
+#   TABLE (once per battle, before its first STATE):
+#     u8 kind, 16 bytes battle id, u32 total_seconds, u16 creator length + UTF-8,
+#     u16 country count, per country: u16 name length + UTF-8 name.
+#   STATE (replaces a state_update):
+#     u8 kind, 16 bytes battle id, u32 version (mod 2**32), u32 time_remaining,
+#     u8 flags, u16 country count, u64 scores[count], u16 positions[count] (table order),
+#     if FLAG_GIFT: u16 country index (65535 = none), i64 points,
+#                   u32 gift sequence (mod 2**32; changes with every new gift),
+#                   u16 user length + UTF-8, u16 gift length + UTF-8.
+# Values outside a field's range are clamped, so encoding never fails on
+# anything a battle can hold. Every other message (game_over, no_battle,
+# ping, ...) stays a JSON text frame.
+BINARY_SUBPROTOCOL = "battle.binary.v1"
+KIND_TABLE = 1
+KIND_STATE = 2
+FLAG_FINISHED = 1
+FLAG_GIFT = 2
+FLAG_LION = 4
+NO_COUNTRY = 0xFFFF
+MAX_COUNTRIES = 0xFFFF
+
+U32_MAX = 2**32 - 1
+U64_MAX = 2**64 - 1
+I64_MIN, I64_MAX = -(2**63), 2**63 - 1
+
+_TABLE_HEADER = struct.Struct("<B16sI")
+_STATE_HEADER = struct.Struct("<B16sIIBH")
+_GIFT_HEADER = struct.Struct("<HqI")
+_LENGTH = struct.Struct("<H")
+
+
+def dumps(data) -> bytes:
+    """Encode a message to JSON bytes (orjson; UUIDs and datetimes handled natively)."""
+    return orjson.dumps(data, default=str)
+
+
+def dumps_text(data) -> str:
+    """Encode a message to a JSON string, ready for WebSocket.send_text."""
+    return orjson.dumps(data, default=str).decode()
+
+
+@lru_cache(maxsize=64)
+def _arrays(count: int) -> struct.Struct:
+    return struct.Struct(f"<{count}Q{count}H")
+
+
+def _clamp(value: int, low: int, high: int) -> int:
+    return low if value < low else high if value > high else value
+
+
+def _string(value: str) -> bytes:
+    raw = value.encode()[:0xFFFF]
+    return _LENGTH.pack(len(raw)) + raw
+
+
+def encode_table(battle_id: uuid.UUID, creator_username: str, total_seconds: int, countries: list[str]) -> bytes:
+    """Binary TABLE frame: the battle's country index, sent once per battle."""
+    countries = countries[:MAX_COUNTRIES]
+    return b"".join((
+        _TABLE_HEADER.pack(KIND_TABLE, battle_id.bytes, _clamp(total_seconds, 0, U32_MAX)),
+        _string(creator_username),
+        _LENGTH.pack(len(countries)),
+        *(_string(country) for country in countries),
+    ))
+
+
+def encode_state(
+    battle_id: uuid.UUID,
+    version: int,
+    time_remaining: int,
+    finished: bool,
+    scores: list[int],
+    positions: list[int],
+    last_gift: dict | None = None,
+    gift_country: int = NO_COUNTRY,
+    gift_seq: int = 0,
+) -> bytes:
+    """Binary STATE frame; `scores` and `positions` are in table order."""
+    flags = FLAG_FINISHED if finished else 0
+    if last_gift:
+        flags |= FLAG_GIFT | (FLAG_LION if last_gift.get("is_lion") else 0)
+    count = min(len(scores), MAX_COUNTRIES)
+    frame = (
+        _STATE_HEADER.pack(
+            KIND_STATE, battle_id.bytes, version & U32_MAX, _clamp(time_remaining, 0, U32_MAX), flags, count
+        )
+        + _arrays(count).pack(
+            *(_clamp(score, 0, U64_MAX) for score in scores[:count]),
+            *(_clamp(position, 0, 0xFFFF) for position in positions[:count]),
+        )
+    )
+    if last_gift:
+        frame += b"".join((
+            _GIFT_HEADER.pack(
+                gift_country if 0 <= gift_country < count else NO_COUNTRY,
+                _clamp(int(last_gift.get("points", 0)), I64_MIN, I64_MAX),
+                gift_seq & U32_MAX,
+            ),
+            _string(str(last_gift.get("user", ""))),
+            _string(str(last_gift.get("gift", ""))),
+        ))
+    return frame
@@ -1,61 +1,312 @@
+import base64
 import asyncio
-import json
 import logging
+from collections import deque
+from typing import Callable
 from fastapi import WebSocket
+from app.config import get_settings
+from app.ws.codec import BINARY_SUBPROTOCOL, dumps_text
+from app.ws.bus import BroadcastBus, InProcessBus
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Frame types that are superseded by the next one and may be dropped under backpressure
+DROPPABLE_TYPES = frozenset({"state_update"})
+
+# Bus topic for frames; messages are ["frame", room, message, droppable, ends_battle]
+# or ["state", room, full, delta, binary], binary being None or [table, state]
+# (base64 strings when the bus crosses processes)
+TOPIC = "ws"
+
+
+class _Client:
+    """
+    One connected WebSocket with its own bounded outgoing queue and writer task.
+    Entries are (message, droppable) tuples; bytes messages go out as binary
+    frames. Delta clients receive `delta` frames instead of full
+    state_update snapshots; binary clients receive binary STATE frames,
+    preceded by the battle's TABLE frame whenever the battle changes.
+    """
+
+    __slots__ = ("websocket", "room", "delta", "binary", "table", "queue", "ready", "behind", "evicted", "task")
+
+    def __init__(self, websocket: WebSocket, room: str, delta: bool = False, binary: bool = False):
+        self.websocket = websocket
+        self.room = room
+        self.delta = delta
+        self.binary = binary
+        self.table: bytes | None = None  # last TABLE frame queued for a binary client
+        self.queue: deque[tuple[str | bytes, bool]] = deque()
+        self.ready = asyncio.Event()
+        self.behind: int = 0  # frames dropped since the client last drained its queue
+        self.evicted: bool = False
+        self.task: asyncio.Task | None = None
 
 
 class WebSocketManager:
     """
     Manages all active WebSocket client connections.
     Thread-safe for asyncio — all operations run in the same event loop.
+    Each client is served by its own writer task, so broadcast() only
+    enqueues and a slow client never holds up the others.
+    Clients join one room; broadcasts target a room, or everyone when room is None.
+
+    Broadcasts go through a BroadcastBus and are fanned out to local clients
+    when the bus delivers them. With a distributed bus, every process's
+    clients receive them, whichever process runs the battle; the latest
+    state frame per room is kept so connecting clients get a snapshot here too.
     """
 
-    def __init__(self):
-        self._connections: set[WebSocket] = set()
-        self._lock = asyncio.Lock()
+    def __init__(
+        self,
+        queue_size: int | None = None,
+        max_behind: int | None = None,
+        send_timeout: float | None = None,
+        bus: BroadcastBus | None = None,
+    ):
+        self.bus = bus or InProcessBus()
+        self.bus.subscribe(TOPIC, self._deliver)
+        self._latest_state: dict[str, str] = {}
+        self._latest_binary: dict[str, tuple[bytes, bytes]] = {}
+        self._clients: dict[WebSocket, _Client] = {}
+        self._rooms: dict[str, dict[WebSocket, _Client]] = {}
+        self._delta_clients: dict[str, int] = {}
+        self._binary_clients: dict[str, int] = {}
+        self._observers: list[Callable[[str | None], bool]] = []
+        self._queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        self._max_behind = max_behind or settings.WS_MAX_DROPPED_FRAMES
+        self._send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+        self.frames_dropped: int = 0
+        self.clients_evicted: int = 0
+
+    async def connect(
+        self, websocket: WebSocket, room: str, delta: bool = False, binary: bool = False
+    ) -> None:
+        """Accept a client; `binary` selects the binary subprotocol (which replaces delta mode)."""
+        await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+        delta = delta and not binary
+        client = _Client(websocket, room, delta, binary)
+        client.task = asyncio.create_task(self._writer(client))
+        self._clients[websocket] = client
+        self._rooms.setdefault(room, {})[websocket] = client
+        if delta:
+            self._delta_clients[room] = self._delta_clients.get(room, 0) + 1
+        if binary:
+            self._binary_clients[room] = self._binary_clients.get(room, 0) + 1
+        logger.info(f"WS client connected to room '{room}'. Total: {len(self._clients)}")
 
-    async def connect(self, websocket: WebSocket) -> None:
-        await websocket.accept()
-        async with self._lock:
-            self._connections.add(websocket)
-        logger.info(f"WS client connected. Total: {len(self._connections)}")
+    def add_observer(self, watching: Callable[[str | None], bool]) -> None:
+        """
+        Register another local consumer of this manager's bus frames (e.g.
+        SSE). `watching(room)` says whether it currently has viewers there;
+        frames for rooms nobody watches are not broadcast at all.
+        """
+        self._observers.append(watching)
 
     async def disconnect(self, websocket: WebSocket) -> None:
-        async with self._lock:
-            self._connections.discard(websocket)
-        logger.info(f"WS client disconnected. Total: {len(self._connections)}")
+        client = self._remove(websocket)
+        if client is None:
+            return
+        if client.task and client.task is not asyncio.current_task() and not client.task.done():
+            client.task.cancel()
+        logger.info(f"WS client disconnected. Total: {len(self._clients)}")
 
-    async def broadcast(self, data: dict) -> None:
-        """Send JSON data to all connected clients. Remove stale connections."""
-        if not self._connections:
+    async def broadcast(self, data: dict, room: str | None = None) -> None:
+        """Encode once and enqueue for every client in the room. Never waits on client I/O."""
+        if not self._targets(room) and not self._observed(room):
             return
+        message = dumps_text(data)
+        droppable = data.get("type") in DROPPABLE_TYPES
+        self.bus.publish(TOPIC, ["frame", room, message, droppable, data.get("type") == "game_over"], droppable)
 
-        message = json.dumps(data, default=str)
-        stale: set[WebSocket] = set()
+    async def broadcast_encoded(
+        self, message: str, droppable: bool = False, room: str | None = None
+    ) -> None:
+        """Enqueue an already-encoded frame (e.g. a cached battle snapshot) for the room."""
+        self.bus.publish(TOPIC, ["frame", room, message, droppable, False], droppable)
 
-        async with self._lock:
-            connections_snapshot = set(self._connections)
+    async def broadcast_state(
+        self,
+        full: str,
+        delta: str | None = None,
+        room: str | None = None,
+        binary: tuple[bytes, bytes] | None = None,
+    ) -> None:
+        """
+        Enqueue a state frame: delta clients get `delta` when given, binary
+        clients the (table, state) frames of `binary`, everyone else the full
+        snapshot. All kinds may be dropped under backpressure — a delta
+        client detects the version gap and asks for a resync.
+        """
+        if binary is not None and self.bus.distributed:
+            binary = [base64.b64encode(frame).decode() for frame in binary]
+        self.bus.publish(TOPIC, ["state", room, full, delta, binary], True)
 
-        for ws in connections_snapshot:
-            try:
-                await ws.send_text(message)
-            except Exception as e:
-                logger.warning(f"Failed to send to WS client: {e}")
-                stale.add(ws)
+    def latest_state(self, room: str) -> str | None:
+        """Last state frame broadcast to a room (from any process), until its battle ends."""
+        return self._latest_state.get(room)
 
-        if stale:
-            async with self._lock:
-                self._connections -= stale
+    def latest_binary(self, room: str) -> tuple[bytes, bytes] | None:
+        """(table, state) binary frames matching latest_state(room)."""
+        return self._latest_binary.get(room)
+
+    def wants_binary(self, room: str) -> bool:
+        """Whether state broadcasts for a room should carry binary frames."""
+        return self.bus.distributed or room in self._binary_clients
+
+    def wants_delta(self, room: str) -> bool:
+        """Whether state broadcasts for a room should carry a delta frame."""
+        # Delta clients connected to other processes are invisible from here
+        return self.bus.distributed or room in self._delta_clients
 
     async def send_to(self, websocket: WebSocket, data: dict) -> None:
-        """Send data to a specific client."""
+        """Send data to a specific client, in order with broadcast frames."""
+        await self.send_encoded(websocket, dumps_text(data), data.get("type") in DROPPABLE_TYPES)
+
+    async def send_encoded(self, websocket: WebSocket, message: str, droppable: bool = False) -> None:
+        """Send an already-encoded frame to a specific client."""
+        client = self._clients.get(websocket)
+        if client is not None:
+            self._enqueue(client, message, droppable)
+            return
         try:
-            await websocket.send_text(json.dumps(data, default=str))
+            await websocket.send_text(message)
         except Exception as e:
             logger.warning(f"Failed to send to specific WS client: {e}")
-            await self.disconnect(websocket)
 
-    def connection_count(self) -> int:
-        return len(self._connections)
+    def send_binary_state(self, websocket: WebSocket, table: bytes, state: bytes) -> None:
+        """Send a binary client the battle's TABLE frame followed by a STATE frame."""
+        client = self._clients.get(websocket)
+        if client is None:
+            return
+        client.table = table
+        self._enqueue(client, table, False)
+        self._enqueue(client, state, True)
+
+    def connection_count(self, room: str | None = None) -> int:
+        return len(self._targets(room))
+
+    def delta_client_count(self, room: str | None = None) -> int:
+        if room is None:
+            return sum(self._delta_clients.values())
+        return self._delta_clients.get(room, 0)
+
+    def _deliver(self, message: list) -> None:
+        """Bus subscriber: fan a published frame out to this process's clients."""
+        kind, room = message[0], message[1]
+        if kind == "state":
+            _, _, full, delta, binary = message
+            if binary is not None and isinstance(binary[0], str):
+                binary = tuple(base64.b64decode(frame) for frame in binary)
+            if room is not None:
+                self._latest_state[room] = full
+                if binary is not None:
+                    self._latest_binary[room] = binary
+                else:
+                    self._latest_binary.pop(room, None)
+            for client in list(self._targets(room)):
+                if client.binary and binary is not None:
+                    table, state = binary
+                    if client.table != table:
+                        client.table = table
+                        self._enqueue(client, table, False)
+                    self._enqueue(client, state, True)
+                else:
+                    self._enqueue(client, delta if client.delta and delta is not None else full, True)
+            return
+        _, _, encoded, droppable, ends_battle = message
+        if ends_battle and room is not None:
+            self._latest_state.pop(room, None)
+            self._latest_binary.pop(room, None)
+        for client in list(self._targets(room)):
+            self._enqueue(client, encoded, droppable)
+
+    def _observed(self, room: str | None) -> bool:
+        """Whether anyone besides our own clients sees the room's frames: other processes or an observer (SSE)."""
+        return self.bus.distributed or any(watching(room) for watching in self._observers)
+
+    def _targets(self, room: str | None):
+        if room is None:
+            return self._clients.values()
+        members = self._rooms.get(room)
+        return members.values() if members else ()
+
+    def _remove(self, websocket: WebSocket) -> _Client | None:
+        client = self._clients.pop(websocket, None)
+        if client is None:
+            return None
+        members = self._rooms.get(client.room)
+        if members is not None:
+            members.pop(websocket, None)
+            if not members:
+                del self._rooms[client.room]
+        if client.delta:
+            self._delta_clients[client.room] -= 1
+            if not self._delta_clients[client.room]:
+                del self._delta_clients[client.room]
+        if client.binary:
+            self._binary_clients[client.room] -= 1
+            if not self._binary_clients[client.room]:
+                del self._binary_clients[client.room]
+        return client
+
+    def _enqueue(self, client: _Client, message: str | bytes, droppable: bool) -> None:
+        if client.evicted:
+            return
+        queue = client.queue
+        if len(queue) >= self._queue_size:
+            # Stale state frames are superseded by the new one — drop them first
+            kept = deque(item for item in queue if not item[1])
+            dropped = len(queue) - len(kept)
+            client.queue = queue = kept
+            if len(queue) >= self._queue_size:
+                dropped += 1
+                self._note_dropped(client, dropped)
+                return
+            self._note_dropped(client, dropped)
+        queue.append((message, droppable))
+        client.ready.set()
+
+    def _note_dropped(self, client: _Client, count: int) -> None:
+        self.frames_dropped += count
+        client.behind += count
+        if client.behind > self._max_behind:
+            logger.warning(f"Evicting WS client: {client.behind} frames behind.")
+            client.evicted = True
+            client.ready.set()
+
+    async def _writer(self, client: _Client) -> None:
+        """Drain one client's queue; evict it on send failure or timeout."""
+        ws = client.websocket
+        try:
+            while True:
+                if not client.queue:
+                    client.ready.clear()
+                    await client.ready.wait()
+                if client.evicted:
+                    self.clients_evicted += 1
+                    await ws.close(code=1013)
+                    break
+                if not client.queue:
+                    continue
+                message, _ = client.queue.popleft()
+                send = ws.send_bytes(message) if isinstance(message, bytes) else ws.send_text(message)
+                await asyncio.wait_for(send, timeout=self._send_timeout)
+                # Only a client that catches up is forgiven; one that sends
+                # steadily but never drains keeps accumulating drops
+                if not client.queue:
+                    client.behind = 0
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"Evicting WS client: send blocked for over {self._send_timeout}s.")
+            self.clients_evicted += 1
+            try:
+                await ws.close(code=1013)
+            except Exception:
+                pass
+        except Exception as e:
+            logger.warning(f"Failed to send to WS client: {e}")
+        finally:
+            self._remove(ws)
@@ -0,0 +1,84 @@
+import uuid
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+from app.config import get_settings
+from app.ws.codec import dumps_text
+
+if TYPE_CHECKING:
+    from app.battle.battle import Battle
+    from app.ws.manager import WebSocketManager
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class BroadcastScheduler:
+    """
+    Coalesces battle state broadcasts into a rate-limited flush loop.
+    Score changes only mark a battle dirty; a single background task sends
+    at most BROADCAST_MAX_FPS state frames per second.
+    Highlight events (Lion gifts) can force an immediate frame via flush_now().
+    """
+
+    def __init__(self, ws_manager: "WebSocketManager", max_fps: int | None = None):
+        self.ws_manager = ws_manager
+        fps = max_fps or settings.BROADCAST_MAX_FPS
+        self._interval: float = 1.0 / max(1, fps)
+        self._dirty: dict[uuid.UUID, "Battle"] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Launch the flush loop as a background asyncio task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def mark_dirty(self, battle: "Battle") -> None:
+        """Schedule a state frame for the next flush. O(1), never blocks."""
+        self._dirty[battle.id] = battle
+        self._wakeup.set()
+
+    def discard(self, battle: "Battle") -> None:
+        """Drop a pending frame for a battle that is being replaced."""
+        self._dirty.pop(battle.id, None)
+
+    async def flush_now(self, battle: "Battle") -> None:
+        """Send a state frame immediately, bypassing the rate limit."""
+        self._dirty.pop(battle.id, None)
+        await self._send(battle)
+
+    async def _run(self) -> None:
+        """Flush loop — waits for dirty battles, then sleeps one interval."""
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                pending, self._dirty = self._dirty, {}
+                for battle in pending.values():
+                    await self._send(battle)
+                await asyncio.sleep(self._interval)
+        except asyncio.CancelledError:
+            logger.info("Broadcast scheduler stopped.")
+
+    async def _send(self, battle: "Battle") -> None:
+        # A finished battle already announced game_over; a late state frame would hide it
+        if battle.battle_finished:
+            return
+        try:
+            delta = None
+            if self.ws_manager.wants_delta(battle.room):
+                delta = dumps_text(battle.take_delta())
+            binary = battle.binary_frames() if self.ws_manager.wants_binary(battle.room) else None
+            await self.ws_manager.broadcast_state(battle.snapshot_text(), delta, room=battle.room, binary=binary)
+        except Exception as e:
+            logger.warning(f"Broadcast for battle {battle.id} failed: {e}")
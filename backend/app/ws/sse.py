@@ -0,0 +1,201 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, AsyncIterator
+from app.config import get_settings
+from app.ws.codec import dumps_text
+from app.ws.manager import TOPIC
+
+if TYPE_CHECKING:
+    from app.ws.bus import BroadcastBus
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+KEEPALIVE = b": keepalive\n\n"
+NO_BATTLE = dumps_text({"type": "no_battle", "message": "No active battle"})
+
+
+class _RoomFeed:
+    """Ring buffer of one room's encoded events, shared by all its SSE clients."""
+
+    __slots__ = ("frames", "seq", "latest_state", "changed", "clients")
+
+    def __init__(self, size: int, seq: int):
+        self.frames: deque[tuple[int, bytes, bool]] = deque(maxlen=size)  # (seq, event, droppable)
+        self.seq: int = seq
+        self.latest_state: tuple[int, bytes] | None = None
+        self.changed = asyncio.Event()
+        self.clients: int = 0
+
+
+class EventStream:
+    """
+    Server-Sent Events fan-out for read-only spectators.
+
+    Subscribes to the same bus topic as WebSocketManager, so it sees every
+    state_update and game_over frame — from this process or, with a
+    distributed bus, any other. Frames are buffered only for rooms an SSE
+    client has opened: each is encoded as an SSE event once, into the room's
+    ring buffer of SSE_BUFFER_SIZE events, and every client streams the same
+    bytes from it. A client holds no queue or writer task of its own: it
+    keeps only the id of the last event it was sent and waits on the room's
+    change signal. A room's buffer is kept after its last client leaves, so
+    the client can resume, until the battle ends.
+
+    Event ids are `<stream epoch>-<seq>`, with seq unique across rooms, so
+    a reconnecting client's Last-Event-ID resumes from the buffer when it
+    was issued by this process and is still buffered. Otherwise the client
+    starts from the latest state. A client that falls behind skips
+    superseded state frames and is sent only the newest of each run, plus
+    any game_over in between.
+    """
+
+    def __init__(
+        self,
+        bus: "BroadcastBus",
+        buffer_size: int | None = None,
+        keepalive: float | None = None,
+    ):
+        self._buffer_size = buffer_size or settings.SSE_BUFFER_SIZE
+        self._keepalive = keepalive or settings.SSE_KEEPALIVE_SECONDS
+        self._epoch = format(int(time.time() * 1000), "x")
+        self._feeds: dict[str, _RoomFeed] = {}
+        self._seq: int = 0  # last seq issued, in any room
+        self.clients: int = 0
+        self.events: int = 0
+        self.resumed: int = 0
+        self.frames_skipped: int = 0
+        bus.subscribe(TOPIC, self._deliver)
+
+    async def stream(
+        self, room: str, last_event_id: str | None = None, snapshot: str | None = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Events for one client. Resumes after `last_event_id` when it can;
+        otherwise starts from the room's latest buffered state, falling back
+        to `snapshot` (or no_battle) if none has been broadcast yet.
+        """
+        feed = self._feed(room)
+        feed.clients += 1
+        self.clients += 1
+        try:
+            yield f"retry: {settings.SSE_RETRY_MS}\n\n".encode()
+            last = self._resume_point(feed, last_event_id)
+            if last is None:
+                if feed.latest_state is not None:
+                    last, event = feed.latest_state
+                    yield event
+                else:
+                    last = feed.seq
+                    yield self._event(feed.seq, snapshot or NO_BATTLE)
+            while True:
+                if feed.seq == last:
+                    feed.changed.clear()
+                    try:
+                        await asyncio.wait_for(feed.changed.wait(), timeout=self._keepalive)
+                    except asyncio.TimeoutError:
+                        yield KEEPALIVE
+                    continue
+                pending = [entry for entry in feed.frames if entry[0] > last]
+                last = feed.seq
+                for event in self._coalesce(pending):
+                    yield event
+        finally:
+            feed.clients -= 1
+            self.clients -= 1
+            if not feed.clients and not feed.frames:
+                # Nothing was ever broadcast to this room; don't keep it around
+                self._feeds.pop(room, None)
+
+    def watching(self, room: str | None) -> bool:
+        """
+        Whether frames broadcast to `room` (None: every room) are buffered
+        here: the room has SSE clients, or had some during its current battle.
+        """
+        return bool(self._feeds) if room is None else room in self._feeds
+
+    def stats(self) -> dict:
+        return {
+            "clients": self.clients,
+            "rooms": len(self._feeds),
+            "events": self.events,
+            "resumed": self.resumed,
+            "frames_skipped": self.frames_skipped,
+        }
+
+    def _resume_point(self, feed: _RoomFeed, last_event_id: str | None) -> int | None:
+        """Seq to resume after, if Last-Event-ID is ours and nothing after it has left the buffer."""
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition("-")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        seq = int(seq)
+        oldest = feed.frames[0][0] if feed.frames else feed.seq + 1
+        if seq > feed.seq or seq < oldest - 1:
+            return None
+        self.resumed += 1
+        return seq
+
+    def _coalesce(self, pending: list[tuple[int, bytes, bool]]) -> list[bytes]:
+        """Drop state frames superseded by a later one; keep everything else, in order."""
+        kept = []
+        superseded = False
+        for _, event, droppable in reversed(pending):
+            if droppable:
+                if superseded:
+                    continue
+                superseded = True
+            else:
+                # Standings just before a game_over are never superseded by the next battle's
+                superseded = False
+            kept.append(event)
+        self.frames_skipped += len(pending) - len(kept)
+        kept.reverse()
+        return kept
+
+    def _event(self, seq: int, data: str) -> bytes:
+        # Encoded frames are single-line JSON, so one data: field suffices
+        return f"id: {self._epoch}-{seq}\ndata: {data}\n\n".encode()
+
+    def _feed(self, room: str) -> _RoomFeed:
+        feed = self._feeds.get(room)
+        if feed is None:
+            # A fresh seq, so ids issued by a dropped feed for this room never match this one
+            feed = self._feeds[room] = _RoomFeed(self._buffer_size, self._next_seq())
+        return feed
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def _deliver(self, message: list) -> None:
+        """Bus subscriber: encode a frame once and append it to the buffers of rooms with SSE clients."""
+        kind, room = message[0], message[1]
+        if room is None:
+            feeds = list(self._feeds.items())
+        else:
+            feed = self._feeds.get(room)
+            if feed is None:
+                return
+            feeds = [(room, feed)]
+        if kind == "state":
+            encoded, droppable, ends_battle = message[2], True, False
+        else:
+            encoded, droppable, ends_battle = message[2], message[3], message[4]
+        for name, feed in feeds:
+            if ends_battle and not feed.clients:
+                # Nobody is streaming the room and its battle is over: free the buffer
+                del self._feeds[name]
+                continue
+            feed.seq = self._next_seq()
+            event = self._event(feed.seq, encoded)
+            feed.frames.append((feed.seq, event, droppable))
+            if ends_battle:
+                feed.latest_state = None
+            elif droppable:
+                feed.latest_state = (feed.seq, event)
+            feed.changed.set()
+            self.events += 1
@@ -0,0 +1,116 @@
+"""
+Benchmark: precompiled CountryMatcher vs the previous per-country substring scan,
+then the matcher's own two strategies (substring scan vs trie regex) by term
+count, to place SCAN_MAX_TERMS at the crossover.
+
+Run from backend/:
+    python -m benchmarks.bench_comment_matcher [--comments 200000]
+"""
+import argparse
+import random
+import time
+import timeit
+from app.battle.matcher import COUNTRY_CODES, DEFAULT_ALIASES, SCAN_MAX_TERMS, CountryMatcher, flag_emoji
+
+# Names without flags or aliases, so each adds exactly one term
+PLAIN_NAMES = [
+    "Atlantis", "Borduria", "Syldavia", "Freedonia", "Latveria", "Genovia",
+    "Wakanda", "Zubrowka", "Elbonia", "Narnia", "Gondor", "Florin",
+]
+
+CHATTER = [
+    "lets gooo", "who is winning??", "hello from", "❤️❤️❤️", "love this live", "😂😂",
+    "send roses", "follow me", "first time here", "what is this battle", "🔥🔥🔥",
+    "mashallah", "yalla", "wow", "good night", "tap tap tap", "👏", "ما شاء الله",
+    "where are you from", "nice", "gg", "come on", "again!!", "haha", "🌹🌹",
+]
+
+
+def detect_country_naive(comment: str, countries: list[str]) -> str | None:
+    """Previous implementation from app/battle/tiktok.py."""
+    lower = comment.lower()
+    for country in countries:
+        if country.lower() in lower:
+            return country
+    return None
+
+
+def detect_country_naive_aliases(comment: str, terms: list[tuple[str, str]]) -> str | None:
+    """The same substring scan extended to every alias/flag the matcher knows."""
+    lower = comment.lower()
+    for term, country in terms:
+        if term in lower:
+            return country
+    return None
+
+
+def build_corpus(countries: list[str], size: int, seed: int = 42) -> list[str]:
+    """Short live-chat comments; roughly one in four mentions a country."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        words = rng.sample(CHATTER, rng.randint(1, 4))
+        if rng.random() < 0.25:
+            country = rng.choice(countries)
+            mention = rng.choice([
+                country, country.upper(), country.lower(),
+                *DEFAULT_ALIASES.get(country, []),
+                *([flag_emoji(COUNTRY_CODES[country]) * 3] if country in COUNTRY_CODES else []),
+            ])
+            words.insert(rng.randint(0, len(words)), mention)
+        corpus.append(" ".join(words))
+    return corpus
+
+
+def bench(label: str, fn, corpus: list[str]) -> tuple[float, int]:
+    start = time.perf_counter()
+    hits = sum(1 for comment in corpus if fn(comment) is not None)
+    elapsed = time.perf_counter() - start
+    per_comment_us = elapsed / len(corpus) * 1e6
+    print(f"  {label:<22} {elapsed * 1000:9.1f} ms  {per_comment_us:6.2f} µs/comment  {hits:>7} hits")
+    return elapsed, hits
+
+
+def per_comment_us(fn, corpus: list[str]) -> float:
+    """Best of several runs, in µs per comment."""
+    return min(timeit.repeat(lambda: [fn(comment) for comment in corpus], number=1, repeat=5)) / len(corpus) * 1e6
+
+
+def crossover(comments: int) -> None:
+    """Substring scan vs trie regex inside CountryMatcher, for 1..len(PLAIN_NAMES) terms."""
+    print(f"CountryMatcher strategy by term count (SCAN_MAX_TERMS = {SCAN_MAX_TERMS})")
+    for n in range(1, len(PLAIN_NAMES) + 1):
+        countries = PLAIN_NAMES[:n]
+        corpus = build_corpus(countries, comments)
+        scan = per_comment_us(CountryMatcher(countries, scan_max_terms=n).match, corpus)
+        regex = per_comment_us(CountryMatcher(countries, scan_max_terms=0).match, corpus)
+        print(f"  {n:>3} terms  scan {scan:5.2f} µs  regex {regex:5.2f} µs  {'scan' if scan < regex else 'regex'} wins")
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comments", type=int, default=200_000)
+    args = parser.parse_args()
+
+    crossover(min(args.comments, 20_000))
+
+    all_countries = list(COUNTRY_CODES)
+    for n in (4, 16, len(all_countries)):
+        countries = all_countries[:n]
+        corpus = build_corpus(countries, args.comments)
+        matcher = CountryMatcher(countries, DEFAULT_ALIASES)
+        terms = list(matcher._lookup.items())
+        print(f"{n} countries ({len(terms)} terms with aliases and flags), {len(corpus)} comments")
+        naive_time, naive_hits = bench("naive (names only)", lambda c: detect_country_naive(c, countries), corpus)
+        alias_time, _ = bench("naive (+aliases/flags)", lambda c: detect_country_naive_aliases(c, terms), corpus)
+        fast_time, fast_hits = bench("CountryMatcher", matcher.match, corpus)
+        print(
+            f"  speedup x{naive_time / fast_time:.2f} vs names only, "
+            f"x{alias_time / fast_time:.2f} vs same term set; "
+            f"extra hits from aliases/flags: {fast_hits - naive_hits}\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
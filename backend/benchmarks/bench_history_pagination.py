@@ -0,0 +1,124 @@
+"""
+Benchmark: keyset-paginated GET /history on a large battles table, verified
+with EXPLAIN (ANALYZE, BUFFERS).
+
+Seeds --rows battles inside a transaction that is rolled back at the end,
+then EXPLAINs the exact statement BattleRepository.get_history runs for
+pages at increasing depth, unfiltered and with creator / winner filters.
+Checks that every plan is an index scan without a Sort or Seq Scan, and
+that the deepest page touches no more buffers than the first one (plus a
+small allowance), i.e. page cost is independent of depth.
+Exits non-zero if any check fails.
+
+Needs a Postgres at DATABASE_URL migrated to 0005_history_indexes.
+
+Run from backend/:
+    python -m benchmarks.bench_history_pagination [--rows 1000000]
+"""
+import sys
+import asyncio
+import argparse
+import orjson
+from sqlalchemy import text
+from app.database import engine
+from app.repository.battle_repo import history_query
+
+PAGE = 20
+WINNERS = ["Turkey", "Saudi Arabia", "Egypt", "Pakistan"]
+BUFFER_ALLOWANCE = 8  # extra pages an index descent may touch on a deeper, bigger tree level
+
+
+SEED_SQL = text("""
+INSERT INTO battles (id, creator_username, started_at, ended_at, duration_seconds, winner_country)
+SELECT gen_random_uuid(),
+       'bench-' || (i % 1000),
+       now() - make_interval(secs => i),
+       now() - make_interval(secs => i) + interval '300 seconds',
+       300,
+       (ARRAY['Turkey', 'Saudi Arabia', 'Egypt', 'Pakistan'])[1 + i % 4]
+FROM generate_series(1, :rows) AS i
+""")
+
+
+def plan_nodes(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def cursor_at(conn, depth: int, creator: str | None, winner: str | None):
+    """(started_at, id) of the row just before page `depth` (None for the first page)."""
+    if depth == 0:
+        return None
+    stmt = history_query(1, None, creator, winner).offset(depth - 1)
+    row = (await conn.execute(stmt)).first()
+    return (row.started_at, row.id) if row else None
+
+
+async def explain(conn, depth: int, creator: str | None, winner: str | None) -> dict:
+    cursor = await cursor_at(conn, depth, creator, winner)
+    sql = history_query(PAGE + 1, cursor, creator, winner).compile(
+        dialect=engine.dialect, compile_kwargs={"literal_binds": True}
+    )
+    result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"))
+    raw = result.scalar_one()
+    plan = (orjson.loads(raw) if isinstance(raw, (str, bytes)) else raw)[0]
+    nodes = list(plan_nodes(plan["Plan"]))
+    return {
+        "depth": depth,
+        "ms": plan["Execution Time"],
+        "buffers": plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0),
+        "node_types": {node["Node Type"] for node in nodes},
+        "indexes": {node["Index Name"] for node in nodes if "Index Name" in node},
+    }
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    failures = []
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            print(f"Seeding {args.rows} battles (rolled back afterwards)…")
+            await conn.execute(SEED_SQL, {"rows": args.rows})
+            await conn.execute(text("ANALYZE battles"))
+
+            variants = [
+                ("all battles", None, None, args.rows),
+                ("creator filter", "bench-7", None, args.rows // 1000),
+                ("winner filter", None, "Egypt", args.rows // 4),
+            ]
+            for label, creator, winner, size in variants:
+                depths = sorted({0, min(1_000, size // 2), size // 2, max(0, size - PAGE)})
+                print(f"\n{label}")
+                results = [await explain(conn, depth, creator, winner) for depth in depths]
+                for r in results:
+                    print(
+                        f"  depth {r['depth']:>9}  {r['ms']:8.3f} ms  {r['buffers']:>5} buffers  "
+                        f"{', '.join(sorted(r['indexes'])) or '-'}"
+                    )
+                    if "Seq Scan" in r["node_types"] or "Sort" in r["node_types"]:
+                        failures.append(f"{label} @ {r['depth']}: plan has {r['node_types']}")
+                    if not r["indexes"]:
+                        failures.append(f"{label} @ {r['depth']}: no index used")
+                first, deepest = results[0], results[-1]
+                if deepest["buffers"] > first["buffers"] + BUFFER_ALLOWANCE:
+                    failures.append(
+                        f"{label}: deepest page touched {deepest['buffers']} buffers vs {first['buffers']} for the first"
+                    )
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+    if failures:
+        print("\nFAILED:\n  " + "\n  ".join(failures))
+        return 1
+    print("\nOK: every page is an index range scan; cost does not grow with depth.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,152 @@
+"""
+Benchmark: end-of-battle persistence latency, single-statement
+BattleRepository.save_battle_result vs the previous per-row ORM write path.
+
+Needs a reachable Postgres at DATABASE_URL with migrations applied.
+Benchmark countries are named "Bench-NNN" and removed afterwards.
+
+Run from backend/:
+    python -m benchmarks.bench_save_battle [--runs 50]
+"""
+import uuid
+import random
+import asyncio
+import argparse
+import statistics
+import time
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import delete, event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from app.database import AsyncSessionLocal, engine
+from app.models import Battle as BattleModel, BattleResult, CountryStatistics
+from app.repository.battle_repo import BattleRepository
+
+PREFIX = "Bench-"
+
+
+async def save_battle_result_legacy(
+    battle_id: uuid.UUID,
+    creator_username: str,
+    started_at: datetime,
+    ended_at: datetime,
+    duration_seconds: int,
+    winner_country: str | None,
+    rankings: list[dict],
+) -> None:
+    """Previous implementation: add per row, flush, one upsert per country."""
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            session.add(BattleModel(
+                id=battle_id,
+                creator_username=creator_username,
+                started_at=started_at,
+                ended_at=ended_at,
+                duration_seconds=duration_seconds,
+                winner_country=winner_country,
+            ))
+            await session.flush()
+            for entry in rankings:
+                session.add(BattleResult(
+                    id=uuid.uuid4(),
+                    battle_id=battle_id,
+                    country_name=entry["country"],
+                    final_score=entry["score"],
+                    position=entry["position"],
+                ))
+            for entry in rankings:
+                position = entry["position"]
+                stmt = pg_insert(CountryStatistics).values(
+                    id=uuid.uuid4(),
+                    country_name=entry["country"],
+                    total_wins=1 if position == 1 else 0,
+                    total_second_place=1 if position == 2 else 0,
+                    total_third_place=1 if position == 3 else 0,
+                    total_battles=1,
+                ).on_conflict_do_update(
+                    index_elements=["country_name"],
+                    set_={
+                        "total_wins": CountryStatistics.total_wins + (1 if position == 1 else 0),
+                        "total_second_place": CountryStatistics.total_second_place + (1 if position == 2 else 0),
+                        "total_third_place": CountryStatistics.total_third_place + (1 if position == 3 else 0),
+                        "total_battles": CountryStatistics.total_battles + 1,
+                    },
+                )
+                await session.execute(stmt)
+
+
+def make_rankings(n: int, rng: random.Random) -> list[dict]:
+    scores = sorted((rng.randint(0, 100_000) for _ in range(n)), reverse=True)
+    return [
+        {"country": f"{PREFIX}{idx:03d}", "score": score, "position": idx + 1}
+        for idx, score in enumerate(scores)
+    ]
+
+
+class StatementCounter:
+    """Counts statements sent to the server (a proxy for round-trips)."""
+
+    def __init__(self):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+
+async def bench(label: str, save, n: int, runs: int, counter: StatementCounter) -> list[uuid.UUID]:
+    rng = random.Random(n)
+    ended = datetime.now(timezone.utc)
+    ids, timings = [], []
+    counter.count = 0
+    for _ in range(runs):
+        battle_id = uuid.uuid4()
+        rankings = make_rankings(n, rng)
+        start = time.perf_counter()
+        await save(
+            battle_id=battle_id,
+            creator_username="bench",
+            started_at=ended - timedelta(seconds=300),
+            ended_at=ended,
+            duration_seconds=300,
+            winner_country=rankings[0]["country"],
+            rankings=rankings,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+        ids.append(battle_id)
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(
+        f"  {label:<14} median {statistics.median(timings):8.2f} ms  p95 {p95:8.2f} ms  "
+        f"{counter.count / runs:6.1f} statements/save"
+    )
+    return ids
+
+
+async def cleanup(ids: list[uuid.UUID]) -> None:
+    async with AsyncSessionLocal() as session:
+        async with session.begin():
+            await session.execute(delete(BattleModel).where(BattleModel.id.in_(ids)))
+            await session.execute(delete(CountryStatistics).where(CountryStatistics.country_name.like(f"{PREFIX}%")))
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    repo = BattleRepository()
+    counter = StatementCounter()
+    ids: list[uuid.UUID] = []
+    try:
+        for n in (4, 50, 200):
+            print(f"{n} countries, {args.runs} saves")
+            ids += await bench("legacy", save_battle_result_legacy, n, args.runs, counter)
+            ids += await bench("single CTE", repo.save_battle_result, n, args.runs, counter)
+    finally:
+        if ids:
+            await cleanup(ids)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
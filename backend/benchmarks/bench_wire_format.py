@@ -0,0 +1,71 @@
+"""
+Benchmark: state_update encoding — json.dumps(..., default=str) (the original
+encoder), orjson (the JSON snapshot), and the binary STATE frame — by encode
+time and bytes per frame.
+
+Run from backend/:
+    python -m benchmarks.bench_wire_format [--frames 100000]
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from app.battle.battle import Battle
+from app.battle.matcher import COUNTRY_CODES
+from app.ws.codec import dumps
+
+
+def make_battle(countries: list[str], seed: int = 42) -> Battle:
+    rng = random.Random(seed)
+    battle = Battle(uuid.uuid4(), "benchmark_creator", countries, 300)
+    for _ in range(2000):
+        country = rng.choice(countries)
+        battle.add_score(country, rng.choice([1, 1, 5, 10, 99, 500]), {
+            "user": f"viewer{rng.randint(1, 9999)}",
+            "gift": rng.choice(["Rose", "Lion", "Galaxy"]),
+            "points": 10,
+            "country": country,
+            "is_lion": False,
+        })
+    return battle
+
+
+def bench(label: str, encode, frames: int) -> tuple[float, int]:
+    size = len(encode())
+    start = time.perf_counter()
+    for _ in range(frames):
+        encode()
+    elapsed = time.perf_counter() - start
+    per_frame_us = elapsed / frames * 1e6
+    print(f"  {label:<20} {per_frame_us:7.2f} µs/frame  {size:6} bytes/frame")
+    return per_frame_us, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=100_000)
+    args = parser.parse_args()
+
+    all_countries = list(COUNTRY_CODES)
+    for n in (4, 16, len(all_countries)):
+        battle = make_battle(all_countries[:n])
+        print(f"{n} countries, {args.frames} frames (every frame a new version, as on the broadcast path)")
+
+        def bump() -> None:
+            battle.version += 1
+
+        json_time, json_size = bench(
+            "json.dumps", lambda: (bump(), json.dumps(battle.get_state(), default=str).encode())[1], args.frames
+        )
+        orjson_time, orjson_size = bench("orjson", lambda: (bump(), dumps(battle.get_state()))[1], args.frames)
+        binary_time, binary_size = bench("binary", lambda: (bump(), battle.snapshot_binary())[1], args.frames)
+        print(
+            f"  binary vs json.dumps: {json_time / binary_time:.1f}x faster, "
+            f"{json_size / binary_size:.1f}x smaller (TABLE frame once per battle: "
+            f"{len(battle.binary_table())} bytes); vs orjson: {orjson_size / binary_size:.1f}x smaller\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,655 @@
+"""
+Load test: a synthetic gift/comment firehose through the real TikTokListener
+handlers, fanned out to thousands of local WebSocket viewers.
+
+The app is served in this process by uvicorn (the real /ws/{room} endpoint,
+WebSocketManager, BroadcastScheduler, GiftIngestor and Battle). A driver
+calls TikTokListener.handle_gift / handle_comment with GiftEvent and
+CommentEvent objects at fixed rates. Viewers run in separate processes.
+
+Latency is measured two ways; all processes share the monotonic clock, so
+run everything on one host, and only events in the measured window (after
+--warmup) count:
+
+- gift → viewer: each gift's sender nickname carries the monotonic clock
+  (ns) at the moment it is handed to handle_gift. A viewer records the
+  latency the first time that gift appears as last_gift in a frame it
+  receives. Gifts whose frame was coalesced away by the broadcast rate
+  limit never appear, so this covers only the gifts that survive.
+- apply → viewer: the battle logs the time each score change is applied,
+  with the version it produced. A sample of viewers records when they first
+  received each newer version. Every applied version is delivered by the
+  first frame at or past it, so this covers every change, coalesced or not.
+
+By default the database is replaced by in-memory stand-ins: nothing is
+persisted, and the battle outlasts the run. --postgres runs the app's real
+lifespan against DATABASE_URL instead; use a scratch database, since the
+load-test battle is ended and saved at the end.
+
+Results are printed and can be saved as a JSON baseline. --compare checks a
+run against a baseline recorded with the same parameters and exits with
+status 1 when latency, server CPU, memory or dropped frames regress beyond
+--tolerance.
+
+Run from backend/:
+    python -m benchmarks.loadtest [--clients 2000] [--client-procs 4] [--gift-rate 200]
+        [--comment-rate 1000] [--duration 30] [--warmup 5] [--protocol json|delta|binary]
+        [--save benchmarks/baselines/local.json] [--compare benchmarks/baselines/reference.json]
+"""
+import os
+import sys
+import json
+import time
+import array
+import bisect
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+import multiprocessing as mp
+from datetime import datetime, timezone
+import uvicorn
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+from TikTokLive.events import GiftEvent, CommentEvent
+from TikTokLive.proto import GiftStruct, User
+from app.main import app
+from app.config import get_settings
+from app.battle.affinity import UserAffinityStore
+from app.battle.ingest import GiftIngestor
+from app.battle.manager import BattleManager
+from app.battle.matcher import COUNTRY_CODES
+from app.battle.tiktok import GIFT_POINTS, TikTokListener
+from app.battle.timer import TimerWheel
+from app.ws.bus import InProcessBus
+from app.ws.codec import BINARY_SUBPROTOCOL, KIND_STATE
+from app.ws.manager import WebSocketManager
+from app.ws.scheduler import BroadcastScheduler
+from app.ws.sse import EventStream
+
+logger = logging.getLogger("loadtest")
+settings = get_settings()
+
+ROOM = "loadtest"
+# Gift sender nicknames are f"{TAG}{monotonic_ns}~"
+TAG = "lt~"
+TAG_BYTES = TAG.encode()
+DRIVER_TICK_SECONDS = 0.005
+CONNECT_CONCURRENCY = 256
+EVENT_POOL_SIZE = 512  # prebuilt events; protobuf construction is too slow to do per event
+VIEWER_USERS = 5000
+VERSION_VIEWERS_PER_PROC = 8  # viewers per process that log every version they receive
+
+CHATTER = ["lets gooo", "who is winning??", "❤️❤️❤️", "wow", "🔥🔥🔥", "gg", "come on", "haha"]
+
+# Metrics checked by --compare: (path, absolute slack below which a rise is noise)
+REGRESSION_CHECKS = {
+    ("latency_ms", "p50"): 1.0,
+    ("latency_ms", "p99"): 2.0,
+    ("latency_ms", "p999"): 5.0,
+    ("apply_latency_ms", "p50"): 1.0,
+    ("apply_latency_ms", "p99"): 2.0,
+    ("apply_latency_ms", "p999"): 5.0,
+    ("server", "cpu_percent"): 5.0,
+    ("server", "rss_mb"): 16.0,
+    ("ws", "frames_dropped"): 0,
+    ("ws", "clients_evicted"): 0,
+    ("ingest", "dropped"): 0,
+}
+
+
+def raise_fd_limit() -> None:
+    """Thousands of sockets need more than the usual 1024 descriptors."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_mb() -> float:
+    """Current resident memory (Linux /proc), else the peak."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(q * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+
+def gift_tag(message: str | bytes) -> int | None:
+    """Send time carried by the frame's last gift, if it is a load-test gift (JSON or binary frames)."""
+    marker = TAG if isinstance(message, str) else TAG_BYTES
+    start = message.find(marker)
+    if start < 0:
+        return None
+    start += len(marker)
+    end = message.find(marker[-1:], start)
+    try:
+        return int(message[start:end])
+    except ValueError:
+        return None
+
+
+def frame_version(message: str | bytes) -> int | None:
+    """State version carried by a state or delta frame (JSON or binary STATE), else None."""
+    if isinstance(message, bytes):
+        if len(message) < 21 or message[0] != KIND_STATE:
+            return None
+        return int.from_bytes(message[17:21], "little")
+    start = message.find('"version":')
+    if start < 0:
+        return None
+    start += len('"version":')
+    end = start
+    while end < len(message) and message[end].isdigit():
+        end += 1
+    return int(message[start:end]) if end > start else None
+
+
+def latency_summary(ordered) -> dict:
+    return {
+        "samples": len(ordered),
+        "p50": round(percentile(ordered, 0.50) / 1e6, 3),
+        "p99": round(percentile(ordered, 0.99) / 1e6, 3),
+        "p999": round(percentile(ordered, 0.999) / 1e6, 3),
+        "max": round((ordered[-1] if ordered else 0) / 1e6, 3),
+    }
+
+
+# --- Viewers (child processes) ---
+
+def viewer_process(url: str, protocol: str, count: int, measure_from, measure_until, ready, measure, stop, results) -> None:
+    raise_fd_limit()
+    asyncio.run(_viewers(url, protocol, count, measure_from, measure_until, ready, measure, stop, results))
+
+
+async def _viewers(url, protocol, count, measure_from, measure_until, ready, measure, stop, results) -> None:
+    loop = asyncio.get_running_loop()
+    subprotocols = [BINARY_SUBPROTOCOL] if protocol == "binary" else None
+    sent_at = array.array("q")
+    latencies = array.array("q")
+    version_logs = []  # per sampled viewer: (versions, received_at), versions ascending
+    counters = {"connected": 0, "failed": 0, "closed": 0, "frames": 0}
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+
+    async def viewer(log_versions: bool) -> None:
+        async with semaphore:
+            try:
+                ws = await connect(url, subprotocols=subprotocols, max_size=None, ping_interval=None, open_timeout=60)
+            except (OSError, asyncio.TimeoutError, InvalidHandshake):
+                counters["failed"] += 1
+                return
+        counters["connected"] += 1
+        last = None
+        if log_versions:
+            versions, received_at = array.array("q"), array.array("q")
+            version_logs.append((versions, received_at))
+        try:
+            async for message in ws:
+                received = time.monotonic_ns()
+                counters["frames"] += 1
+                sent = gift_tag(message)
+                if sent is not None and sent != last:
+                    last = sent
+                    sent_at.append(sent)
+                    latencies.append(received - sent)
+                if log_versions:
+                    version = frame_version(message)
+                    if version is not None and (not versions or version > versions[-1]):
+                        versions.append(version)
+                        received_at.append(received)
+        except ConnectionClosed:
+            pass
+        counters["closed"] += 1
+
+    tasks = [asyncio.create_task(viewer(idx < VERSION_VIEWERS_PER_PROC)) for idx in range(count)]
+    while counters["connected"] + counters["failed"] < count:
+        await asyncio.sleep(0.05)
+    ready.put((counters["connected"], counters["failed"]))
+
+    await loop.run_in_executor(None, measure.wait)
+    frames_before, cpu_before, started = counters["frames"], cpu_seconds(), time.monotonic()
+    await loop.run_in_executor(None, stop.wait)
+    frames, cpu, wall = counters["frames"] - frames_before, cpu_seconds() - cpu_before, time.monotonic() - started
+    closed_early = counters["closed"]
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    window = (measure_from.value, measure_until.value)
+    samples = array.array("q", (lat for sent, lat in zip(sent_at, latencies) if window[0] <= sent <= window[1]))
+    results.put({
+        "connected": counters["connected"],
+        "failed": counters["failed"],
+        "closed_early": closed_early,
+        "frames": frames,
+        "cpu_percent": cpu / wall * 100 if wall else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "latencies": samples.tobytes(),
+        "version_logs": [(versions.tobytes(), received_at.tobytes()) for versions, received_at in version_logs],
+    })
+
+
+# --- Server side ---
+
+def log_applied_versions(battle) -> tuple[array.array, array.array]:
+    """Record (version, monotonic ns) of every score change the battle accepts."""
+    versions, applied_at = array.array("q"), array.array("q")
+    add_score = battle.add_score
+
+    def logged_add_score(*args, **kwargs) -> bool:
+        accepted = add_score(*args, **kwargs)
+        if accepted:
+            versions.append(battle.version)
+            applied_at.append(time.monotonic_ns())
+        return accepted
+
+    battle.add_score = logged_add_score
+    return versions, applied_at
+
+
+def apply_latencies(applied: list[tuple[int, int]], version_logs: list[tuple[bytes, bytes]]) -> array.array:
+    """
+    For every applied (version, applied_at) and every sampled viewer: the time
+    until the viewer first received that version or a later one. Versions a
+    viewer never caught up to (e.g. applied after it stopped) are skipped.
+    """
+    latencies = array.array("q")
+    for raw_versions, raw_received in version_logs:
+        versions, received_at = array.array("q"), array.array("q")
+        versions.frombytes(raw_versions)
+        received_at.frombytes(raw_received)
+        for version, applied_at in applied:
+            idx = bisect.bisect_left(versions, version)
+            if idx < len(versions):
+                latencies.append(received_at[idx] - applied_at)
+    return latencies
+
+
+class _NullAffinityRepository:
+    """Stand-in for AffinityRepository: choices live only in the in-memory LRU."""
+
+    async def upsert_many(self, choices: dict[str, str]) -> None:
+        pass
+
+    async def load_recent(self, limit: int) -> list[tuple[str, str]]:
+        return []
+
+
+class StandInEngine:
+    """The live path of the app (no database): bus → manager → scheduler → ingestor → battle."""
+
+    def __init__(self):
+        bus = InProcessBus()
+        self.ws_manager = WebSocketManager(bus=bus)
+        self.broadcaster = BroadcastScheduler(self.ws_manager)
+        self.timer_wheel = TimerWheel()
+        self.battle_manager = BattleManager(self.broadcaster, self.timer_wheel, outbox=None)
+        self.ingestor = GiftIngestor(self.battle_manager, self.broadcaster)
+        self.affinity = UserAffinityStore(_NullAffinityRepository())
+        self.outbox = None
+        app.state.bus = bus
+        app.state.ws_manager = self.ws_manager
+        app.state.events = EventStream(bus)
+        self.ws_manager.add_observer(app.state.events.watching)
+        app.state.battle_manager = self.battle_manager
+
+    def start(self) -> None:
+        self.broadcaster.start()
+        self.timer_wheel.start()
+        self.ingestor.start()
+        self.affinity.start()
+
+    async def stop(self) -> None:
+        await self.ingestor.stop()
+        await self.battle_manager.shutdown()
+        await self.timer_wheel.stop()
+        await self.broadcaster.stop()
+        await self.affinity.stop()
+
+
+class AppEngine:
+    """The services the real lifespan put on app.state (--postgres)."""
+
+    def __init__(self):
+        state = app.state
+        self.ws_manager = state.ws_manager
+        self.battle_manager = state.battle_manager
+        self.ingestor = state.ingestor
+        self.affinity = state.affinity
+        self.outbox = state.outbox
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+def build_events(countries: list[str], seed: int = 42) -> tuple[list[GiftEvent], list[CommentEvent]]:
+    rng = random.Random(seed)
+    gift_names = list(GIFT_POINTS)
+    gifts = [
+        GiftEvent(
+            user=User(id=rng.randint(1, VIEWER_USERS), nickname=""),
+            gift=GiftStruct(name=rng.choice(gift_names), diamond_count=1),
+        )
+        for _ in range(EVENT_POOL_SIZE)
+    ]
+    comments = []
+    for _ in range(EVENT_POOL_SIZE):
+        words = rng.sample(CHATTER, 2)
+        if rng.random() < 0.5:
+            words.insert(1, rng.choice(countries))
+        comments.append(CommentEvent(user=User(id=rng.randint(1, VIEWER_USERS), nickname="viewer"), content=" ".join(words)))
+    return gifts, comments
+
+
+async def drive(
+    listener: TikTokListener,
+    gifts: list[GiftEvent],
+    comments: list[CommentEvent],
+    gift_rate: float,
+    comment_rate: float,
+    seconds: float,
+) -> tuple[int, int]:
+    """Feed the listener at fixed rates for `seconds`. Returns (gifts, comments) sent."""
+    sent_gifts = sent_comments = 0
+    start = time.monotonic()
+    while (elapsed := time.monotonic() - start) < seconds:
+        for _ in range(int(elapsed * gift_rate) - sent_gifts):
+            event = gifts[sent_gifts % len(gifts)]
+            event.user.nickname = f"{TAG}{time.monotonic_ns()}~"
+            await listener.handle_gift(event)
+            sent_gifts += 1
+        for _ in range(int(elapsed * comment_rate) - sent_comments):
+            await listener.handle_comment(comments[sent_comments % len(comments)])
+            sent_comments += 1
+        await asyncio.sleep(DRIVER_TICK_SECONDS)
+    return sent_gifts, sent_comments
+
+
+def server_counters(engine) -> dict:
+    ingest = engine.ingestor.stats()
+    return {
+        "frames_dropped": engine.ws_manager.frames_dropped,
+        "clients_evicted": engine.ws_manager.clients_evicted,
+        "ingest_dropped": ingest["dropped"],
+        "ingest_applied": ingest["applied"],
+        "ingest_batches": ingest["batches"],
+    }
+
+
+async def run(args) -> dict:
+    raise_fd_limit()
+    countries = list(COUNTRY_CODES)[:args.countries]
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        host="127.0.0.1",
+        port=args.port,
+        lifespan="on" if args.postgres else "off",
+        log_level="warning",
+        backlog=max(2048, args.clients),
+    ))
+    engine = None if args.postgres else StandInEngine()
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            raise RuntimeError("uvicorn failed to start")
+        await asyncio.sleep(0.05)
+    if engine is None:
+        engine = AppEngine()
+    engine.start()
+
+    battle = await engine.battle_manager.start_battle(
+        creator_username="loadtest",
+        countries=countries,
+        duration_seconds=int(args.warmup + args.duration) + 3600,
+        ws_manager=engine.ws_manager,
+        room=ROOM,
+    )
+    applied_versions, applied_at = log_applied_versions(battle)
+    listener = TikTokListener(
+        username="loadtest",
+        session_id=None,
+        battle_manager=engine.battle_manager,
+        ingestor=engine.ingestor,
+        affinity=engine.affinity,
+        battle_repo=None,
+        room=ROOM,
+    )
+    gifts, comments = build_events(countries)
+
+    url = f"ws://127.0.0.1:{args.port}/ws/{ROOM}" + ("?mode=delta" if args.protocol == "delta" else "")
+    ctx = mp.get_context("spawn")
+    measure_from, measure_until = ctx.Value("q", 0), ctx.Value("q", 0)
+    ready, results = ctx.Queue(), ctx.Queue()
+    measure, stop = ctx.Event(), ctx.Event()
+    per_proc = [args.clients // args.client_procs + (idx < args.clients % args.client_procs) for idx in range(args.client_procs)]
+    procs = [
+        ctx.Process(
+            target=viewer_process,
+            args=(url, args.protocol, count, measure_from, measure_until, ready, measure, stop, results),
+            daemon=True,
+        )
+        for count in per_proc if count
+    ]
+    for proc in procs:
+        proc.start()
+
+    loop = asyncio.get_running_loop()
+    connected = failed = 0
+    for _ in procs:
+        ok, bad = await loop.run_in_executor(None, ready.get, True, 300)
+        connected, failed = connected + ok, failed + bad
+    logger.info(f"{connected} viewers connected ({failed} failed); warming up for {args.warmup}s")
+
+    await drive(listener, gifts, comments, args.gift_rate, args.comment_rate, args.warmup)
+
+    logger.info(f"Measuring for {args.duration}s")
+    before = server_counters(engine)
+    cpu_before, rss_before, started = cpu_seconds(), rss_mb(), time.monotonic()
+    measure_from.value = time.monotonic_ns()
+    measure.set()
+    sent_gifts, sent_comments = await drive(listener, gifts, comments, args.gift_rate, args.comment_rate, args.duration)
+    measure_until.value = time.monotonic_ns()
+    # Let the last gifts reach the viewers before they stop
+    await asyncio.sleep(max(1.0, 2 / settings.BROADCAST_MAX_FPS))
+    wall = time.monotonic() - started
+    cpu, rss = cpu_seconds() - cpu_before, rss_mb()
+    after = server_counters(engine)
+    stop.set()
+
+    viewers = [await loop.run_in_executor(None, results.get, True, 120) for _ in procs]
+    for proc in procs:
+        proc.join(timeout=10)
+
+    if args.postgres:
+        await battle.end_battle(engine.ws_manager, engine.outbox)
+    else:
+        engine.battle_manager.release(ROOM)
+    await engine.stop()
+    server.should_exit = True
+    await server_task
+
+    samples = array.array("q")
+    for viewer in viewers:
+        chunk = array.array("q")
+        chunk.frombytes(viewer["latencies"])
+        samples.extend(chunk)
+    ordered = sorted(samples)
+    window = (measure_from.value, measure_until.value)
+    applied = [
+        (version, at) for version, at in zip(applied_versions, applied_at) if window[0] <= at <= window[1]
+    ]
+    version_logs = [log for viewer in viewers for log in viewer["version_logs"]]
+    apply_ordered = sorted(apply_latencies(applied, version_logs))
+    delta = {key: after[key] - before[key] for key in after}
+    return {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {
+            "clients": args.clients,
+            "client_procs": args.client_procs,
+            "gift_rate": args.gift_rate,
+            "comment_rate": args.comment_rate,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "countries": args.countries,
+            "protocol": args.protocol,
+            "database": "postgres" if args.postgres else "stand-in",
+            "broadcast_max_fps": settings.BROADCAST_MAX_FPS,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "sent": {
+            "gifts": sent_gifts,
+            "comments": sent_comments,
+            "gift_rate": round(sent_gifts / args.duration, 1),
+            "comment_rate": round(sent_comments / args.duration, 1),
+        },
+        "latency_ms": latency_summary(ordered),
+        "apply_latency_ms": {
+            **latency_summary(apply_ordered),
+            "versions": len(applied),
+            "viewers": len(version_logs),
+        },
+        "ws": {
+            "connected": connected,
+            "failed": failed,
+            "closed_early": sum(viewer["closed_early"] for viewer in viewers),
+            "frames_received": sum(viewer["frames"] for viewer in viewers),
+            "frames_per_client_per_second": round(
+                sum(viewer["frames"] for viewer in viewers) / max(1, connected) / wall, 2
+            ),
+            "frames_dropped": delta["frames_dropped"],
+            "clients_evicted": delta["clients_evicted"],
+        },
+        "ingest": {
+            "applied": delta["ingest_applied"],
+            "batches": delta["ingest_batches"],
+            "dropped": delta["ingest_dropped"],
+        },
+        "server": {
+            "cpu_percent": round(cpu / wall * 100, 1),
+            "rss_mb": round(rss, 1),
+            "rss_growth_mb": round(rss - rss_before, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        },
+        "viewers": {
+            "cpu_percent": round(sum(viewer["cpu_percent"] for viewer in viewers), 1),
+            "peak_rss_mb": round(sum(viewer["peak_rss_mb"] for viewer in viewers), 1),
+        },
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of `result` against `baseline`, as human-readable lines."""
+    if result["config"] != baseline.get("config"):
+        raise SystemExit(
+            f"Baseline was recorded with different parameters: {baseline.get('config')}"
+        )
+    regressions = []
+    for (section, key), slack in REGRESSION_CHECKS.items():
+        current, previous = result[section][key], baseline.get(section, {}).get(key)
+        if previous is None:
+            continue
+        if current > previous * (1 + tolerance) and current - previous > slack:
+            regressions.append(f"{section}.{key}: {previous} → {current}")
+    return regressions
+
+
+def report(result: dict) -> None:
+    latency, ws, server, viewers = result["latency_ms"], result["ws"], result["server"], result["viewers"]
+    apply_latency = result["apply_latency_ms"]
+    print(
+        f"{ws['connected']} viewers ({result['config']['protocol']}), "
+        f"{result['sent']['gift_rate']} gifts/s + {result['sent']['comment_rate']} comments/s "
+        f"for {result['config']['duration']}s"
+    )
+    print(
+        f"  gift → viewer latency: p50 {latency['p50']} ms  p99 {latency['p99']} ms  "
+        f"p999 {latency['p999']} ms  max {latency['max']} ms  ({latency['samples']} samples)"
+    )
+    print(
+        f"  apply → viewer latency: p50 {apply_latency['p50']} ms  p99 {apply_latency['p99']} ms  "
+        f"p999 {apply_latency['p999']} ms  max {apply_latency['max']} ms  "
+        f"({apply_latency['versions']} versions × {apply_latency['viewers']} viewers)"
+    )
+    print(
+        f"  frames: {ws['frames_per_client_per_second']}/s per viewer, {ws['frames_dropped']} dropped, "
+        f"{ws['clients_evicted']} evicted, {ws['failed']} failed to connect, {ws['closed_early']} closed early"
+    )
+    print(f"  ingest: {result['ingest']['applied']} applied in {result['ingest']['batches']} batches, {result['ingest']['dropped']} dropped")
+    print(
+        f"  server: {server['cpu_percent']}% CPU, {server['rss_mb']} MB RSS "
+        f"(+{server['rss_growth_mb']} MB during the run, peak {server['peak_rss_mb']} MB)"
+    )
+    print(f"  viewer processes: {viewers['cpu_percent']}% CPU, {viewers['peak_rss_mb']} MB peak RSS")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=2000, help="WebSocket viewers")
+    parser.add_argument("--client-procs", type=int, default=max(1, min(4, (os.cpu_count() or 2) // 2)))
+    parser.add_argument("--gift-rate", type=float, default=200.0, help="gifts per second")
+    parser.add_argument("--comment-rate", type=float, default=1000.0, help="comments per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before the run")
+    parser.add_argument("--countries", type=int, default=4)
+    parser.add_argument("--protocol", choices=["json", "delta", "binary"], default="json")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--postgres", action="store_true", help="run the real lifespan against DATABASE_URL")
+    parser.add_argument("--save", help="write the result as a JSON baseline")
+    parser.add_argument("--compare", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative increase over the baseline")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO)
+    # One log line per connecting viewer would dominate the run
+    logging.getLogger("app").setLevel(logging.WARNING)
+
+    result = asyncio.run(run(args))
+    report(result)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+            f.write("\n")
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions against {args.compare}.")
+
+
+if __name__ == "__main__":
+    main()
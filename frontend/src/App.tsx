@@ -28,6 +28,7 @@ function App() {
                 <main className="main-content">
                     <Routes>
                         <Route path="/" element={<BattlePage />} />
+                        <Route path="/battle/:battleId" element={<BattlePage />} />
                         <Route path="/leaderboard" element={<Leaderboard />} />
                         <Route path="/history" element={<History />} />
                     </Routes>
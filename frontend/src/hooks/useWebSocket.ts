@@ -1,58 +1,273 @@
 import { useEffect, useRef, useCallback, useState } from 'react'
 
+export interface GiftInfo {
+    user: string
+    gift: string
+    points: number
+    country: string
+    is_lion: boolean
+}
+
 export interface BattleState {
     type: string
     battle_id?: string
+    version?: number
     creator_username?: string
     scores?: Record<string, number>
     rankings?: Array<{ country: string; score: number; position: number }>
     time_remaining?: number
     total_seconds?: number
     battle_finished?: boolean
-    last_gift?: {
-        user: string
-        gift: string
-        points: number
-        country: string
-        is_lion: boolean
-    }
+    last_gift?: GiftInfo | null
     winner?: string
     duration_seconds?: number
     message?: string
 }
 
-const WS_URL = `ws://${window.location.hostname}:8000/ws`
+// Delta frame: only the scores/positions that changed since base_version
+interface BattleDelta {
+    type: 'delta'
+    battle_id: string
+    base_version: number
+    version: number
+    time_remaining: number
+    scores: Record<string, number>
+    positions: Record<string, number>
+    last_gift?: GiftInfo | null
+}
+
+const WS_URL = `ws://${window.location.hostname}:8000/ws?mode=delta`
 const RECONNECT_DELAY = 3000
 
-export function useWebSocket(onLionGift: () => void, onGameOver: () => void) {
+// Opt-in binary frames (layout in backend/app/ws/codec.py): a TABLE frame with the
+// country names once per battle, then STATE frames with packed scores/positions
+const BINARY_SUBPROTOCOL = 'battle.binary.v1'
+const KIND_TABLE = 1
+const KIND_STATE = 2
+const FLAG_FINISHED = 1
+const FLAG_GIFT = 2
+const FLAG_LION = 4
+const NO_COUNTRY = 0xffff
+
+interface BattleTable {
+    battleId: string
+    creator: string
+    totalSeconds: number
+    countries: string[]
+}
+
+const utf8 = new TextDecoder()
+
+function readUuid(view: DataView, offset: number): string {
+    let hex = ''
+    for (let i = 0; i < 16; i++) {
+        hex += view.getUint8(offset + i).toString(16).padStart(2, '0')
+    }
+    return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`
+}
+
+// u16 length + UTF-8; returns the string and the offset after it
+function readString(view: DataView, offset: number): [string, number] {
+    const length = view.getUint16(offset, true)
+    const bytes = new Uint8Array(view.buffer, view.byteOffset + offset + 2, length)
+    return [utf8.decode(bytes), offset + 2 + length]
+}
+
+function decodeTable(view: DataView): BattleTable {
+    const battleId = readUuid(view, 1)
+    const totalSeconds = view.getUint32(17, true)
+    const [creator, afterCreator] = readString(view, 21)
+    let offset = afterCreator
+    const count = view.getUint16(offset, true)
+    offset += 2
+    const countries: string[] = []
+    for (let i = 0; i < count; i++) {
+        const [name, next] = readString(view, offset)
+        countries.push(name)
+        offset = next
+    }
+    return { battleId, creator, totalSeconds, countries }
+}
+
+// The state and its gift sequence (0 before any gift; changes with every new gift),
+// or null when the frame belongs to a battle whose table we don't have
+function decodeState(view: DataView, table: BattleTable): [BattleState, number] | null {
+    const battleId = readUuid(view, 1)
+    const count = view.getUint16(26, true)
+    if (battleId !== table.battleId || count !== table.countries.length) return null
+    const version = view.getUint32(17, true)
+    const timeRemaining = view.getUint32(21, true)
+    const flags = view.getUint8(25)
+
+    let offset = 28
+    const scores: Record<string, number> = {}
+    const rankings = table.countries.map((country, i) => {
+        const score = Number(view.getBigUint64(offset + 8 * i, true))
+        scores[country] = score
+        return { country, score, position: view.getUint16(offset + 8 * count + 2 * i, true) }
+    })
+    rankings.sort((a, b) => a.position - b.position)
+    offset += 10 * count
+
+    let lastGift: GiftInfo | null = null
+    let giftSeq = 0
+    if (flags & FLAG_GIFT) {
+        const countryIdx = view.getUint16(offset, true)
+        const points = Number(view.getBigInt64(offset + 2, true))
+        giftSeq = view.getUint32(offset + 10, true)
+        const [user, afterUser] = readString(view, offset + 14)
+        const [gift] = readString(view, afterUser)
+        lastGift = {
+            user,
+            gift,
+            points,
+            country: countryIdx === NO_COUNTRY ? '' : table.countries[countryIdx],
+            is_lion: (flags & FLAG_LION) !== 0,
+        }
+    }
+    return [{
+        type: 'state_update',
+        battle_id: battleId,
+        version,
+        creator_username: table.creator,
+        scores,
+        rankings,
+        time_remaining: timeRemaining,
+        total_seconds: table.totalSeconds,
+        battle_finished: (flags & FLAG_FINISHED) !== 0,
+        last_gift: lastGift,
+    }, giftSeq]
+}
+
+function applyDelta(prev: BattleState, delta: BattleDelta): BattleState {
+    const scores = { ...prev.scores, ...delta.scores }
+    const positions: Record<string, number> = {}
+    for (const r of prev.rankings || []) positions[r.country] = r.position
+    Object.assign(positions, delta.positions)
+    const rankings = Object.keys(scores)
+        .map(country => ({ country, score: scores[country], position: positions[country] }))
+        .sort((a, b) => a.position - b.position)
+    return {
+        ...prev,
+        version: delta.version,
+        time_remaining: delta.time_remaining,
+        scores,
+        rankings,
+        last_gift: delta.last_gift !== undefined ? delta.last_gift : prev.last_gift,
+    }
+}
+
+interface WebSocketOptions {
+    url?: string
+    // Replays end on their own — don't reconnect (and restart) them
+    reconnect?: boolean
+    // Ask for the binary subprotocol (live /ws endpoints only)
+    binary?: boolean
+}
+
+export function useWebSocket(
+    onLionGift: () => void,
+    onGameOver: () => void,
+    { url = WS_URL, reconnect = true, binary = true }: WebSocketOptions = {},
+) {
     const [state, setState] = useState<BattleState | null>(null)
     const [connected, setConnected] = useState(false)
     const wsRef = useRef<WebSocket | null>(null)
     const reconnectTimer = useRef<ReturnType<typeof setTimeout> | null>(null)
     const isMounted = useRef(true)
+    // Last full state applied, used to validate incoming deltas
+    const stateRef = useRef<BattleState | null>(null)
+    const resyncPending = useRef(false)
+    // Country index of the current battle, from the last binary TABLE frame
+    const tableRef = useRef<BattleTable | null>(null)
+    // Gift sequence of the last binary STATE frame; null until the first one on a connection
+    const giftSeqRef = useRef<number | null>(null)
 
     const connect = useCallback(() => {
         if (!isMounted.current) return
         try {
-            const ws = new WebSocket(WS_URL)
+            const ws = binary ? new WebSocket(url, [BINARY_SUBPROTOCOL]) : new WebSocket(url)
+            ws.binaryType = 'arraybuffer'
             wsRef.current = ws
 
             ws.onopen = () => {
                 if (!isMounted.current) return
+                resyncPending.current = false
+                giftSeqRef.current = null
                 setConnected(true)
                 console.log('WebSocket connected')
             }
 
             ws.onmessage = (e) => {
                 if (!isMounted.current) return
+                if (e.data instanceof ArrayBuffer) {
+                    try {
+                        const view = new DataView(e.data)
+                        const kind = view.getUint8(0)
+                        if (kind === KIND_TABLE) {
+                            tableRef.current = decodeTable(view)
+                            return
+                        }
+                        if (kind !== KIND_STATE) return
+                        const decoded = tableRef.current && decodeState(view, tableRef.current)
+                        if (!decoded) {
+                            // Missed this battle's table — the snapshot sent on resync starts with it
+                            if (!resyncPending.current) {
+                                resyncPending.current = true
+                                ws.send('resync')
+                            }
+                            return
+                        }
+                        const [next, giftSeq] = decoded
+                        // last_gift repeats in every frame; only a new one plays the sound
+                        const newGift = giftSeqRef.current !== null && giftSeq !== giftSeqRef.current
+                        giftSeqRef.current = giftSeq
+                        resyncPending.current = false
+                        stateRef.current = next
+                        setState(next)
+                        if (newGift && next.last_gift?.is_lion) {
+                            onLionGift()
+                        }
+                    } catch (err) {
+                        console.error('WS binary decode error:', err)
+                    }
+                    return
+                }
                 try {
-                    const data: BattleState = JSON.parse(e.data)
+                    const data = JSON.parse(e.data)
 
                     if (data.type === 'ping') {
                         ws.send('ping')
                         return
                     }
 
+                    if (data.type === 'delta') {
+                        const delta = data as BattleDelta
+                        const prev = stateRef.current
+                        const inSync = prev?.type === 'state_update'
+                            && prev.battle_id === delta.battle_id
+                            && (prev.version ?? 0) >= delta.base_version
+                        if (!inSync || !prev) {
+                            // Version gap (or new battle) — ask for a full snapshot
+                            if (!resyncPending.current) {
+                                resyncPending.current = true
+                                ws.send('resync')
+                            }
+                            return
+                        }
+                        const next = applyDelta(prev, delta)
+                        stateRef.current = next
+                        setState(next)
+                        if (delta.last_gift?.is_lion) {
+                            onLionGift()
+                        }
+                        return
+                    }
+
+                    if (data.type === 'state_update') {
+                        resyncPending.current = false
+                    }
+                    stateRef.current = data
                     setState(data)
 
                     if (data.type === 'state_update' && data.last_gift?.is_lion) {
@@ -69,6 +284,7 @@ export function useWebSocket(onLionGift: () => void, onGameOver: () => void) {
             ws.onclose = () => {
                 if (!isMounted.current) return
                 setConnected(false)
+                if (!reconnect) return
                 console.log('WebSocket closed. Reconnecting…')
                 reconnectTimer.current = setTimeout(connect, RECONNECT_DELAY)
             }
@@ -79,9 +295,9 @@ export function useWebSocket(onLionGift: () => void, onGameOver: () => void) {
             }
         } catch (e) {
             console.error('WebSocket connection failed', e)
-            reconnectTimer.current = setTimeout(connect, RECONNECT_DELAY)
+            if (reconnect) reconnectTimer.current = setTimeout(connect, RECONNECT_DELAY)
         }
-    }, [onLionGift, onGameOver])
+    }, [onLionGift, onGameOver, url, reconnect, binary])
 
     useEffect(() => {
         isMounted.current = true
@@ -1,5 +1,6 @@
 import { useCallback, useEffect, useRef, useState } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
+import { useParams, useSearchParams } from 'react-router-dom'
 import { useWebSocket } from '../hooks/useWebSocket'
 import { CountryCard } from '../components/CountryCard'
 import { Timer } from '../components/Timer'
@@ -22,6 +23,11 @@ const SIMULATED_GIFT_POINTS: Record<string, number> = {
 }
 
 export default function BattlePage() {
+    // /battle/:battleId replays a finished battle (?speed=N) instead of following the live one
+    const { battleId } = useParams()
+    const [searchParams] = useSearchParams()
+    const speed = Number(searchParams.get('speed')) || 1
+    const isReplay = !!battleId
     const [showWinner, setShowWinner] = useState(false)
     const [winnerData, setWinnerData] = useState<{ winner: string; rankings: any[] } | null>(null)
     const lionAudio = useRef<HTMLAudioElement | null>(null)
@@ -57,7 +63,13 @@ export default function BattlePage() {
         } catch { }
     }, [])
 
-    const { state, connected } = useWebSocket(onLionGift, onGameOver)
+    const { state, connected } = useWebSocket(
+        onLionGift,
+        onGameOver,
+        isReplay
+            ? { url: `ws://${window.location.hostname}:8000/ws/replay/${battleId}?speed=${speed}`, reconnect: false, binary: false }
+            : {},
+    )
 
     // Derived states
     const scores = state?.scores || {}
@@ -69,7 +81,7 @@ export default function BattlePage() {
 
     // Auto-show admin if no battle
     useEffect(() => {
-        if (countries.length === 0 && !showAdmin) {
+        if (countries.length === 0 && !showAdmin && !isReplay) {
             setShowAdmin(true)
         }
     }, [countries.length])
@@ -131,7 +143,9 @@ export default function BattlePage() {
             <div className="battle-header">
                 <div className="ws-status">
                     <span className={`ws-dot ${connected ? 'connected' : 'disconnected'}`} />
-                    {connected ? 'Live' : 'Connecting…'}
+                    {isReplay
+                        ? (connected ? `Replay ×${speed}` : state?.type === 'game_over' ? 'Replay finished' : 'Connecting…')
+                        : (connected ? 'Live' : 'Connecting…')}
                 </div>
                 {state?.creator_username && !(Object.keys(state?.scores || {}).length > 0 && !state.battle_finished) && (
                     <div className="creator-tag">@{state.creator_username}</div>
@@ -150,13 +164,13 @@ export default function BattlePage() {
             )}
 
             {/* Admin toggle button (fixed layout benefit) */}
-            <button
+            {!isReplay && <button
                 className="reveal-admin-btn"
                 onClick={() => setShowAdmin(!showAdmin)}
                 title="Toggle Admin Panel"
             >
                 {showAdmin ? '🔒' : '⚙️'}
-            </button>
+            </button>}
 
             {/* Country cards */}
             {countries.length > 0 ? (
@@ -185,6 +199,11 @@ export default function BattlePage() {
                         ))}
                     </AnimatePresence>
                 </div>
+            ) : isReplay ? (
+                <div className="no-battle-card card">
+                    <div className="no-battle-icon">⏪</div>
+                    <h2>{state?.type === 'game_over' ? 'Replay Finished' : state?.message || 'Loading Replay…'}</h2>
+                </div>
             ) : (
                 <div className="no-battle-card card">
                     <div className="no-battle-icon">⚔️</div>
@@ -201,7 +220,7 @@ export default function BattlePage() {
             )}
 
             {/* Admin Panel (Collapsible) */}
-            {showAdmin && (
+            {showAdmin && !isReplay && (
                 <div className="admin-panel card animate-slide-up">
                     <h3 className="admin-title">⚙️ Admin Controls</h3>
                     <div className="admin-row">
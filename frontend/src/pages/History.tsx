@@ -37,22 +37,33 @@ export default function History() {
     const [data, setData] = useState<HistoryItem[]>([])
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState<string | null>(null)
+    const [nextCursor, setNextCursor] = useState<string | null>(null)
 
-    useEffect(() => {
-        fetch(`${API}/history`)
-            .then(r => r.json())
-            .then(d => { setData(d); setLoading(false) })
+    const loadPage = (cursor: string | null) => {
+        setLoading(true)
+        const url = cursor ? `${API}/history?cursor=${encodeURIComponent(cursor)}` : `${API}/history`
+        fetch(url)
+            .then(r => {
+                setNextCursor(r.headers.get('X-Next-Cursor'))
+                return r.json()
+            })
+            .then((d: HistoryItem[]) => {
+                setData(prev => cursor ? [...prev, ...d] : d)
+                setLoading(false)
+            })
             .catch(() => { setError('Failed to load history'); setLoading(false) })
-    }, [])
+    }
+
+    useEffect(() => { loadPage(null) }, [])
 
     return (
         <div className="container history-page">
             <div className="page-header">
                 <h1 className="page-title">📜 Battle History</h1>
-                <p className="page-subtitle">Last 20 completed battles</p>
+                <p className="page-subtitle">Completed battles, newest first</p>
             </div>
 
-            {loading && <div className="loading-state">Loading history…</div>}
+            {loading && data.length === 0 && <div className="loading-state">Loading history…</div>}
             {error && <div className="error-state">{error}</div>}
 
             {!loading && !error && data.length === 0 && (
@@ -66,7 +77,7 @@ export default function History() {
             <div className="history-list">
                 {data.map((battle, i) => (
                     <Link to={`/battle/${battle.id}`} key={battle.id} className="history-card card" id={`battle-${battle.id}`}>
-                        <div className="history-index">#{data.length - i}</div>
+                        <div className="history-index">#{i + 1}</div>
                         <div className="history-content">
                             <div className="history-winner">
                                 <span className="winner-trophy">🏆</span>
@@ -84,6 +95,14 @@ export default function History() {
                     </Link>
                 ))}
             </div>
+
+            {nextCursor && !error && (
+                <div className="history-more">
+                    <button className="btn btn-ghost" disabled={loading} onClick={() => loadPage(nextCursor)}>
+                        {loading ? 'Loading…' : 'Load more'}
+                    </button>
+                </div>
+            )}
         </div>
     )
 }
@@ -11,6 +11,14 @@ interface LeaderboardEntry {
     total_battles: number
 }
 
+// ?window= values; '' is the all-time leaderboard
+const WINDOWS = [
+    { value: '', label: 'All time', subtitle: 'All-time battle statistics' },
+    { value: '30d', label: '30 days', subtitle: 'Battle statistics for the last 30 days' },
+    { value: '7d', label: '7 days', subtitle: 'Battle statistics for the last 7 days' },
+    { value: '1d', label: 'Today', subtitle: "Today's battle statistics (UTC)" },
+]
+
 function getEmoji(country: string): string {
     const emojis: Record<string, string> = {
         'Turkey': '🇹🇷', 'Saudi Arabia': '🇸🇦', 'Egypt': '🇪🇬', 'Pakistan': '🇵🇰',
@@ -24,19 +32,36 @@ export default function Leaderboard() {
     const [data, setData] = useState<LeaderboardEntry[]>([])
     const [loading, setLoading] = useState(true)
     const [error, setError] = useState<string | null>(null)
+    const [windowIdx, setWindowIdx] = useState(0)
+    const selected = WINDOWS[windowIdx]
 
     useEffect(() => {
-        fetch(`${API}/leaderboard`)
+        setLoading(true)
+        setError(null)
+        fetch(selected.value ? `${API}/leaderboard?window=${selected.value}` : `${API}/leaderboard`)
             .then(r => r.json())
             .then(d => { setData(d); setLoading(false) })
             .catch(() => { setError('Failed to load leaderboard'); setLoading(false) })
-    }, [])
+    }, [selected.value])
 
     return (
         <div className="container leaderboard-page">
             <div className="page-header">
                 <h1 className="page-title">🏆 Country Leaderboard</h1>
-                <p className="page-subtitle">All-time battle statistics</p>
+                <p className="page-subtitle">{selected.subtitle}</p>
+            </div>
+
+            <div className="leaderboard-windows">
+                {WINDOWS.map((w, i) => (
+                    <button
+                        key={w.label}
+                        className={`btn ${i === windowIdx ? 'btn-primary' : 'btn-ghost'}`}
+                        onClick={() => setWindowIdx(i)}
+                        id={`leaderboard-window-${w.value || 'all'}`}
+                    >
+                        {w.label}
+                    </button>
+                ))}
             </div>
 
             {loading && <div className="loading-state">Loading leaderboard…</div>}
@@ -50,7 +75,7 @@ export default function Leaderboard() {
                 </div>
             )}
 
-            {data.length > 0 && (
+            {!loading && data.length > 0 && (
                 <div className="leaderboard-table card">
                     <table id="leaderboard-table">
                         <thead>